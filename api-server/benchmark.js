@@ -0,0 +1,133 @@
+'use strict';
+
+// Benchmark the API server against a stubbed contract, so no Fabric network
+// is needed. Compares one request per event with the bulk endpoint (which
+// batches events into recordEvents transactions), and shows how many gateway
+// connections the pool opened.
+//
+// Usage: node benchmark.js [events] [concurrency] [commitLatencyMs] [connectLatencyMs]
+
+const { ContractPool } = require('./contractPool');
+const { createApp } = require('./server');
+
+const EVENTS = parseInt(process.argv[2] || '2000', 10);
+const CONCURRENCY = parseInt(process.argv[3] || '64', 10);
+const COMMIT_LATENCY_MS = parseFloat(process.argv[4] || '5');
+const CONNECT_LATENCY_MS = parseFloat(process.argv[5] || '200');
+const BATCH_SIZE = 100;
+
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+function stubConnect() {
+    let txCounter = 0;
+    const contract = {
+        async submitTransaction(name, eventData) {
+            await sleep(COMMIT_LATENCY_MS);
+            txCounter += 1;
+            const data = JSON.parse(eventData);
+            if (name === 'recordEvents') {
+                const events = data.map((d, i) => ({ id: `event_stub_${txCounter}_${i}`, data: d }));
+                return Buffer.from(JSON.stringify({ success: true, events, count: events.length }));
+            }
+            return Buffer.from(JSON.stringify({
+                success: true,
+                event: { id: `event_stub_${txCounter}`, data },
+            }));
+        },
+        async evaluateTransaction() {
+            return Buffer.from('{}');
+        },
+    };
+    return sleep(CONNECT_LATENCY_MS).then(() => ({ contract, gateway: { disconnect() {} } }));
+}
+
+function percentile(sorted, p) {
+    if (sorted.length === 0) {
+        return null;
+    }
+    return sorted[Math.min(sorted.length - 1, Math.floor((p / 100) * sorted.length))];
+}
+
+async function runRequests(baseUrl, count, concurrency, makeRequest) {
+    const latencies = [];
+    let errors = 0;
+    let next = 0;
+    const start = process.hrtime.bigint();
+
+    async function worker() {
+        while (next < count) {
+            const index = next++;
+            const t0 = process.hrtime.bigint();
+            const response = await makeRequest(baseUrl, index);
+            if (!response.ok) {
+                errors += 1;
+            }
+            await response.arrayBuffer();
+            latencies.push(Number(process.hrtime.bigint() - t0) / 1e6);
+        }
+    }
+
+    await Promise.all(Array.from({ length: Math.min(concurrency, count) }, worker));
+    const seconds = Number(process.hrtime.bigint() - start) / 1e9;
+    latencies.sort((a, b) => a - b);
+    return {
+        requests: count,
+        errors,
+        seconds: Number(seconds.toFixed(3)),
+        p50_ms: Number(percentile(latencies, 50).toFixed(2)),
+        p99_ms: Number(percentile(latencies, 99).toFixed(2)),
+    };
+}
+
+function event(index) {
+    return { timestamp: Date.now(), ecu_id: `ECU_${index % 50}`, message: { type: 'speed', value: 60 } };
+}
+
+async function main() {
+    // The request handlers log every transaction; keep the benchmark output readable
+    const log = console.log;
+    console.log = () => {};
+
+    const pool = new ContractPool({ size: 1, connect: stubConnect });
+    const server = createApp(pool).listen(0);
+    await new Promise((resolve) => server.once('listening', resolve));
+    const baseUrl = `http://127.0.0.1:${server.address().port}`;
+
+    const single = await runRequests(baseUrl, EVENTS, CONCURRENCY, (url, i) =>
+        fetch(`${url}/api/recordEvent`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify(event(i)),
+        }));
+    single.events_per_sec = Math.round(EVENTS / single.seconds);
+
+    const batches = Math.ceil(EVENTS / BATCH_SIZE);
+    const bulk = await runRequests(baseUrl, batches, Math.max(1, Math.ceil(CONCURRENCY / BATCH_SIZE)), (url, b) =>
+        fetch(`${url}/api/recordEvents`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify(Array.from(
+                { length: Math.min(BATCH_SIZE, EVENTS - b * BATCH_SIZE) },
+                (_, i) => event(b * BATCH_SIZE + i))),
+        }));
+    bulk.events_per_sec = Math.round(EVENTS / bulk.seconds);
+
+    console.log = log;
+    console.log(JSON.stringify({
+        events: EVENTS,
+        concurrency: CONCURRENCY,
+        commit_latency_ms: COMMIT_LATENCY_MS,
+        connect_latency_ms: CONNECT_LATENCY_MS,
+        gateway_connections: pool.connections,
+        single,
+        bulk,
+    }, null, 2));
+
+    server.close();
+    await pool.close();
+}
+
+main().catch((err) => {
+    console.error(err);
+    process.exit(1);
+});
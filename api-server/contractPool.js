@@ -0,0 +1,165 @@
+const path = require("path");
+const fs = require("fs");
+
+const CHANNEL_NAME = "mychannel";
+const CHAINCODE_NAME = "recordEvent";
+const IDENTITY = "user4";
+
+// Errors that mean the gateway connection itself is unusable (as opposed to
+// the chaincode rejecting a transaction), so it should be rebuilt.
+const CONNECTION_ERROR_PATTERNS = [
+  "No valid responses from any peers",
+  "UNAVAILABLE",
+  "failed to connect",
+  "Failed to connect",
+  "DiscoveryService",
+  "Channel has been shut down",
+  "gateway is disconnected",
+];
+
+function isConnectionError(err) {
+  const message = (err && err.message) || "";
+  return CONNECTION_ERROR_PATTERNS.some((pattern) => message.includes(pattern));
+}
+
+async function connectGateway() {
+  // Required lazily so the pool can be exercised with a stub connect function
+  // on machines without the Fabric SDK installed.
+  const { Gateway, Wallets } = require("fabric-network");
+
+  const ccpPath = path.resolve(
+    __dirname,
+    "..",
+    "blockchain",
+    "fabric-samples",
+    "test-network",
+    "organizations",
+    "peerOrganizations",
+    "org1.example.com",
+    "connection-org1.json"
+  );
+
+  // Check if connection profile exists
+  if (!fs.existsSync(ccpPath)) {
+    throw new Error(`Connection profile not found at: ${ccpPath}`);
+  }
+
+  const ccp = JSON.parse(fs.readFileSync(ccpPath, "utf8"));
+
+  const walletPath = path.join(process.cwd(), "wallet");
+  const wallet = await Wallets.newFileSystemWallet(walletPath);
+
+  // Check if user identity exists
+  const userExists = await wallet.get(IDENTITY);
+  if (!userExists) {
+    throw new Error(
+      `${IDENTITY} identity not found in wallet. Please enroll the user first.`
+    );
+  }
+
+  const gateway = new Gateway();
+
+  try {
+    await gateway.connect(ccp, {
+      wallet,
+      identity: IDENTITY,
+      discovery: { enabled: true, asLocalhost: true },
+    });
+
+    const network = await gateway.getNetwork(CHANNEL_NAME);
+    const contract = network.getContract(CHAINCODE_NAME);
+    return { contract, gateway };
+  } catch (error) {
+    gateway.disconnect();
+    throw error;
+  }
+}
+
+/**
+ * Long-lived pool of gateway connections shared by all requests.
+ *
+ * Connections are opened lazily, handed out round-robin and replaced when a
+ * transaction fails with a connection-level error. `connect` can be swapped
+ * for a stub returning `{ contract, gateway }` to run without Fabric.
+ */
+class ContractPool {
+  constructor({ size = 1, connect = connectGateway } = {}) {
+    this.size = Math.max(1, size);
+    this.connect = connect;
+    this.slots = new Array(this.size).fill(null);
+    this.next = 0;
+    this.connections = 0;
+  }
+
+  async acquire() {
+    const index = this.next;
+    this.next = (this.next + 1) % this.size;
+
+    if (!this.slots[index]) {
+      // Share one connection attempt between concurrent callers
+      const pending = this.connect().then(
+        (entry) => {
+          this.connections += 1;
+          return entry;
+        },
+        (err) => {
+          if (this.slots[index] === pending) {
+            this.slots[index] = null;
+          }
+          throw err;
+        }
+      );
+      this.slots[index] = pending;
+    }
+    return { index, entry: await this.slots[index] };
+  }
+
+  invalidate(index) {
+    const pending = this.slots[index];
+    this.slots[index] = null;
+    if (pending) {
+      pending.then(({ gateway }) => gateway.disconnect()).catch(() => {});
+    }
+  }
+
+  /**
+   * Run `fn(contract)` on a pooled connection. On a connection-level error the
+   * connection is dropped; with `retry` the call is repeated once on a fresh
+   * one, otherwise the error goes straight to the caller.
+   */
+  async withContract(fn, retry = false) {
+    for (let attempt = 0; ; attempt++) {
+      const { index, entry } = await this.acquire();
+      try {
+        return await fn(entry.contract);
+      } catch (err) {
+        if (!isConnectionError(err)) {
+          throw err;
+        }
+        this.invalidate(index);
+        if (!retry || attempt >= 1) {
+          throw err;
+        }
+      }
+    }
+  }
+
+  // Not retried: a submit that fails after endorsement may still have been
+  // ordered and committed, and resubmitting could record the event twice.
+  submit(name, ...args) {
+    return this.withContract((contract) => contract.submitTransaction(name, ...args));
+  }
+
+  // Queries have no side effects, so they are safe to retry
+  evaluate(name, ...args) {
+    return this.withContract((contract) => contract.evaluateTransaction(name, ...args), true);
+  }
+
+  async close() {
+    for (let i = 0; i < this.size; i++) {
+      this.invalidate(i);
+    }
+  }
+}
+
+module.exports = { ContractPool, connectGateway, isConnectionError };
@@ -1,165 +1,261 @@
 const express = require("express");
-const { Gateway, Wallets } = require("fabric-network");
-const path = require("path");
-const fs = require("fs");
 const cors = require("cors");
 const bodyParser = require("body-parser");
+const { ContractPool } = require("./contractPool");
 
-const app = express();
 const PORT = 4000;
+const POOL_SIZE = parseInt(process.env.GATEWAY_POOL_SIZE || "1", 10);
+const MAX_BATCH_SIZE = parseInt(process.env.MAX_BATCH_SIZE || "500", 10);
+const BULK_CONCURRENCY = parseInt(process.env.BULK_CONCURRENCY || "32", 10);
+// Events written per chaincode recordEvents transaction
+const BULK_TX_SIZE = parseInt(process.env.BULK_TX_SIZE || "50", 10);
 
-app.use(cors());
-app.use(bodyParser.json());
-
-async function getContract() {
-  const ccpPath = path.resolve(
-    __dirname,
-    "..",
-    "blockchain",
-    "fabric-samples",
-    "test-network",
-    "organizations",
-    "peerOrganizations",
-    "org1.example.com",
-    "connection-org1.json"
-  );
+function parseTransactionResult(result) {
+  console.log("Raw transaction result:", result.toString());
+
+  // Handle the result
+  const resultString = result.toString().trim();
+  let responseData;
 
-  // Check if connection profile exists
-  if (!fs.existsSync(ccpPath)) {
-    throw new Error(`Connection profile not found at: ${ccpPath}`);
+  if (resultString && resultString.length > 0) {
+    try {
+      responseData = JSON.parse(resultString);
+      console.log("Parsed response:", responseData);
+    } catch (parseError) {
+      console.log("Result is not valid JSON:", resultString);
+      responseData = {
+        success: true,
+        rawResponse: resultString,
+        message: "Event processed but response format unexpected",
+      };
+    }
+  } else {
+    console.log("Empty response from chaincode");
+    responseData = {
+      success: true,
+      message: "Event recorded (empty response from chaincode)",
+    };
   }
+  return responseData;
+}
 
-  const ccp = JSON.parse(fs.readFileSync(ccpPath, "utf8"));
+function sendError(res, err) {
+  // More specific error handling
+  if (err.message.includes("No valid responses from any peers")) {
+    res.status(503).json({
+      error: "Blockchain network unavailable",
+      details:
+        "Please check if the Fabric network is running and chaincode is deployed",
+      suggestion: "Try: ./network.sh down && ./network.sh up",
+    });
+  } else if (err.message.includes("identity not found")) {
+    res.status(401).json({
+      error: "Authentication failed",
+      details: "User identity not found in wallet",
+      suggestion: "Run: node enrollAdmin.js && node enrollUser.js",
+    });
+  } else if (err.message.includes("Unexpected end of JSON input")) {
+    res.status(500).json({
+      error: "Chaincode response error",
+      details: "Chaincode returned malformed or empty response",
+      suggestion: "Check chaincode logs: docker logs peer0.org1.example.com",
+    });
+  } else {
+    res.status(500).json({
+      error: "Internal server error",
+      details: err.message,
+    });
+  }
+}
 
-  const walletPath = path.join(process.cwd(), "wallet");
-  const wallet = await Wallets.newFileSystemWallet(walletPath);
+// Run `worker(item, index)` over items with at most `limit` running at once,
+// returning per-item { status, value | reason } like Promise.allSettled.
+async function mapSettled(items, limit, worker) {
+  const results = new Array(items.length);
+  let next = 0;
 
-  // Check if user identity exists
-  const userExists = await wallet.get("user4");
-  if (!userExists) {
-    throw new Error(
-      "user4 identity not found in wallet. Please enroll the user first."
-    );
+  async function run() {
+    while (next < items.length) {
+      const index = next++;
+      try {
+        results[index] = { status: "fulfilled", value: await worker(items[index], index) };
+      } catch (reason) {
+        results[index] = { status: "rejected", reason };
+      }
+    }
   }
 
-  const gateway = new Gateway();
+  await Promise.all(
+    Array.from({ length: Math.min(limit, items.length) }, run)
+  );
+  return results;
+}
 
-  try {
-    await gateway.connect(ccp, {
-      wallet,
-      identity: "user4",
-      discovery: { enabled: true, asLocalhost: true },
-    });
+// Build the express app around a ContractPool (or any object with the same
+// submit/evaluate interface, e.g. a stub for benchmarking).
+function createApp(pool) {
+  const app = express();
 
-    const network = await gateway.getNetwork("mychannel");
-    const contract = network.getContract("recordEvent");
-    return { contract, gateway };
-  } catch (error) {
-    gateway.disconnect();
-    throw error;
-  }
-}
+  app.use(cors());
+  app.use(bodyParser.json({ limit: "10mb" }));
+
+  app.post("/api/recordEvent", async (req, res) => {
+    try {
+      console.log("Received request:", req.body);
 
-app.post("/api/recordEvent", async (req, res) => {
-  let gateway;
-  try {
-    console.log("Received request:", req.body);
+      // Validate input
+      if (!req.body || Object.keys(req.body).length === 0) {
+        return res.status(400).json({ error: "Request body cannot be empty" });
+      }
 
-    const { contract, gateway: gw } = await getContract();
-    gateway = gw;
+      console.log("Submitting transaction...");
+      const result = await pool.submit("recordEvent", JSON.stringify(req.body));
+      const responseData = parseTransactionResult(result);
 
-    // Validate input
-    if (!req.body || Object.keys(req.body).length === 0) {
-      return res.status(400).json({ error: "Request body cannot be empty" });
+      res.status(200).json({
+        message: "Transaction completed",
+        data: responseData,
+      });
+    } catch (err) {
+      console.error("Error in recordEvent:", err);
+      console.error("Error stack:", err.stack);
+      sendError(res, err);
     }
+  });
 
-    console.log("Submitting transaction...");
-    const result = await contract.submitTransaction(
-      "recordEvent",
-      JSON.stringify(req.body)
-    );
+  // Bulk endpoint: valid events are grouped into chaincode recordEvents
+  // transactions of BULK_TX_SIZE, submitted over the pooled connections with
+  // bounded concurrency, and a result is reported per event.
+  app.post("/api/recordEvents", async (req, res) => {
+    const events = req.body;
 
-    console.log("Raw transaction result:", result.toString());
+    if (!Array.isArray(events) || events.length === 0) {
+      return res
+        .status(400)
+        .json({ error: "Request body must be a non-empty array of events" });
+    }
+    if (events.length > MAX_BATCH_SIZE) {
+      return res.status(413).json({
+        error: "Batch too large",
+        details: `At most ${MAX_BATCH_SIZE} events per request`,
+      });
+    }
 
-    // Handle the result
-    const resultString = result.toString().trim();
-    let responseData;
+    try {
+      const results = new Array(events.length);
+      const valid = [];
+      events.forEach((event, index) => {
+        if (!event || typeof event !== "object" || Object.keys(event).length === 0) {
+          results[index] = { index, status: "rejected", error: "Event cannot be empty" };
+        } else {
+          valid.push(index);
+        }
+      });
 
-    if (resultString && resultString.length > 0) {
-      try {
-        responseData = JSON.parse(resultString);
-        console.log("Parsed response:", responseData);
-      } catch (parseError) {
-        console.log("Result is not valid JSON:", resultString);
-        responseData = {
-          success: true,
-          rawResponse: resultString,
-          message: "Event processed but response format unexpected",
-        };
+      const transactions = [];
+      for (let i = 0; i < valid.length; i += BULK_TX_SIZE) {
+        transactions.push(valid.slice(i, i + BULK_TX_SIZE));
       }
-    } else {
-      console.log("Empty response from chaincode");
-      responseData = {
-        success: true,
-        message: "Event recorded (empty response from chaincode)",
-      };
-    }
 
-    res.status(200).json({
-      message: "Transaction completed",
-      data: responseData,
-    });
-  } catch (err) {
-    console.error("Error in recordEvent:", err);
-    console.error("Error stack:", err.stack);
-
-    // More specific error handling
-    if (err.message.includes("No valid responses from any peers")) {
-      res.status(503).json({
-        error: "Blockchain network unavailable",
-        details:
-          "Please check if the Fabric network is running and chaincode is deployed",
-        suggestion: "Try: ./network.sh down && ./network.sh up",
+      const settled = await mapSettled(transactions, BULK_CONCURRENCY, (indexes) =>
+        pool.submit("recordEvents", JSON.stringify(indexes.map((i) => events[i])))
+      );
+
+      settled.forEach((outcome, t) => {
+        const indexes = transactions[t];
+        let error = null;
+        let response = null;
+        if (outcome.status === "rejected") {
+          error = outcome.reason.message;
+        } else {
+          response = parseTransactionResult(outcome.value);
+          if (response.success === false || !Array.isArray(response.events)) {
+            error = response.error || "Unexpected chaincode response";
+          }
+        }
+        indexes.forEach((index, j) => {
+          results[index] = error
+            ? { index, status: "rejected", error }
+            : { index, status: "fulfilled", data: { success: true, event: response.events[j] } };
+        });
       });
-    } else if (err.message.includes("identity not found")) {
-      res.status(401).json({
-        error: "Authentication failed",
-        details: "User identity not found in wallet",
-        suggestion: "Run: node enrollAdmin.js && node enrollUser.js",
+
+      const failed = results.filter((r) => r.status === "rejected").length;
+
+      console.log(`Batch of ${events.length} events: ${events.length - failed} recorded, ${failed} failed`);
+      res.status(200).json({
+        message: "Batch processed",
+        succeeded: events.length - failed,
+        failed,
+        results,
       });
-    } else if (err.message.includes("Unexpected end of JSON input")) {
-      res.status(500).json({
-        error: "Chaincode response error",
-        details: "Chaincode returned malformed or empty response",
-        suggestion: "Check chaincode logs: docker logs peer0.org1.example.com",
+    } catch (err) {
+      console.error("Error in recordEvents:", err);
+      sendError(res, err);
+    }
+  });
+
+  // Anchor the Merkle root of a locally logged batch of events
+  app.post("/api/anchorBatch", async (req, res) => {
+    try {
+      const batch = req.body;
+      if (!batch || !batch.root || !batch.source || batch.batch_id === undefined) {
+        return res
+          .status(400)
+          .json({ error: "Batch must include source, batch_id and root" });
+      }
+
+      const result = await pool.submit("anchorBatch", JSON.stringify(batch));
+      const responseData = parseTransactionResult(result);
+      res.status(responseData.success === false ? 409 : 200).json({
+        message: "Batch anchored",
+        data: responseData,
       });
-    } else {
+    } catch (err) {
+      console.error("Error in anchorBatch:", err);
+      sendError(res, err);
+    }
+  });
+
+  app.get("/api/batch/:source/:batchId", async (req, res) => {
+    try {
+      const result = await pool.evaluate("getBatch", req.params.source, req.params.batchId);
+      const responseData = parseTransactionResult(result);
+      res.status(responseData.success === false ? 404 : 200).json({ data: responseData });
+    } catch (err) {
+      console.error("Error in getBatch:", err);
+      sendError(res, err);
+    }
+  });
+
+  // Health check endpoint: a real query round trip through a peer, not just
+  // an open gateway connection
+  app.get("/api/health", async (req, res) => {
+    try {
+      await pool.evaluate("getAllEvents", "1", "");
+      res.status(200).json({ status: "Network connection successful" });
+    } catch (err) {
       res.status(500).json({
-        error: "Internal server error",
-        details: err.message,
+        status: "Network connection failed",
+        error: err.message,
       });
     }
-  } finally {
-    if (gateway) {
-      gateway.disconnect();
-    }
-  }
-});
-
-// Health check endpoint
-app.get("/api/health", async (req, res) => {
-  try {
-    const { contract, gateway } = await getContract();
-    gateway.disconnect();
-    res.status(200).json({ status: "Network connection successful" });
-  } catch (err) {
-    res.status(500).json({
-      status: "Network connection failed",
-      error: err.message,
-    });
-  }
-});
+  });
+
+  return app;
+}
 
-app.listen(PORT, () => {
-  console.log(`🚀 API Server listening at http://localhost:${PORT}`);
-});
+module.exports = { createApp, mapSettled };
+
+if (require.main === module) {
+  const pool = new ContractPool({ size: POOL_SIZE });
+  const server = createApp(pool).listen(PORT, () => {
+    console.log(`🚀 API Server listening at http://localhost:${PORT}`);
+  });
+
+  process.on("SIGINT", async () => {
+    server.close();
+    await pool.close();
+    process.exit(0);
+  });
+}
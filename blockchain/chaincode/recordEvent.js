@@ -1,105 +1,102 @@
 const { Contract } = require('fabric-contract-api');
 const crypto = require('crypto');
 
+// Each event is stored under its own composite key, with empty-valued
+// composite keys as secondary indexes. The single 'EVENTS' array key is only
+// read for ledgers that have not been migrated yet.
+const EVENT_KEY = 'event';
+const BATCH_KEY = 'batch';
+const INDEXES = {
+    ecu: 'ecu~event',
+    attack: 'attack~event',
+    time: 'time~event'
+};
+const LEGACY_EVENTS_KEY = 'EVENTS';
+const TIME_BUCKET_SECONDS = 3600;
+const DEFAULT_PAGE_SIZE = 100;
+const INDEX_VALUE = Buffer.from([0]);
+
 class RecordEvent extends Contract {
     async InitLedger(ctx) {
         console.info('============= START : Initialize Ledger ===========');
-        const events = [];
-        await ctx.stub.putState('EVENTS', Buffer.from(JSON.stringify(events)));
         console.info('============= END : Initialize Ledger ===========');
         return JSON.stringify({ message: 'Ledger initialized successfully', eventsCount: 0 });
     }
 
     async recordEvent(ctx, eventData) {
         console.info('============= START : Record Event ===========');
-        
+
         try {
-            // Parse eventData if it's a string
-            let parsedEventData;
-            if (typeof eventData === 'string') {
-                try {
-                    parsedEventData = JSON.parse(eventData);
-                } catch (parseError) {
-                    parsedEventData = eventData;
-                }
-            } else {
-                parsedEventData = eventData;
-            }
+            const event = this._buildEvent(ctx, this._parseEventData(eventData), `event_${ctx.stub.getTxID()}`);
+            await this._putEvent(ctx, event);
 
-            // Get existing events or initialize empty array
-            let events = [];
-            const eventsBuffer = await ctx.stub.getState('EVENTS');
-            
-            if (eventsBuffer && eventsBuffer.length > 0) {
-                try {
-                    events = JSON.parse(eventsBuffer.toString());
-                } catch (error) {
-                    console.warn('Could not parse existing events, starting fresh');
-                    events = [];
-                }
-            }
-            
-            // Use deterministic values that will be the same across all peers
-            const txId = ctx.stub.getTxID();
-            const timestamp = ctx.stub.getTxTimestamp();
-            
-            const event = {
-                id: `event_${txId}`,
-                timestamp: timestamp.seconds.toString(),
-                timestampNanos: timestamp.nanos.toString(),
-                data: parsedEventData,
-                hash: this._hashEvent(parsedEventData),
-                txId: txId,
-                mspId: ctx.clientIdentity.getMSPID()
-            };
-            
-            events.push(event);
-            await ctx.stub.putState('EVENTS', Buffer.from(JSON.stringify(events)));
-            
             console.info(`Event recorded with ID: ${event.id}`);
             console.info('============= END : Record Event ===========');
-            
+
             return JSON.stringify({
                 success: true,
-                event: event,
-                totalEvents: events.length
+                event: event
             });
 
         } catch (error) {
+            // Throw rather than return an error response: the event and its index keys
+            // are separate writes, and a failure between them must not commit a partial event
             console.error('Error in recordEvent:', error);
-            const errorResponse = {
-                success: false,
-                error: error.message,
-                timestamp: ctx.stub.getTxTimestamp().seconds.toString()
-            };
-            return JSON.stringify(errorResponse);
+            throw error;
+        }
+    }
+
+    async recordEvents(ctx, eventsData) {
+        console.info('============= START : Record Events ===========');
+
+        try {
+            const items = JSON.parse(eventsData);
+            if (!Array.isArray(items)) {
+                throw new Error('recordEvents expects a JSON array of events');
+            }
+
+            const txId = ctx.stub.getTxID();
+            const events = [];
+            for (let i = 0; i < items.length; i++) {
+                const event = this._buildEvent(ctx, items[i], `event_${txId}_${i}`);
+                await this._putEvent(ctx, event);
+                events.push(event);
+            }
+
+            console.info(`Recorded ${events.length} events in transaction ${txId}`);
+            console.info('============= END : Record Events ===========');
+
+            return JSON.stringify({
+                success: true,
+                events: events,
+                count: events.length
+            });
+
+        } catch (error) {
+            // Throw rather than return an error response: the transaction must abort,
+            // or the events written before the failing one would still be committed
+            console.error('Error in recordEvents:', error);
+            throw error;
         }
     }
 
     async verifyEvent(ctx, eventId) {
         console.info('============= START : Verify Event ===========');
-        
+
         try {
-            const eventsBuffer = await ctx.stub.getState('EVENTS');
-            
-            if (!eventsBuffer || eventsBuffer.length === 0) {
-                throw new Error('No events found in ledger');
-            }
+            const event = await this._getEvent(ctx, eventId);
 
-            const events = JSON.parse(eventsBuffer.toString());
-            const event = events.find(e => e.id === eventId);
-            
             if (!event) {
                 throw new Error(`Event with ID ${eventId} not found`);
             }
-            
+
             const currentHash = this._hashEvent(event.data);
             const isValid = currentHash === event.hash;
-            
+
             console.info('============= END : Verify Event ===========');
-            
+
             return JSON.stringify({
-                valid: isValid, 
+                valid: isValid,
                 event: event,
                 currentHash: currentHash,
                 originalHash: event.hash,
@@ -116,23 +113,24 @@ class RecordEvent extends Contract {
         }
     }
 
-    async getAllEvents(ctx) {
+    // Paginated listing of all events; pass the returned bookmark to get the next page.
+    async getAllEvents(ctx, pageSize, bookmark) {
         console.info('============= START : Get All Events ===========');
-        
+
         try {
-            const eventsBuffer = await ctx.stub.getState('EVENTS');
-            
-            if (!eventsBuffer || eventsBuffer.length === 0) {
-                return JSON.stringify({ events: [], count: 0 });
+            const { iterator, metadata } = await ctx.stub.getStateByPartialCompositeKeyWithPagination(
+                EVENT_KEY, [], this._pageSize(pageSize), bookmark || '');
+            const events = [];
+            for await (const record of this._records(iterator)) {
+                events.push(JSON.parse(record.value.toString()));
             }
 
-            const events = JSON.parse(eventsBuffer.toString());
-            
             console.info('============= END : Get All Events ===========');
-            
-            return JSON.stringify({ 
-                events: events, 
+
+            return JSON.stringify({
+                events: events,
                 count: events.length,
+                bookmark: metadata.bookmark,
                 timestamp: ctx.stub.getTxTimestamp().seconds.toString()
             });
 
@@ -147,9 +145,249 @@ class RecordEvent extends Contract {
         }
     }
 
+    // Paginated lookup through a secondary index: index is 'ecu', 'attack' or 'time'.
+    // For 'time', value is a Unix time in seconds; its hour bucket is queried.
+    async queryEvents(ctx, index, value, pageSize, bookmark) {
+        console.info('============= START : Query Events ===========');
+
+        try {
+            const objectType = INDEXES[index];
+            if (!objectType) {
+                throw new Error(`Unknown index ${index}, expected one of ${Object.keys(INDEXES).join(', ')}`);
+            }
+            const key = index === 'time' ? this._timeBucket(value) : String(value);
+
+            const { iterator, metadata } = await ctx.stub.getStateByPartialCompositeKeyWithPagination(
+                objectType, [key], this._pageSize(pageSize), bookmark || '');
+            const events = [];
+            for await (const record of this._records(iterator)) {
+                const { attributes } = ctx.stub.splitCompositeKey(record.key);
+                const event = await this._getEvent(ctx, attributes[1]);
+                if (event) {
+                    events.push(event);
+                }
+            }
+
+            console.info('============= END : Query Events ===========');
+
+            return JSON.stringify({
+                events: events,
+                count: events.length,
+                bookmark: metadata.bookmark,
+                timestamp: ctx.stub.getTxTimestamp().seconds.toString()
+            });
+
+        } catch (error) {
+            console.error('Error in queryEvents:', error);
+            return JSON.stringify({
+                events: [],
+                count: 0,
+                error: error.message,
+                timestamp: ctx.stub.getTxTimestamp().seconds.toString()
+            });
+        }
+    }
+
+    // Anchor the Merkle root of an off-chain batch of events (see scripts/merkle_anchor.py).
+    // Re-submitting the same batch is a no-op; a different root for an anchored batch is rejected.
+    async anchorBatch(ctx, batchData) {
+        console.info('============= START : Anchor Batch ===========');
+
+        try {
+            const batch = JSON.parse(batchData);
+            if (!batch.source || batch.batch_id === undefined || !/^[0-9a-f]{64}$/.test(batch.root)) {
+                throw new Error('Batch must have source, batch_id and a SHA-256 hex root');
+            }
+
+            const key = ctx.stub.createCompositeKey(BATCH_KEY, [String(batch.source), this._batchIdKey(batch.batch_id)]);
+            const existing = await ctx.stub.getState(key);
+            if (existing && existing.length > 0) {
+                const anchored = JSON.parse(existing.toString());
+                if (anchored.root !== batch.root) {
+                    throw new Error(`Batch ${batch.source}/${batch.batch_id} already anchored with a different root`);
+                }
+                return JSON.stringify({ success: true, batch: anchored, alreadyAnchored: true });
+            }
+
+            const timestamp = ctx.stub.getTxTimestamp();
+            const anchored = {
+                id: `batch_${batch.source}_${batch.batch_id}`,
+                source: String(batch.source),
+                batchId: batch.batch_id,
+                root: batch.root,
+                count: batch.count,
+                metadata: batch,
+                timestamp: timestamp.seconds.toString(),
+                txId: ctx.stub.getTxID(),
+                mspId: ctx.clientIdentity.getMSPID()
+            };
+            await ctx.stub.putState(key, Buffer.from(JSON.stringify(anchored)));
+
+            console.info(`Anchored batch ${anchored.id} (${anchored.count} events)`);
+            console.info('============= END : Anchor Batch ===========');
+
+            return JSON.stringify({ success: true, batch: anchored });
+
+        } catch (error) {
+            console.error('Error in anchorBatch:', error);
+            return JSON.stringify({
+                success: false,
+                error: error.message,
+                timestamp: ctx.stub.getTxTimestamp().seconds.toString()
+            });
+        }
+    }
+
+    async getBatch(ctx, source, batchId) {
+        try {
+            const key = ctx.stub.createCompositeKey(BATCH_KEY, [String(source), this._batchIdKey(batchId)]);
+            const buffer = await ctx.stub.getState(key);
+            if (!buffer || buffer.length === 0) {
+                throw new Error(`Batch ${source}/${batchId} not found`);
+            }
+            return JSON.stringify({ success: true, batch: JSON.parse(buffer.toString()) });
+
+        } catch (error) {
+            console.error('Error in getBatch:', error);
+            return JSON.stringify({
+                success: false,
+                error: error.message,
+                timestamp: ctx.stub.getTxTimestamp().seconds.toString()
+            });
+        }
+    }
+
+    // Move up to batchSize events from the legacy 'EVENTS' array to per-event keys.
+    // Call repeatedly until remaining is 0; the legacy key is deleted at the end.
+    async migrateLegacyEvents(ctx, batchSize) {
+        console.info('============= START : Migrate Legacy Events ===========');
+
+        try {
+            const events = await this._getLegacyEvents(ctx);
+            const limit = parseInt(batchSize, 10) || 500;
+            const batch = events.slice(0, limit);
+            const remaining = events.slice(limit);
+
+            for (const event of batch) {
+                await this._putEvent(ctx, event);
+            }
+
+            if (remaining.length > 0) {
+                await ctx.stub.putState(LEGACY_EVENTS_KEY, Buffer.from(JSON.stringify(remaining)));
+            } else if (events.length > 0) {
+                await ctx.stub.deleteState(LEGACY_EVENTS_KEY);
+            }
+
+            console.info('============= END : Migrate Legacy Events ===========');
+
+            return JSON.stringify({
+                success: true,
+                migrated: batch.length,
+                remaining: remaining.length
+            });
+
+        } catch (error) {
+            // Abort the transaction so a partly written batch never leaves events both
+            // under their own keys and in the unchanged legacy array
+            console.error('Error in migrateLegacyEvents:', error);
+            throw error;
+        }
+    }
+
+    _parseEventData(eventData) {
+        // Parse eventData if it's a string
+        if (typeof eventData === 'string') {
+            try {
+                return JSON.parse(eventData);
+            } catch (parseError) {
+                return eventData;
+            }
+        }
+        return eventData;
+    }
+
+    _buildEvent(ctx, data, id) {
+        // Use deterministic values that will be the same across all peers
+        const txId = ctx.stub.getTxID();
+        const timestamp = ctx.stub.getTxTimestamp();
+
+        return {
+            id: id,
+            timestamp: timestamp.seconds.toString(),
+            timestampNanos: timestamp.nanos.toString(),
+            data: data,
+            hash: this._hashEvent(data),
+            txId: txId,
+            mspId: ctx.clientIdentity.getMSPID()
+        };
+    }
+
+    async _putEvent(ctx, event) {
+        const stub = ctx.stub;
+        await stub.putState(stub.createCompositeKey(EVENT_KEY, [event.id]), Buffer.from(JSON.stringify(event)));
+
+        const data = event.data && typeof event.data === 'object' ? event.data : {};
+        const source = data.ecu_id || data.source_ip || 'unknown';
+        const attack = data.attack_type || (data.message && data.message.type) || 'unknown';
+
+        await stub.putState(stub.createCompositeKey(INDEXES.ecu, [String(source), event.id]), INDEX_VALUE);
+        await stub.putState(stub.createCompositeKey(INDEXES.attack, [String(attack), event.id]), INDEX_VALUE);
+        await stub.putState(
+            stub.createCompositeKey(INDEXES.time, [this._timeBucket(event.timestamp), event.id]), INDEX_VALUE);
+    }
+
+    async _getEvent(ctx, eventId) {
+        const buffer = await ctx.stub.getState(ctx.stub.createCompositeKey(EVENT_KEY, [eventId]));
+        if (buffer && buffer.length > 0) {
+            return JSON.parse(buffer.toString());
+        }
+        // Not migrated yet: fall back to the legacy array
+        const legacy = await this._getLegacyEvents(ctx);
+        return legacy.find(e => e.id === eventId) || null;
+    }
+
+    async _getLegacyEvents(ctx) {
+        const eventsBuffer = await ctx.stub.getState(LEGACY_EVENTS_KEY);
+        if (!eventsBuffer || eventsBuffer.length === 0) {
+            return [];
+        }
+        return JSON.parse(eventsBuffer.toString());
+    }
+
+    async *_records(iterator) {
+        try {
+            while (true) {
+                const result = await iterator.next();
+                if (result.value && result.value.key) {
+                    yield result.value;
+                }
+                if (result.done) {
+                    break;
+                }
+            }
+        } finally {
+            await iterator.close();
+        }
+    }
+
+    _pageSize(pageSize) {
+        const size = parseInt(pageSize, 10);
+        return size > 0 ? size : DEFAULT_PAGE_SIZE;
+    }
+
+    _batchIdKey(batchId) {
+        return String(batchId).padStart(12, '0');
+    }
+
+    // Zero-padded so buckets sort lexically in time order
+    _timeBucket(seconds) {
+        const bucket = Math.floor(Number(seconds) / TIME_BUCKET_SECONDS) * TIME_BUCKET_SECONDS;
+        return String(bucket).padStart(12, '0');
+    }
+
     _hashEvent(data) {
         return crypto.createHash('sha256').update(JSON.stringify(data)).digest('hex');
     }
 }
 
-module.exports = RecordEvent;
\ No newline at end of file
+module.exports = RecordEvent;
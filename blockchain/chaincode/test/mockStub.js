@@ -0,0 +1,122 @@
+'use strict';
+
+// In-memory stand-in for the Fabric chaincode stub, enough for RecordEvent.
+// Like a peer, reads inside a transaction see the committed world state only;
+// writes go to the transaction's write set, which invoke() commits when the
+// call returns and discards when it throws.
+
+const SEPARATOR = '\u0000';
+
+class MockIterator {
+    constructor(records) {
+        this.records = records;
+        this.position = 0;
+        this.closed = false;
+    }
+
+    async next() {
+        if (this.position >= this.records.length) {
+            return { value: undefined, done: true };
+        }
+        const value = this.records[this.position++];
+        return { value, done: false };
+    }
+
+    async close() {
+        this.closed = true;
+    }
+}
+
+class MockStub {
+    constructor(world, txId, seconds) {
+        this.world = world;
+        this.txId = txId;
+        this.seconds = seconds;
+        this.writes = new Map();
+        // Set to a function(key) returning true to make putState fail for that key
+        this.failPut = null;
+    }
+
+    getTxID() {
+        return this.txId;
+    }
+
+    getTxTimestamp() {
+        return { seconds: this.seconds, nanos: 0 };
+    }
+
+    async getState(key) {
+        return this.world.get(key) || Buffer.alloc(0);
+    }
+
+    async putState(key, value) {
+        if (this.failPut && this.failPut(key)) {
+            throw new Error(`putState failed for ${key}`);
+        }
+        this.writes.set(key, Buffer.from(value));
+    }
+
+    async deleteState(key) {
+        this.writes.set(key, null);
+    }
+
+    // Like the Fabric shim, attributes may not contain U+0000
+    createCompositeKey(objectType, attributes) {
+        for (const attribute of attributes) {
+            if (String(attribute).includes(SEPARATOR)) {
+                throw new Error(`Composite key attribute ${JSON.stringify(attribute)} contains U+0000`);
+            }
+        }
+        return SEPARATOR + objectType + SEPARATOR + attributes.map(a => a + SEPARATOR).join('');
+    }
+
+    splitCompositeKey(key) {
+        const parts = key.split(SEPARATOR);
+        return { objectType: parts[1], attributes: parts.slice(2, -1) };
+    }
+
+    // The bookmark is the key the next page starts at ('' after the last page)
+    async getStateByPartialCompositeKeyWithPagination(objectType, attributes, pageSize, bookmark) {
+        const prefix = this.createCompositeKey(objectType, attributes);
+        const keys = [...this.world.keys()].filter(k => k.startsWith(prefix) && (!bookmark || k >= bookmark)).sort();
+        const page = keys.slice(0, pageSize);
+        const records = page.map(key => ({ key, value: this.world.get(key) }));
+        return {
+            iterator: new MockIterator(records),
+            metadata: { fetchedRecordsCount: records.length, bookmark: keys.length > pageSize ? keys[pageSize] : '' }
+        };
+    }
+}
+
+class MockLedger {
+    constructor() {
+        this.world = new Map();
+        this.transactions = 0;
+        this.seconds = 1700000000;
+    }
+
+    // Run contract[fn](ctx, ...args) as one transaction; prepare(stub) can set failPut
+    async invoke(contract, fn, args = [], prepare = null) {
+        this.transactions += 1;
+        const stub = new MockStub(this.world, `tx${this.transactions}`, this.seconds);
+        if (prepare) {
+            prepare(stub);
+        }
+        const ctx = { stub, clientIdentity: { getMSPID: () => 'Org1MSP' } };
+        const result = await contract[fn](ctx, ...args);
+        for (const [key, value] of stub.writes) {
+            if (value === null) {
+                this.world.delete(key);
+            } else {
+                this.world.set(key, value);
+            }
+        }
+        return JSON.parse(result);
+    }
+
+    keys(objectType) {
+        return [...this.world.keys()].filter(k => k.startsWith(SEPARATOR + objectType + SEPARATOR));
+    }
+}
+
+module.exports = { MockStub, MockLedger };
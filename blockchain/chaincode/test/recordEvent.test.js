@@ -0,0 +1,152 @@
+'use strict';
+
+const test = require('node:test');
+const assert = require('node:assert');
+
+const RecordEvent = require('../recordEvent');
+const { MockLedger } = require('./mockStub');
+
+function alert(i, extra = {}) {
+    return { ecu_id: `ECU_${i % 3}`, attack_type: i % 2 ? 'DoS' : 'Fuzzy', seq: i, ...extra };
+}
+
+test('recordEvent stores the event under its own key with ecu, attack and time indexes', async () => {
+    const ledger = new MockLedger();
+    const contract = new RecordEvent();
+
+    const result = await ledger.invoke(contract, 'recordEvent', [JSON.stringify(alert(1))]);
+    assert.strictEqual(result.success, true);
+    assert.strictEqual(result.event.id, 'event_tx1');
+    assert.strictEqual(ledger.keys('event').length, 1);
+    assert.strictEqual(ledger.keys('ecu~event').length, 1);
+    assert.strictEqual(ledger.keys('attack~event').length, 1);
+    assert.strictEqual(ledger.keys('time~event').length, 1);
+
+    const verified = await ledger.invoke(contract, 'verifyEvent', ['event_tx1']);
+    assert.strictEqual(verified.valid, true);
+});
+
+test('recordEvent aborts without partial writes when an index key cannot be built', async () => {
+    const ledger = new MockLedger();
+    const contract = new RecordEvent();
+
+    await assert.rejects(
+        ledger.invoke(contract, 'recordEvent', [JSON.stringify(alert(1, { ecu_id: 'ECU\u0000X' }))]),
+        /U\+0000/);
+    assert.strictEqual(ledger.world.size, 0);
+
+    await assert.rejects(
+        ledger.invoke(contract, 'recordEvent', [JSON.stringify(alert(2))],
+            stub => { stub.failPut = key => key.startsWith('\u0000time~event'); }),
+        /putState failed/);
+    assert.strictEqual(ledger.world.size, 0);
+});
+
+test('getAllEvents pages through every event exactly once with bookmarks', async () => {
+    const ledger = new MockLedger();
+    const contract = new RecordEvent();
+    for (let i = 0; i < 7; i++) {
+        await ledger.invoke(contract, 'recordEvent', [JSON.stringify(alert(i))]);
+    }
+
+    const seen = [];
+    let bookmark = '';
+    let pages = 0;
+    do {
+        const page = await ledger.invoke(contract, 'getAllEvents', ['3', bookmark]);
+        assert.ok(page.count <= 3);
+        seen.push(...page.events.map(e => e.data.seq));
+        bookmark = page.bookmark;
+        pages += 1;
+    } while (bookmark);
+
+    assert.strictEqual(pages, 3);
+    assert.deepStrictEqual(seen.sort(), [0, 1, 2, 3, 4, 5, 6]);
+});
+
+test('queryEvents looks events up through each secondary index', async () => {
+    const ledger = new MockLedger();
+    const contract = new RecordEvent();
+    await ledger.invoke(contract, 'recordEvents', [JSON.stringify([0, 1, 2, 3, 4, 5].map(i => alert(i)))]);
+
+    const byEcu = await ledger.invoke(contract, 'queryEvents', ['ecu', 'ECU_1', '10', '']);
+    assert.deepStrictEqual(byEcu.events.map(e => e.data.seq).sort(), [1, 4]);
+
+    const byAttack = await ledger.invoke(contract, 'queryEvents', ['attack', 'DoS', '2', '']);
+    assert.strictEqual(byAttack.count, 2);
+    assert.ok(byAttack.bookmark);
+    const rest = await ledger.invoke(contract, 'queryEvents', ['attack', 'DoS', '2', byAttack.bookmark]);
+    assert.deepStrictEqual([...byAttack.events, ...rest.events].map(e => e.data.seq).sort(), [1, 3, 5]);
+
+    const byTime = await ledger.invoke(contract, 'queryEvents', ['time', String(ledger.seconds + 60), '10', '']);
+    assert.strictEqual(byTime.count, 6);
+
+    const unknown = await ledger.invoke(contract, 'queryEvents', ['colour', 'red', '10', '']);
+    assert.strictEqual(unknown.count, 0);
+    assert.match(unknown.error, /Unknown index/);
+});
+
+test('recordEvents writes one event per item with IDs derived from the transaction', async () => {
+    const ledger = new MockLedger();
+    const contract = new RecordEvent();
+
+    const result = await ledger.invoke(contract, 'recordEvents', [JSON.stringify([alert(0), alert(1), alert(2)])]);
+    assert.strictEqual(result.success, true);
+    assert.deepStrictEqual(result.events.map(e => e.id), ['event_tx1_0', 'event_tx1_1', 'event_tx1_2']);
+    assert.strictEqual(ledger.keys('event').length, 3);
+});
+
+test('recordEvents aborts the whole transaction when one item fails', async () => {
+    const ledger = new MockLedger();
+    const contract = new RecordEvent();
+    const items = [alert(0), alert(1), alert(2, { ecu_id: 'BROKEN' }), alert(3)];
+
+    await assert.rejects(
+        ledger.invoke(contract, 'recordEvents', [JSON.stringify(items)],
+            stub => { stub.failPut = key => key.includes('BROKEN'); }),
+        /putState failed/);
+    assert.strictEqual(ledger.world.size, 0);
+
+    await assert.rejects(ledger.invoke(contract, 'recordEvents', ['{"not": "an array"}']), /JSON array/);
+    assert.strictEqual(ledger.world.size, 0);
+});
+
+test('migrateLegacyEvents moves the legacy array to per-event keys in batches', async () => {
+    const ledger = new MockLedger();
+    const contract = new RecordEvent();
+    const legacy = [0, 1, 2, 3, 4].map(i => ({
+        id: `event_legacy${i}`, timestamp: String(ledger.seconds), data: alert(i), hash: 'x', txId: `legacy${i}`
+    }));
+    ledger.world.set('EVENTS', Buffer.from(JSON.stringify(legacy)));
+
+    // Not migrated yet: lookups fall back to the legacy array
+    const before = await ledger.invoke(contract, 'verifyEvent', ['event_legacy3']);
+    assert.strictEqual(before.event.data.seq, 3);
+
+    const remaining = [];
+    for (let i = 0; i < 3; i++) {
+        const result = await ledger.invoke(contract, 'migrateLegacyEvents', ['2']);
+        remaining.push(result.remaining);
+    }
+    assert.deepStrictEqual(remaining, [3, 1, 0]);
+    assert.strictEqual(ledger.world.has('EVENTS'), false);
+
+    const all = await ledger.invoke(contract, 'getAllEvents', ['10', '']);
+    assert.deepStrictEqual(all.events.map(e => e.id).sort(), legacy.map(e => e.id));
+});
+
+test('migrateLegacyEvents leaves the ledger untouched when a batch fails', async () => {
+    const ledger = new MockLedger();
+    const contract = new RecordEvent();
+    const legacy = [0, 1, 2].map(i => ({
+        id: `event_legacy${i}`, timestamp: String(ledger.seconds), data: alert(i), hash: 'x', txId: `legacy${i}`
+    }));
+    ledger.world.set('EVENTS', Buffer.from(JSON.stringify(legacy)));
+
+    await assert.rejects(
+        ledger.invoke(contract, 'migrateLegacyEvents', ['10'],
+            stub => { stub.failPut = key => key.includes('event_legacy2'); }),
+        /putState failed/);
+    assert.deepStrictEqual([...ledger.world.keys()], ['EVENTS']);
+    assert.strictEqual(JSON.parse(ledger.world.get('EVENTS').toString()).length, 3);
+});
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Asynchronous Alert Forwarder
+Forwards alert events to the blockchain API server from an asyncio event loop
+with a pooled aiohttp client. Parsing and sending are decoupled by a bounded
+queue; a fixed number of workers keep requests in flight, failed requests are
+retried with exponential backoff and full jitter, and events that still cannot
+be delivered (API server down) are spilled to a JSONL file on disk and replayed
+once the server accepts requests again. An optional on_delivered callback is
+called with each event the server accepted (used to mark anchored batches).
+"""
+
+import asyncio
+import json
+import os
+import random
+import time
+from collections import deque
+from pathlib import Path
+
+import aiohttp
+
+DEFAULT_URL = "http://localhost:4000/api/recordEvent"
+
+class ForwarderStats:
+    """Counters and a rolling latency window for an AlertForwarder"""
+
+    def __init__(self, latency_window=10000):
+        self.enqueued = 0
+        self.sent = 0
+        self.rejected = 0
+        self.retries = 0
+        self.dropped = 0
+        self.spilled = 0
+        self.replayed = 0
+        self.in_flight = 0
+        self.latencies = deque(maxlen=latency_window)
+
+    def snapshot(self, queue_depth):
+        latencies = sorted(self.latencies)
+
+        def percentile(p):
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))] * 1000, 2)
+
+        return {
+            "queue_depth": queue_depth,
+            "in_flight": self.in_flight,
+            "enqueued": self.enqueued,
+            "sent": self.sent,
+            "rejected": self.rejected,
+            "retries": self.retries,
+            "dropped": self.dropped,
+            "spilled": self.spilled,
+            "replayed": self.replayed,
+            "latency_ms": {"p50": percentile(50), "p95": percentile(95), "p99": percentile(99)},
+        }
+
+class AlertForwarder:
+    """
+    Pooled, concurrent sender with backpressure.
+
+    Coroutine API: await start(), await submit(event), await close().
+    From other threads (e.g. a watchdog handler) use submit_threadsafe(), which
+    blocks the calling thread while the queue is full.
+    """
+
+    def __init__(self, url=DEFAULT_URL, concurrency=8, queue_size=10000, max_retries=5,
+                 backoff_base=0.2, backoff_max=10.0, timeout=10.0, spill_path=None,
+                 replay_interval=30.0, on_delivered=None):
+        self.url = url
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.spill_path = Path(spill_path) if spill_path else None
+        self.replay_interval = replay_interval
+        self.on_delivered = on_delivered
+        self.stats = ForwarderStats()
+
+        self.loop = None
+        self._queue = None
+        self._session = None
+        self._tasks = []
+        self._last_spill = 0.0
+
+    async def start(self):
+        self.loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.concurrency),
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            headers={'Content-Type': 'application/json'}
+        )
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+        if self.spill_path:
+            self._tasks.append(asyncio.create_task(self._replay_loop()))
+        return self
+
+    @property
+    def queue_depth(self):
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def submit(self, event):
+        """Queue an event, waiting while the queue is full"""
+        await self._queue.put(event)
+        self.stats.enqueued += 1
+
+    def submit_nowait(self, event):
+        """Queue an event without waiting; spill (or drop) it if the queue is full"""
+        try:
+            self._queue.put_nowait(event)
+            self.stats.enqueued += 1
+            return True
+        except asyncio.QueueFull:
+            self._spill([event])
+            return False
+
+    def submit_threadsafe(self, event):
+        """Queue an event from another thread, blocking it while the queue is full"""
+        asyncio.run_coroutine_threadsafe(self.submit(event), self.loop).result()
+
+    async def join(self):
+        """Wait until every queued event has been sent, rejected or spilled"""
+        await self._queue.join()
+
+    async def close(self, drain=True):
+        if drain:
+            await self.join()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        # Anything still queued (drain=False) is kept on disk rather than lost
+        leftover = []
+        while not self._queue.empty():
+            leftover.append(self._queue.get_nowait())
+            self._queue.task_done()
+        self._spill(leftover)
+        await self._session.close()
+
+    def snapshot(self):
+        return self.stats.snapshot(self.queue_depth)
+
+    async def _worker(self):
+        while True:
+            event = await self._queue.get()
+            try:
+                if not await self._send_with_retries(event):
+                    self._spill([event])
+            except asyncio.CancelledError:
+                # close(drain=False) cancelled us mid-send or in retry backoff:
+                # keep the event on disk instead of losing it
+                self._spill([event])
+                raise
+            finally:
+                self._queue.task_done()
+
+    async def _send_with_retries(self, event):
+        """Return True if the event was delivered or permanently rejected, False if the server is unreachable"""
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self.stats.retries += 1
+                delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+                await asyncio.sleep(random.uniform(0, delay))
+
+            start = time.perf_counter()
+            self.stats.in_flight += 1
+            try:
+                async with self._session.post(self.url, data=json.dumps(event)) as response:
+                    await response.read()
+                    status = response.status
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                continue
+            finally:
+                self.stats.in_flight -= 1
+
+            if status < 400:
+                self.stats.sent += 1
+                self.stats.latencies.append(time.perf_counter() - start)
+                if self.on_delivered is not None:
+                    self.on_delivered(event)
+                return True
+            if status != 429 and status < 500:
+                # The server understood and refused the event; retrying will not help
+                self.stats.rejected += 1
+                print(f"Alert rejected by API server: {status}")
+                return True
+        return False
+
+    def _spill(self, events):
+        if not events:
+            return
+        if self.spill_path is None:
+            self.stats.dropped += len(events)
+            return
+        self.spill_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.spill_path, "a") as f:
+            for event in events:
+                f.write(json.dumps(event) + "\n")
+        self.stats.spilled += len(events)
+        self._last_spill = time.monotonic()
+
+    async def _replay_loop(self):
+        replay_path = self.spill_path.with_name(self.spill_path.name + ".replay")
+        while True:
+            await asyncio.sleep(self.replay_interval)
+            # Only replay once the server has stopped failing for a full interval
+            if time.monotonic() - self._last_spill < self.replay_interval:
+                continue
+            if not replay_path.exists():
+                if not self.spill_path.exists() or self.spill_path.stat().st_size == 0:
+                    continue
+                os.replace(self.spill_path, replay_path)
+            with open(replay_path) as f:
+                for line in f:
+                    if line.strip():
+                        await self.submit(json.loads(line))
+                        self.stats.replayed += 1
+            replay_path.unlink()
+
+async def report_stats(forwarder, interval):
+    """Print forwarder counters every interval seconds"""
+    while True:
+        await asyncio.sleep(interval)
+        print(f"Forwarder stats: {json.dumps(forwarder.snapshot())}")
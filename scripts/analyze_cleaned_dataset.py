@@ -3,26 +3,34 @@
 Dataset Analysis Script
 This script analyzes the cleaned_iov.csv dataset to understand its structure,
 time range, and proportion of malicious entries.
+
+With --stream the dataset is read in one chunked pass with constant memory
+(running statistics instead of whole-column operations), and the summary is
+cached next to the dataset, keyed by file size and modification time, so a
+repeat run on an unchanged file returns immediately.
 """
 
+import json
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import os
 import sys
 
+from iov_binary import dataset_size, is_binary_dataset, read_chunks, read_dataset
+
 def analyze_dataset(csv_path):
     """Analyze the dataset and print useful information"""
     print(f"\n=== ANALYZING DATASET: {csv_path} ===\n")
     
     try:
         # Load the dataset
-        df = pd.read_csv(csv_path)
+        df = read_dataset(csv_path)
         print(f"Dataset loaded successfully with {len(df)} rows and {len(df.columns)} columns.")
         
         # Check basic information
         print("\n--- BASIC INFORMATION ---")
-        print(f"File size: {os.path.getsize(csv_path) / (1024*1024):.2f} MB")
+        print(f"File size: {dataset_size(csv_path) / (1024*1024):.2f} MB")
         print(f"Columns: {', '.join(df.columns)}")
         
         # Check for null values
@@ -99,12 +107,244 @@ def analyze_dataset(csv_path):
         print(f"Error analyzing dataset: {str(e)}")
         return None
 
+class RunningStats:
+    """Count/mean/variance/min/max merged chunk by chunk (Welford updates combined with Chan's formula)"""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = None
+        self.max = None
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return
+        n = len(values)
+        mean = values.mean()
+        m2 = ((values - mean) ** 2).sum()
+        total = self.count + n
+        delta = mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += m2 + delta ** 2 * self.count * n / total
+        self.count = total
+        self.min = float(values.min()) if self.min is None else min(self.min, float(values.min()))
+        self.max = float(values.max()) if self.max is None else max(self.max, float(values.max()))
+
+    def to_dict(self):
+        std = float(np.sqrt(self.m2 / (self.count - 1))) if self.count > 1 else None
+        return {"count": self.count, "mean": self.mean if self.count else None, "std": std,
+                "min": self.min, "max": self.max}
+
+def _add_counts(totals, counts):
+    for key, value in counts.items():
+        key = str(key)
+        totals[key] = totals.get(key, 0) + int(value)
+
+def _cache_path(csv_path):
+    return f"{csv_path}.summary.json"
+
+def _cache_key(csv_path, bucket_seconds):
+    stat = os.stat(os.path.join(csv_path, "meta.json") if is_binary_dataset(csv_path) else csv_path)
+    return {"size": dataset_size(csv_path), "mtime_ns": stat.st_mtime_ns, "bucket_seconds": bucket_seconds}
+
+def analyze_dataset_streaming(csv_path, chunk_size=500_000, bucket_seconds=900, use_cache=True):
+    """
+    Single-pass, constant-memory analysis of the dataset. Returns a summary
+    dict; memory grows only with the number of distinct attack types, CAN IDs
+    and time buckets, never with the number of rows.
+    """
+    key = _cache_key(csv_path, bucket_seconds)
+    cache_path = _cache_path(csv_path)
+    if use_cache and os.path.exists(cache_path):
+        try:
+            with open(cache_path) as f:
+                cached = json.load(f)
+            if cached.get("key") == key:
+                print(f"Using cached summary {cache_path}")
+                return cached["summary"]
+        except (OSError, json.JSONDecodeError):
+            pass
+
+    rows = 0
+    columns = None
+    dtypes = {}
+    nulls = {}
+    numeric = {}
+    inter_arrival = RunningStats()
+    first_ts = last_ts = None
+    buckets = {}
+    buckets_malicious = {}
+    attack_types = {}
+    attack_types_malicious = {}
+    can_ids = {}
+    can_ids_malicious = {}
+    malicious = 0
+    head = tail = None
+
+    for chunk in read_chunks(csv_path, chunk_size):
+        if columns is None:
+            columns = list(chunk.columns)
+            dtypes = {col: str(dtype) for col, dtype in chunk.dtypes.items()}
+            head = chunk.head(5)
+        tail = chunk.tail(5)
+        rows += len(chunk)
+        _add_counts(nulls, chunk.isnull().sum())
+        for col in chunk.select_dtypes(include='number').columns:
+            numeric.setdefault(col, RunningStats()).update(chunk[col].to_numpy())
+
+        is_mal = chunk['is_malicious'].to_numpy() == 1 if 'is_malicious' in chunk else np.zeros(len(chunk), bool)
+        malicious += int(is_mal.sum())
+
+        if 'timestamp' in chunk:
+            ts = chunk['timestamp'].to_numpy(dtype=np.float64)
+            if first_ts is None and len(ts):
+                first_ts = ts[0]
+            # Carry the previous chunk's last timestamp so the first gap of each chunk is counted
+            inter_arrival.update(np.diff(ts) if last_ts is None else np.diff(np.r_[last_ts, ts]))
+            last_ts = ts[-1] if len(ts) else last_ts
+
+            index = np.floor((ts - first_ts) / bucket_seconds).astype(np.int64)
+            _add_counts(buckets, pd.Series(index).value_counts())
+            _add_counts(buckets_malicious, pd.Series(index[is_mal]).value_counts())
+
+        if 'attack_type' in chunk:
+            _add_counts(attack_types, chunk['attack_type'].value_counts(dropna=False))
+            _add_counts(attack_types_malicious, chunk.loc[is_mal, 'attack_type'].value_counts(dropna=False))
+        if 'can_id' in chunk:
+            _add_counts(can_ids, chunk['can_id'].value_counts())
+            _add_counts(can_ids_malicious, chunk.loc[is_mal, 'can_id'].value_counts())
+
+    summary = {
+        "path": csv_path,
+        "file_size_mb": round(key["size"] / (1024 * 1024), 2),
+        "rows": rows,
+        "columns": columns or [],
+        "dtypes": dtypes,
+        "null_counts": {col: count for col, count in nulls.items() if count},
+        "timestamp": {
+            "min": numeric["timestamp"].min if "timestamp" in numeric else None,
+            "max": numeric["timestamp"].max if "timestamp" in numeric else None,
+            "inter_arrival": inter_arrival.to_dict()
+        },
+        "time_buckets": {
+            "bucket_seconds": bucket_seconds,
+            "start": first_ts,
+            "counts": {
+                str(k): {"entries": buckets[k], "malicious": buckets_malicious.get(k, 0)}
+                for k in sorted(buckets, key=int)
+            }
+        },
+        "malicious": {"count": malicious, "ratio": malicious / rows if rows else None},
+        "attack_types": {
+            k: {"entries": v, "malicious": attack_types_malicious.get(k, 0)} for k, v in attack_types.items()
+        },
+        "can_ids": {
+            k: {"entries": v, "malicious": can_ids_malicious.get(k, 0),
+                "malicious_ratio": can_ids_malicious.get(k, 0) / v}
+            for k, v in can_ids.items()
+        },
+        "numeric": {col: stats.to_dict() for col, stats in numeric.items()},
+        "head": head.to_dict(orient='records') if head is not None else [],
+        "tail": tail.to_dict(orient='records') if tail is not None else []
+    }
+
+    if use_cache:
+        tmp_path = f"{cache_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({"key": key, "summary": summary}, f, default=str)
+        os.replace(tmp_path, cache_path)
+    return summary
+
+def print_summary(summary, top=10):
+    """Print a streaming summary in the same layout as analyze_dataset"""
+    rows = summary["rows"]
+    print(f"\n=== ANALYZING DATASET: {summary['path']} ===\n")
+    print(f"Dataset scanned with {rows} rows and {len(summary['columns'])} columns.")
+
+    print("\n--- BASIC INFORMATION ---")
+    print(f"File size: {summary['file_size_mb']:.2f} MB")
+    print(f"Columns: {', '.join(summary['columns'])}")
+
+    if summary["null_counts"]:
+        print("\n--- NULL VALUES ---")
+        for col, count in summary["null_counts"].items():
+            print(f"Column '{col}' has {count} null values ({count/rows*100:.2f}%)")
+    else:
+        print("\nNo null values found in the dataset.")
+
+    timestamp = summary["timestamp"]
+    if timestamp["min"] is not None:
+        gaps = timestamp["inter_arrival"]
+        print("\n--- TIMESTAMP ANALYSIS ---")
+        print(f"Timestamp data type: {summary['dtypes'].get('timestamp')}")
+        print(f"Timestamp range: {timestamp['min']} to {timestamp['max']}")
+        print(f"Timestamp span: {timestamp['max'] - timestamp['min']:.2f}")
+        if gaps["count"]:
+            print(f"Average time between entries: {gaps['mean']:.4f} seconds")
+            print(f"Minimum time between entries: {gaps['min']:.4f} seconds")
+            print(f"Maximum time between entries: {gaps['max']:.4f} seconds")
+
+        buckets = summary["time_buckets"]
+        size = buckets["bucket_seconds"]
+        print(f"\nDistribution by {size:g}s buckets (from the first timestamp):")
+        for index, counts in buckets["counts"].items():
+            start = int(index) * size
+            print(f"  {start:g}-{start + size:g}s: {counts['entries']} entries ({counts['entries']/rows*100:.2f}%), "
+                  f"{counts['malicious']} malicious")
+
+    print("\n--- MALICIOUS ENTRIES ANALYSIS ---")
+    malicious = summary["malicious"]["count"]
+    if rows:
+        print(f"Total malicious entries: {malicious} ({malicious/rows*100:.2f}%)")
+        print(f"Total normal entries: {rows - malicious} ({(rows - malicious)/rows*100:.2f}%)")
+
+    if summary["attack_types"]:
+        print("\nEntries by attack type:")
+        for attack_type, counts in sorted(summary["attack_types"].items(), key=lambda kv: -kv[1]["entries"]):
+            print(f"  {attack_type}: {counts['entries']} entries, {counts['malicious']} malicious")
+
+    if summary["can_ids"]:
+        print(f"\nTop {top} CAN IDs ({len(summary['can_ids'])} distinct):")
+        ranked = sorted(summary["can_ids"].items(), key=lambda kv: -kv[1]["entries"])[:top]
+        for can_id, counts in ranked:
+            print(f"  {can_id}: {counts['entries']} entries, malicious ratio {counts['malicious_ratio']:.2%}")
+
+    print("\n--- DATA SAMPLE ---")
+    print("\nFirst 5 rows:")
+    print(pd.DataFrame(summary["head"]).to_string())
+    print("\nLast 5 rows:")
+    print(pd.DataFrame(summary["tail"]).to_string())
+
+    print("\n--- NUMERICAL STATISTICS ---")
+    print(pd.DataFrame(summary["numeric"]).to_string())
+
+    print("\n=== ANALYSIS COMPLETE ===\n")
+
 if __name__ == "__main__":
-    # Use command line argument or default path
-    csv_path = sys.argv[1] if len(sys.argv) > 1 else 'data/cleaned_iov.csv'
-    
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Analyze the cleaned IoV dataset')
+    parser.add_argument('csv_path', nargs='?', default='data/cleaned_iov.csv',
+                        help='Path to the cleaned CSV (or a binary dataset directory from iov_binary.py)')
+    parser.add_argument('--stream', action='store_true',
+                        help='Single chunked pass with constant memory and a cached summary')
+    parser.add_argument('--chunk-size', type=int, default=500_000, help='Rows per chunk in streaming mode')
+    parser.add_argument('--bucket-seconds', type=float, default=900,
+                        help='Width of the time distribution buckets in streaming mode')
+    parser.add_argument('--no-cache', action='store_true', help='Ignore and do not write the cached summary')
+    args = parser.parse_args()
+
+    csv_path = args.csv_path
+
     if not os.path.exists(csv_path):
         print(f"Error: File {csv_path} does not exist.")
         sys.exit(1)
-        
-    analyze_dataset(csv_path)
\ No newline at end of file
+
+    if args.stream:
+        print_summary(analyze_dataset_streaming(csv_path, args.chunk_size, args.bucket_seconds,
+                                                use_cache=not args.no_cache))
+    else:
+        analyze_dataset(csv_path)
\ No newline at end of file
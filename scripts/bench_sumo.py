@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Simulation Loop Benchmarks
+Runs run_simulation (inject_sumo.py) end to end against the in-process
+stand-in TraCI backend (fake_traci.py), so the cost of the simulation hot
+path can be measured without SUMO and compared between revisions.
+
+Three benchmarks, each a small grid of runs on a synthetic dataset:
+
+    vehicles   steps/sec as the number of vehicles in the network grows,
+               for poll and subscribe telemetry
+    injection  injection throughput (vehicles/sec spent in the inject phase)
+               as the dataset grows
+    logging    traffic logging cost (microseconds per logged record, telemetry
+               plus sink) as the log interval shrinks
+
+Each run's per-phase timings come from its metrics.json (sim_metrics.py).
+The results are written as JSON; pass an earlier results file as --baseline
+to print the change against it and exit non-zero on a regression.
+
+Example:
+    python3 scripts/bench_sumo.py --report logs/bench.json
+    python3 scripts/bench_sumo.py --quick --baseline logs/bench.json --latency 50e-6
+"""
+
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from fake_traci import FakeTraci, install
+from sim_metrics import configure_logging
+from sweep_sumo import expand_grid
+from traffic_sink import TrafficLogReader
+
+BENCHMARKS = {
+    "vehicles": {
+        "grid": {"background_vehicles": [0, 100, 1000, 5000], "telemetry_mode": ["poll", "subscribe"]},
+        "fixed": {"dataset_rows": 200, "duration": 120, "log_interval": 1},
+        "metric": "steps_per_sec"
+    },
+    "injection": {
+        "grid": {"dataset_rows": [1_000, 10_000, 50_000]},
+        "fixed": {"background_vehicles": 0, "duration": 300, "log_interval": 10, "telemetry_mode": "subscribe"},
+        "metric": "inject_per_sec"
+    },
+    "logging": {
+        "grid": {"log_interval": [0.1, 1, 10]},
+        "fixed": {"dataset_rows": 200, "background_vehicles": 1000, "duration": 60, "telemetry_mode": "subscribe"},
+        "metric": "log_us_per_record",
+        "lower_is_better": True
+    }
+}
+
+# --quick divides dataset sizes, vehicle counts and durations by this factor
+QUICK_FACTOR = 10
+
+def make_dataset(path, rows, malicious_fraction=0.3, seed=0):
+    """Write a synthetic cleaned dataset CSV (one row per second, like cleaned_iov.csv)"""
+    rng = np.random.default_rng(seed)
+    is_malicious = (rng.random(rows) < malicious_fraction).astype(np.uint8)
+    pd.DataFrame({
+        "timestamp": 1_700_000_000 + np.arange(rows),
+        "can_id": rng.integers(0x100, 0x800, rows),
+        "payload": "0011223344556677",
+        "attack_category": np.where(is_malicious == 1, "DoS", "BENIGN"),
+        "attack_type": "GAS",
+        "is_malicious": is_malicious
+    }).to_csv(path, index=False)
+    return path
+
+def run_case(params, work_dir, latency=0.0, seed=0):
+    """Run one simulation on the stand-in backend and return its measurements"""
+    backend = install(FakeTraci(latency=latency, background_vehicles=params["background_vehicles"], seed=seed))
+    import inject_sumo
+
+    dataset = Path(work_dir) / f"dataset_{params['dataset_rows']}.csv"
+    if not dataset.exists():
+        make_dataset(dataset, params["dataset_rows"], seed=seed)
+
+    run_name = "_".join(f"{k}-{v}" for k, v in sorted(params.items()))
+    # One export at the end of the run (metrics_interval far beyond the run's wall time)
+    log_dir = inject_sumo.run_simulation(str(dataset), "sumo/simple.sumocfg", work_dir,
+                                         duration=params["duration"], sample_rate=1.0,
+                                         telemetry_mode=params["telemetry_mode"],
+                                         log_interval=params["log_interval"], seed=seed,
+                                         run_name=run_name, metrics_interval=1e9)
+    with open(log_dir / "simulation_summary.json") as f:
+        summary = json.load(f)
+    with open(log_dir / "metrics.json") as f:
+        metrics = json.load(f)
+
+    phases = {name: phase["seconds"] for name, phase in metrics["phases"].items()}
+    records = len(TrafficLogReader(log_dir / "traffic" / "traffic.bin"))
+    log_seconds = phases.get("telemetry", 0.0) + phases.get("sink", 0.0)
+    # Sum of the loop iterations' wall times (the summary's wall_seconds is rounded to milliseconds)
+    loop_seconds = metrics["step_seconds"]["mean"] * metrics["steps"]
+    return {
+        "steps": metrics["steps"],
+        "loop_seconds": round(loop_seconds, 6),
+        "steps_per_sec": round(metrics["steps"] / loop_seconds, 1) if loop_seconds else None,
+        "vehicles_at_end": backend.count,
+        "injected": summary["total_vehicles"],
+        "inject_per_sec": round(summary["total_vehicles"] / phases["inject"], 1) if phases.get("inject") else None,
+        "traffic_records": records,
+        "log_us_per_record": round(log_seconds / records * 1e6, 3) if records else None,
+        "step_p50_us": round(metrics["step_seconds"]["p50"] * 1e6, 1),
+        "step_p99_us": round(metrics["step_seconds"]["p99"] * 1e6, 1),
+        "phase_seconds": phases,
+        "traci_calls": sum(backend.calls.values())
+    }
+
+def run_benchmarks(names, latency=0.0, quick=False, seed=0, work_dir=None):
+    """Run the named benchmarks and return a list of result rows"""
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        work_dir = work_dir or tmp
+        for name in names:
+            spec = BENCHMARKS[name]
+            for combo in expand_grid(spec["grid"]):
+                params = dict(spec["fixed"], **combo)
+                if quick:
+                    for key in ("dataset_rows", "background_vehicles", "duration"):
+                        params[key] = max(params[key] // QUICK_FACTOR, 1 if key != "background_vehicles" else 0)
+                measured = run_case(params, work_dir, latency, seed)
+                row = {"benchmark": name, "params": params, **measured}
+                results.append(row)
+                print(f"{name:9s} {json.dumps(params, sort_keys=True)}: {spec['metric']}={measured[spec['metric']]}"
+                      f" ({measured['vehicles_at_end']} vehicles at end)")
+    return results
+
+def _case_key(row):
+    return row["benchmark"], json.dumps(row["params"], sort_keys=True)
+
+def compare(results, baseline, tolerance=0.1):
+    """Print each benchmark's headline metric against the baseline; returns the regressed cases"""
+    previous = {_case_key(row): row for row in baseline}
+    regressions = []
+    for row in results:
+        spec = BENCHMARKS[row["benchmark"]]
+        old = previous.get(_case_key(row))
+        new_value = row[spec["metric"]]
+        if old is None or not old.get(spec["metric"]) or new_value is None:
+            continue
+        change = new_value / old[spec["metric"]] - 1
+        worse = change > tolerance if spec.get("lower_is_better") else change < -tolerance
+        mark = "❌" if worse else "✅"
+        print(f"{mark} {row['benchmark']:9s} {json.dumps(row['params'], sort_keys=True)}: "
+              f"{spec['metric']} {old[spec['metric']]} -> {new_value} ({change:+.1%})")
+        if worse:
+            regressions.append(row)
+    return regressions
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmark the inject_sumo.py simulation loop on a stand-in TraCI backend')
+    parser.add_argument('--bench', action='append', choices=list(BENCHMARKS),
+                        help='Benchmark to run, repeatable (default: all)')
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='Seconds added to every TraCI call, to model a socket round trip (e.g. 50e-6)')
+    parser.add_argument('--quick', action='store_true', help=f'Scale sizes and durations down {QUICK_FACTOR}x')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--report', default=None, help='Write the results JSON to this file')
+    parser.add_argument('--baseline', default=None, help='Earlier results JSON to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.1,
+                        help='Relative change in a headline metric counted as a regression')
+    parser.add_argument('--keep', default=None, metavar='DIR',
+                        help='Keep run directories and datasets in DIR instead of a temporary directory')
+    args = parser.parse_args()
+
+    # Keep the per-run progress messages out of the benchmark output
+    configure_logging("WARNING")
+    if args.keep:
+        os.makedirs(args.keep, exist_ok=True)
+
+    results = run_benchmarks(args.bench or list(BENCHMARKS), args.latency, args.quick, args.seed, args.keep)
+    report = {"latency": args.latency, "quick": args.quick, "results": results}
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.report}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("latency") != args.latency or baseline.get("quick") != args.quick:
+            print("⚠️  Baseline was run with a different --latency/--quick setting")
+        regressions = compare(results, baseline["results"], args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} benchmark(s) regressed by more than {args.tolerance:.0%}")
+            sys.exit(1)
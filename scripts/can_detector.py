@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+Streaming Statistical CAN Intrusion Detector
+Consumes CAN frames in batches (FrameBatch from can_replay.py) and keeps
+per-can_id sliding-window state in fixed-size NumPy ring buffers:
+
+- message rate: frames of the ID within the last window_seconds, compared
+  with the rate its recent inter-arrival times predict
+- inter-arrival time deviation: z-score of the gap to the previous frame
+- payload byte entropy: deviation from the ID's recent entropy
+- bit-flip distance: popcount(payload XOR previous payload) z-score
+- unknown IDs: IDs first seen after the learning period
+
+Every statistic is computed for a whole batch at once. Frames are grouped by
+ID with a stable sort, so "previous frame of the same ID" is a shifted array,
+and each frame is scored against the ID's window as it stood at the start of
+the batch; the ring buffers are then updated with the batch in one scatter.
+
+Alerts have the same shape as the events process_alerts.py forwards
+(timestamp, alert_id, attack_type, source_ip, dest_ip, raw_data).
+
+Example:
+    python3 scripts/can_detector.py --input data/cleaned_iov.csv --alerts logs/can_alerts.jsonl --report logs/can_detector_report.json
+"""
+
+import json
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from can_replay import read_frames
+
+# Detector signature IDs (kept clear of the 1000000 range used by suricata/custom.rules)
+RULES = {
+    "unknown_id": (2000001, "CAN unknown arbitration ID"),
+    "rate": (2000002, "CAN message rate anomaly"),
+    "iat": (2000003, "CAN inter-arrival time anomaly"),
+    "entropy": (2000004, "CAN payload entropy anomaly"),
+    "bitflip": (2000005, "CAN payload bit-flip anomaly")
+}
+FLAG_ORDER = list(RULES)
+
+POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+def payload_entropy(data, dlc):
+    """Shannon entropy (bits) of the first dlc bytes of each payload row"""
+    valid = np.arange(data.shape[1]) < dlc[:, None]
+    same = (data[:, :, None] == data[:, None, :]) & valid[:, None, :] & valid[:, :, None]
+    counts = same.sum(axis=2)
+    n = np.maximum(dlc, 1).astype(np.float64)[:, None]
+    # Each byte contributes 1/n * log2(count/n), which sums to the entropy over distinct values
+    share = np.where(valid, np.log2(np.maximum(counts, 1) / n) / n, 0.0)
+    return -share.sum(axis=1)
+
+class CanDetector:
+    """
+    Per-ID sliding-window anomaly detector.
+
+    window is the number of recent frames kept per ID; an ID is only scored
+    once it has min_history frames. The first learn_frames frames only train
+    the state (no alerts) and define the set of known IDs.
+    """
+
+    def __init__(self, window=64, window_seconds=1.0, min_history=16, learn_frames=10_000,
+                 iat_z=4.0, rate_factor=3.0, entropy_delta=1.5, bitflip_z=4.0, max_ids=4096):
+        self.window = window
+        self.window_seconds = window_seconds
+        self.min_history = min_history
+        self.learn_frames = learn_frames
+        self.iat_z = iat_z
+        self.rate_factor = rate_factor
+        self.entropy_delta = entropy_delta
+        self.bitflip_z = bitflip_z
+
+        self.slots = {}
+        self.frames_seen = 0
+        self.known = np.zeros(max_ids, dtype=bool)
+        self.count = np.zeros(max_ids, dtype=np.int64)
+        self.last_ts = np.full(max_ids, np.nan)
+        self.last_data = np.zeros((max_ids, 8), dtype=np.uint8)
+        self.ring_ts = np.full((max_ids, window), -np.inf)
+        self.ring_iat = np.zeros((max_ids, window))
+        self.ring_entropy = np.zeros((max_ids, window))
+        self.ring_flip = np.zeros((max_ids, window))
+
+    def _grow(self, size):
+        """Enlarge the per-ID arrays to hold at least size IDs"""
+        old = len(self.count)
+        new = max(size, 2 * old)
+        pad = new - old
+        self.known = np.concatenate([self.known, np.zeros(pad, dtype=bool)])
+        self.count = np.concatenate([self.count, np.zeros(pad, dtype=np.int64)])
+        self.last_ts = np.concatenate([self.last_ts, np.full(pad, np.nan)])
+        self.last_data = np.vstack([self.last_data, np.zeros((pad, 8), dtype=np.uint8)])
+        self.ring_ts = np.vstack([self.ring_ts, np.full((pad, self.window), -np.inf)])
+        self.ring_iat = np.vstack([self.ring_iat, np.zeros((pad, self.window))])
+        self.ring_entropy = np.vstack([self.ring_entropy, np.zeros((pad, self.window))])
+        self.ring_flip = np.vstack([self.ring_flip, np.zeros((pad, self.window))])
+
+    def _slot_indices(self, can_ids):
+        unique, inverse = np.unique(can_ids, return_inverse=True)
+        slots = np.empty(len(unique), dtype=np.int64)
+        for i, can_id in enumerate(unique.tolist()):
+            slot = self.slots.get(can_id)
+            if slot is None:
+                slot = self.slots[can_id] = len(self.slots)
+            slots[i] = slot
+        if len(self.slots) > len(self.count):
+            self._grow(len(self.slots))
+        return slots[inverse]
+
+    def process(self, batch):
+        """
+        Score one FrameBatch. Returns a bool array of shape (len(batch), len(FLAG_ORDER))
+        with one column per rule, in batch order.
+        """
+        n = len(batch)
+        flags = np.zeros((n, len(FLAG_ORDER)), dtype=bool)
+        if n == 0:
+            return flags
+
+        slot = self._slot_indices(batch.can_id)
+        order = np.lexsort((np.arange(n), slot))
+        s = slot[order]
+        ts = batch.timestamp[order]
+        data = batch.data[order]
+        dlc = batch.dlc[order]
+        learning = self.frames_seen + order < self.learn_frames
+
+        # Group frames by ID: rank within the group, and the previous frame of the same ID
+        group_start = np.r_[True, s[1:] != s[:-1]]
+        group_id = np.cumsum(group_start) - 1
+        starts = np.flatnonzero(group_start)
+        rank = np.arange(n) - starts[group_id]
+
+        prev_ts = np.where(group_start, self.last_ts[s], np.r_[np.nan, ts[:-1]])
+        prev_data = np.where(group_start[:, None], self.last_data[s], np.vstack([data[:1], data[:-1]]))
+        has_prev = ~np.isnan(prev_ts)
+
+        iat = ts - prev_ts
+        entropy = payload_entropy(data, dlc)
+        flip = POPCOUNT[data ^ prev_data].sum(axis=1).astype(np.float64)
+
+        # Window statistics as of the start of the batch
+        history = np.minimum(self.count[s], self.window)
+        valid = np.arange(self.window)[None, :] < history[:, None]
+        filled = np.maximum(history, 1)
+        iat_mean = (self.ring_iat[s] * valid).sum(axis=1) / filled
+        iat_std = np.sqrt((((self.ring_iat[s] - iat_mean[:, None]) * valid) ** 2).sum(axis=1) / filled)
+        entropy_mean = (self.ring_entropy[s] * valid).sum(axis=1) / filled
+        flip_mean = (self.ring_flip[s] * valid).sum(axis=1) / filled
+        flip_std = np.sqrt((((self.ring_flip[s] - flip_mean[:, None]) * valid) ** 2).sum(axis=1) / filled)
+
+        # Frames of the same ID within window_seconds: earlier frames in this batch + ring history.
+        # Groups are laid end to end on one increasing axis so a single searchsorted covers them all.
+        ends = np.r_[starts[1:], n] - 1
+        widths = ts[ends] - ts[starts] + self.window_seconds + 1.0
+        axis = ts - ts[starts][group_id] + np.r_[0.0, np.cumsum(widths)[:-1]][group_id]
+        first_in_window = np.searchsorted(axis, axis - self.window_seconds, side='right')
+        in_ring = (self.ring_ts[s] > (ts - self.window_seconds)[:, None]).sum(axis=1)
+        rate_count = np.arange(n) - first_in_window + 1 + in_ring
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            iat_score = np.abs(iat - iat_mean) / np.maximum(iat_std, 1e-3 * np.maximum(iat_mean, 1e-6))
+            flip_score = (flip - flip_mean) / np.maximum(flip_std, 0.5)
+            expected = self.window_seconds / np.maximum(iat_mean, 1e-9)
+
+        known = self.known.copy()
+        known[s[learning]] = True
+        scored = ~learning & (history >= self.min_history)
+        sorted_flags = np.zeros_like(flags)
+        sorted_flags[:, 0] = ~learning & ~known[s]
+        sorted_flags[:, 1] = scored & (rate_count > self.rate_factor * expected + 2)
+        sorted_flags[:, 2] = scored & has_prev & (iat_score > self.iat_z)
+        sorted_flags[:, 3] = scored & (np.abs(entropy - entropy_mean) > self.entropy_delta)
+        sorted_flags[:, 4] = scored & has_prev & (flip_score > self.bitflip_z)
+        flags[order] = sorted_flags
+
+        self.known = known
+        self._update(s, ts, data, iat, entropy, flip, group_start, group_id, rank, has_prev)
+        self.frames_seen += n
+        return flags
+
+    def _update(self, s, ts, data, iat, entropy, flip, group_start, group_id, rank, has_prev):
+        """Scatter the batch into the ring buffers (only the newest window frames per ID)"""
+        # The very first frame of an ID has no inter-arrival time and is not stored as history
+        skipped = (group_start & ~has_prev)[group_start][group_id].astype(np.int64)
+        stored_rank = rank - skipped
+        stored_size = np.bincount(group_id)[group_id] - skipped
+        keep = has_prev & (stored_rank >= stored_size - self.window)
+
+        ks = s[keep]
+        kp = (self.count[ks] + stored_rank[keep]) % self.window
+        self.ring_ts[ks, kp] = ts[keep]
+        self.ring_iat[ks, kp] = iat[keep]
+        self.ring_entropy[ks, kp] = entropy[keep]
+        self.ring_flip[ks, kp] = flip[keep]
+
+        last = np.r_[group_start[1:], True]
+        self.last_ts[s[last]] = ts[last]
+        self.last_data[s[last]] = data[last]
+        self.count[s[group_start]] += stored_size[group_start]
+
+def alert_events(batch, flags):
+    """Build process_alerts-shaped events for every flagged frame in a batch"""
+    events = []
+    for i in np.flatnonzero(flags.any(axis=1)):
+        reasons = [FLAG_ORDER[j] for j in np.flatnonzero(flags[i])]
+        alert_id, signature = RULES[reasons[0]]
+        can_id = int(batch.can_id[i])
+        ecu = batch.ecu[i] if batch.ecu is not None else f"0x{can_id:03X}"
+        raw_data = {
+            "event_type": "alert",
+            "can_id": can_id,
+            "payload": batch.data[i, :batch.dlc[i]].tobytes().hex().upper(),
+            "reasons": reasons,
+            "alert": {"signature_id": alert_id, "signature": signature}
+        }
+        events.append({
+            "timestamp": datetime.fromtimestamp(float(batch.timestamp[i]), timezone.utc)
+                                 .strftime('%Y-%m-%dT%H:%M:%S.%f%z'),
+            "alert_id": alert_id,
+            "attack_type": signature,
+            "source_ip": ecu,
+            "dest_ip": "can-bus",
+            "raw_data": raw_data
+        })
+    return events
+
+def _ratio(numerator, denominator):
+    return round(numerator / denominator, 4) if denominator else None
+
+def evaluate(input_csv, detector, chunk_size=100_000, batch_size=4096, limit=None, alerts_path=None,
+             target_fps=100_000):
+    """Run the detector over a cleaned dataset and report throughput and precision/recall"""
+    tp = fp = fn = tn = 0
+    rule_hits = {name: 0 for name in FLAG_ORDER}
+    per_attack = {}
+    detect_seconds = 0.0
+    frames = 0
+    alerts_file = open(alerts_path, "w") if alerts_path else None
+
+    try:
+        batches = (chunk.slice(i, i + batch_size)
+                   for chunk in read_frames(input_csv, chunk_size, limit)
+                   for i in range(0, len(chunk), batch_size))
+        for batch in batches:
+            started = time.perf_counter()
+            flags = detector.process(batch)
+            detect_seconds += time.perf_counter() - started
+            frames += len(batch)
+
+            predicted = flags.any(axis=1)
+            actual = batch.is_malicious.astype(bool)
+            tp += int((predicted & actual).sum())
+            fp += int((predicted & ~actual).sum())
+            fn += int((~predicted & actual).sum())
+            tn += int((~predicted & ~actual).sum())
+            for name, hits in zip(FLAG_ORDER, flags.sum(axis=0)):
+                rule_hits[name] += int(hits)
+            for attack_type in np.unique(batch.attack_type[actual]):
+                mask = actual & (batch.attack_type == attack_type)
+                stats = per_attack.setdefault(attack_type, {"frames": 0, "detected": 0})
+                stats["frames"] += int(mask.sum())
+                stats["detected"] += int((mask & predicted).sum())
+
+            if alerts_file:
+                for event in alert_events(batch, flags):
+                    alerts_file.write(json.dumps(event) + "\n")
+    finally:
+        if alerts_file:
+            alerts_file.close()
+
+    for stats in per_attack.values():
+        stats["recall"] = _ratio(stats["detected"], stats["frames"])
+    fps = frames / detect_seconds if detect_seconds else None
+    precision = _ratio(tp, tp + fp)
+    recall = _ratio(tp, tp + fn)
+    return {
+        "frames": frames,
+        "learn_frames": detector.learn_frames,
+        "can_ids": len(detector.slots),
+        "detect_seconds": round(detect_seconds, 3),
+        "frames_per_second": round(fps) if fps else None,
+        "target_frames_per_second": target_fps,
+        "meets_target": bool(fps and fps >= target_fps),
+        "confusion": {"tp": tp, "fp": fp, "fn": fn, "tn": tn},
+        "precision": precision,
+        "recall": recall,
+        "f1": _ratio(2 * precision * recall, precision + recall) if precision and recall else None,
+        "alerts_by_rule": rule_hits,
+        "recall_by_attack_type": per_attack
+    }
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Statistical CAN intrusion detector with a labelled evaluation report')
+    parser.add_argument('--input', default='data/cleaned_iov.csv', help='Cleaned dataset CSV')
+    parser.add_argument('--chunk-size', type=int, default=100_000, help='Frames read from the CSV at a time')
+    parser.add_argument('--batch-size', type=int, default=4096,
+                        help='Frames per detection batch (frames are scored against the window before their batch)')
+    parser.add_argument('--limit', type=int, default=None, help='Only process this many frames')
+    parser.add_argument('--window', type=int, default=64, help='Frames of history per CAN ID')
+    parser.add_argument('--window-seconds', type=float, default=1.0, help='Window for the message rate check')
+    parser.add_argument('--min-history', type=int, default=16, help='Frames needed before an ID is scored')
+    parser.add_argument('--learn-frames', type=int, default=10_000, help='Training frames before alerting')
+    parser.add_argument('--iat-z', type=float, default=4.0)
+    parser.add_argument('--rate-factor', type=float, default=3.0)
+    parser.add_argument('--entropy-delta', type=float, default=1.5)
+    parser.add_argument('--bitflip-z', type=float, default=4.0)
+    parser.add_argument('--target-fps', type=int, default=100_000, help='Throughput target in frames/second')
+    parser.add_argument('--alerts', default=None, help='Write alerts (process_alerts event shape) as JSON lines')
+    parser.add_argument('--report', default=None, help='Also write the JSON report to this file')
+    args = parser.parse_args()
+
+    detector = CanDetector(args.window, args.window_seconds, args.min_history, args.learn_frames,
+                           args.iat_z, args.rate_factor, args.entropy_delta, args.bitflip_z)
+    report = evaluate(args.input, detector, args.chunk_size, args.batch_size, args.limit, args.alerts, args.target_fps)
+
+    output = json.dumps(report, indent=2)
+    if args.report:
+        with open(args.report, 'w') as f:
+            f.write(output)
+        print(f"Report written to {args.report}")
+    print(output)
+    print(f"{'✅' if report['meets_target'] else '⚠️'} {report['frames_per_second']:,} frames/s "
+          f"(target {args.target_fps:,})")
@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+CAN Trace Replay Engine
+Streams the frames in cleaned_iov.csv (can_id + hex payload) as binary CAN
+frames with their original timing, scaled timing or a fixed frame rate, and
+writes them to a candump log, a pcap file (LINKTYPE_CAN_SOCKETCAN), or hands
+them to in-process consumers as NumPy frame batches.
+
+Pacing works on batches: frames are decoded a chunk at a time, each frame gets
+a scheduled offset from the start of the replay, and every frame that is due
+is released together, so per-frame cost is a few array operations rather than
+a sleep per frame. The pacer sleeps for long gaps and spin-waits the last
+millisecond, which keeps timing accurate at tens of thousands of frames per
+second. Output timestamps are the scheduled ones, so a file written without
+pacing has exactly the same timing as a paced replay.
+
+Example:
+    python3 scripts/can_replay.py --input data/cleaned_iov.csv --rate 20000 --candump logs/replay.log --pcap logs/replay.pcap
+"""
+
+import json
+import struct
+import time
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from clean_iov_dataset import encode_payload_hex
+
+CAN_EFF_FLAG = 0x80000000
+CAN_SFF_MAX = 0x7FF
+LINKTYPE_CAN_SOCKETCAN = 227
+
+@dataclass
+class FrameBatch:
+    """A block of CAN frames as parallel arrays (data is uint8[n, 8], zero padded past dlc)"""
+    timestamp: np.ndarray
+    can_id: np.ndarray
+    data: np.ndarray
+    dlc: np.ndarray
+    is_malicious: np.ndarray
+    attack_type: np.ndarray
+    ecu: np.ndarray = None
+
+    def __len__(self):
+        return len(self.can_id)
+
+    def slice(self, start, end):
+        return FrameBatch(
+            timestamp=self.timestamp[start:end],
+            can_id=self.can_id[start:end],
+            data=self.data[start:end],
+            dlc=self.dlc[start:end],
+            is_malicious=self.is_malicious[start:end],
+            attack_type=self.attack_type[start:end],
+            ecu=None if self.ecu is None else self.ecu[start:end]
+        )
+
+def decode_payloads(payloads):
+    """Hex payload strings -> (uint8[n, 8] data, uint8[n] dlc)"""
+    payloads = pd.Series(payloads, dtype=object).fillna('').astype(str)
+    lengths = payloads.str.len().to_numpy()
+    if len(payloads) and (lengths == 16).all():
+        data = np.frombuffer(bytes.fromhex(''.join(payloads)), dtype=np.uint8).reshape(-1, 8)
+        return data.copy(), np.full(len(payloads), 8, dtype=np.uint8)
+
+    data = np.zeros((len(payloads), 8), dtype=np.uint8)
+    dlc = np.zeros(len(payloads), dtype=np.uint8)
+    for i, payload in enumerate(payloads):
+        raw = bytes.fromhex(payload)[:8]
+        data[i, :len(raw)] = np.frombuffer(raw, dtype=np.uint8)
+        dlc[i] = len(raw)
+    return data, dlc
+
+def frames_from_dataframe(chunk):
+    """Build a FrameBatch from a block of cleaned dataset rows"""
+    data, dlc = decode_payloads(chunk['payload'])
+    return FrameBatch(
+        timestamp=chunk['timestamp'].to_numpy(dtype=np.float64),
+        can_id=chunk['can_id'].to_numpy(dtype=np.uint32),
+        data=data,
+        dlc=dlc,
+        is_malicious=chunk['is_malicious'].to_numpy(dtype=np.uint8),
+        attack_type=chunk['attack_type'].astype(str).to_numpy(dtype=object)
+    )
+
+def read_dataset_chunks(csv_path, chunk_size=100_000, limit=None):
+    """Yield raw DataFrame blocks of the cleaned dataset columns used for replay"""
+    columns = ['timestamp', 'can_id', 'payload', 'is_malicious', 'attack_type']
+    remaining = limit
+    for chunk in pd.read_csv(csv_path, usecols=columns, chunksize=chunk_size,
+                             dtype={'payload': str, 'attack_type': 'category'}):
+        if remaining is not None:
+            if remaining <= 0:
+                return
+            chunk = chunk.iloc[:remaining]
+            remaining -= len(chunk)
+        yield chunk
+
+def read_frames(csv_path, chunk_size=100_000, limit=None):
+    """Yield FrameBatch objects from a cleaned dataset CSV without loading it whole"""
+    for chunk in read_dataset_chunks(csv_path, chunk_size, limit):
+        yield frames_from_dataframe(chunk)
+
+def frames_from_candump(lines):
+    """Build a FrameBatch from candump -L lines ("(ts) iface ID#DATA"); labels are unknown"""
+    fields = pd.Series(lines).str.extract(r'^\((?P<ts>[\d.]+)\)\s+(?P<iface>\S+)\s+(?P<id>[0-9A-Fa-f]+)#(?P<data>[0-9A-Fa-f]*)')
+    fields = fields.dropna(subset=['ts'])
+    data, dlc = decode_payloads(fields['data'])
+    return FrameBatch(
+        timestamp=fields['ts'].astype(np.float64).to_numpy(),
+        can_id=np.array([int(ident, 16) for ident in fields['id']], dtype=np.uint32),
+        data=data,
+        dlc=dlc,
+        is_malicious=np.zeros(len(fields), dtype=np.uint8),
+        attack_type=np.full(len(fields), '', dtype=object),
+        ecu=fields['iface'].to_numpy(dtype=object)
+    )
+
+def read_candump_chunks(path, chunk_size=100_000, limit=None):
+    """Yield lists of up to chunk_size lines from a candump log"""
+    remaining = limit
+    with open(path) as f:
+        while remaining is None or remaining > 0:
+            size = chunk_size if remaining is None else min(chunk_size, remaining)
+            lines = [line for _, line in zip(range(size), f)]
+            if not lines:
+                return
+            if remaining is not None:
+                remaining -= len(lines)
+            yield lines
+
+def read_candump(path, chunk_size=100_000, limit=None):
+    """Yield FrameBatch objects from a candump log written by CandumpWriter (or candump -L)"""
+    for lines in read_candump_chunks(path, chunk_size, limit):
+        yield frames_from_candump(lines)
+
+class EcuAssigner:
+    """
+    Maps can_id -> sending ECU name. Explicit assignments come from a dict
+    (keys may be ints or "0x..." strings); other IDs are spread over
+    default_ecus ECUs by can_id, or reported as "can0" if default_ecus is 0.
+    """
+
+    def __init__(self, mapping=None, default_ecus=0):
+        self.mapping = {}
+        for key, ecu in (mapping or {}).items():
+            self.mapping[int(key, 0) if isinstance(key, str) else int(key)] = ecu
+        self.default_ecus = default_ecus
+
+    @classmethod
+    def from_file(cls, path, default_ecus=0):
+        with open(path) as f:
+            return cls(json.load(f), default_ecus)
+
+    def assign(self, can_ids):
+        unique, inverse = np.unique(can_ids, return_inverse=True)
+        names = np.array([self._name(int(can_id)) for can_id in unique], dtype=object)
+        return names[inverse]
+
+    def _name(self, can_id):
+        if can_id in self.mapping:
+            return self.mapping[can_id]
+        if self.default_ecus:
+            return f"ECU_{can_id % self.default_ecus}"
+        return "can0"
+
+class Pacer:
+    """Releases frames at their scheduled offsets (seconds since start) in batches"""
+
+    def __init__(self, spin_seconds=0.001):
+        self.spin_seconds = spin_seconds
+        self.start = None
+        self.max_lateness = 0.0
+
+    def begin(self):
+        self.start = time.perf_counter()
+
+    def release(self, offsets):
+        """Yield (start, end) index slices of offsets as they become due"""
+        i = 0
+        n = len(offsets)
+        while i < n:
+            now = time.perf_counter() - self.start
+            wait = offsets[i] - now
+            if wait > self.spin_seconds:
+                time.sleep(wait - self.spin_seconds)
+                continue
+            while wait > 0:
+                now = time.perf_counter() - self.start
+                wait = offsets[i] - now
+            end = int(np.searchsorted(offsets, now, side='right'))
+            end = max(end, i + 1)
+            self.max_lateness = max(self.max_lateness, now - offsets[i])
+            yield i, end
+            i = end
+
+def replay(batches, speed=1.0, rate=None, paced=True, ecu_assigner=None, start_time=None, pacer=None):
+    """
+    Re-time and (optionally) pace a stream of FrameBatch objects.
+
+    speed scales the original inter-frame timing (2.0 = twice as fast);
+    rate, if given, replaces it with a fixed frames/second. Yielded batches
+    carry the scheduled wall-clock timestamps (start_time + offset) and the
+    assigned ECU per frame. Pass a Pacer to read its max_lateness afterwards.
+    """
+    # Checked here rather than in the generator so a bad value fails at the call
+    if not speed > 0:
+        raise ValueError(f"speed must be positive, got {speed}")
+    if rate is not None and not rate > 0:
+        raise ValueError(f"rate must be positive, got {rate}")
+    return _replay(batches, speed, rate, paced, ecu_assigner, start_time, pacer or Pacer())
+
+def _replay(batches, speed, rate, paced, ecu_assigner, start_time, pacer):
+    first_timestamp = None
+    emitted = 0
+
+    for batch in batches:
+        if pacer.start is None:
+            # Start the clock once the first chunk is decoded so reading it is not counted as lateness
+            pacer.begin()
+            start_time = time.time() if start_time is None else start_time
+        if rate:
+            offsets = (emitted + np.arange(len(batch), dtype=np.float64)) / rate
+        else:
+            if first_timestamp is None and len(batch):
+                first_timestamp = batch.timestamp[0]
+            offsets = (batch.timestamp - first_timestamp) / speed
+        offsets = np.maximum.accumulate(offsets) if len(offsets) else offsets
+        emitted += len(batch)
+
+        batch.timestamp = start_time + offsets
+        if ecu_assigner is not None:
+            batch.ecu = ecu_assigner.assign(batch.can_id)
+
+        if not paced:
+            yield batch
+            continue
+        for start, end in pacer.release(offsets):
+            yield batch.slice(start, end)
+
+class CandumpWriter:
+    """Writes frames in candump -L format: (timestamp) interface id#data"""
+
+    def __init__(self, path, interface="can0"):
+        self.file = open(path, "w")
+        self.interface = interface
+
+    def write(self, batch):
+        hex_data = encode_payload_hex(batch.data)
+        interfaces = batch.ecu if batch.ecu is not None else [self.interface] * len(batch)
+        lines = []
+        for ts, can_id, dlc, payload, iface in zip(batch.timestamp, batch.can_id, batch.dlc, hex_data, interfaces):
+            can_id = int(can_id)
+            ident = f"{can_id:03X}" if can_id <= CAN_SFF_MAX else f"{can_id:08X}"
+            lines.append(f"({ts:.6f}) {iface} {ident}#{payload[:2 * dlc]}\n")
+        self.file.write(''.join(lines))
+
+    def close(self):
+        self.file.close()
+
+class PcapWriter:
+    """Writes frames to a classic pcap file with SocketCAN link-layer headers"""
+
+    RECORD = np.dtype([
+        ('ts_sec', '<u4'), ('ts_usec', '<u4'), ('incl_len', '<u4'), ('orig_len', '<u4'),
+        ('can_id', '>u4'), ('dlc', 'u1'), ('pad', 'u1', 3), ('data', 'u1', 8)
+    ])
+
+    def __init__(self, path):
+        self.file = open(path, "wb")
+        self.file.write(struct.pack('<IHHiIII', 0xA1B2C3D4, 2, 4, 0, 0, 65535, LINKTYPE_CAN_SOCKETCAN))
+
+    def write(self, batch):
+        records = np.zeros(len(batch), dtype=self.RECORD)
+        seconds = np.floor(batch.timestamp)
+        records['ts_sec'] = seconds.astype(np.uint32)
+        records['ts_usec'] = np.minimum(np.round((batch.timestamp - seconds) * 1e6), 999_999).astype(np.uint32)
+        records['incl_len'] = 16
+        records['orig_len'] = 16
+        can_id = batch.can_id.astype(np.uint32)
+        records['can_id'] = np.where(can_id > CAN_SFF_MAX, can_id | CAN_EFF_FLAG, can_id)
+        records['dlc'] = batch.dlc
+        records['data'] = batch.data
+        self.file.write(records.tobytes())
+
+    def close(self):
+        self.file.close()
+
+if __name__ == "__main__":
+    import argparse
+
+    def positive_float(value):
+        number = float(value)
+        if not number > 0:
+            raise argparse.ArgumentTypeError(f"must be positive, got {value}")
+        return number
+
+    parser = argparse.ArgumentParser(description='Replay cleaned_iov.csv as binary CAN frames')
+    parser.add_argument('--input', default='data/cleaned_iov.csv', help='Cleaned dataset CSV')
+    parser.add_argument('--speed', type=positive_float, default=1.0, help='Scale original timing (2.0 = twice as fast)')
+    parser.add_argument('--rate', type=positive_float, default=None, help='Fixed frames per second (overrides --speed)')
+    parser.add_argument('--no-pacing', action='store_true', help='Write as fast as possible (timestamps still scheduled)')
+    parser.add_argument('--limit', type=int, default=None, help='Replay at most this many frames')
+    parser.add_argument('--chunk-size', type=int, default=100_000, help='Frames decoded per chunk')
+    parser.add_argument('--candump', default=None, help='Write a candump log to this path')
+    parser.add_argument('--pcap', default=None, help='Write a pcap file to this path')
+    parser.add_argument('--ecu-map', default=None, help='JSON file mapping can_id -> ECU name')
+    parser.add_argument('--ecus', type=int, default=0, help='Spread unmapped IDs over this many ECUs')
+    args = parser.parse_args()
+
+    assigner = None
+    if args.ecu_map:
+        assigner = EcuAssigner.from_file(args.ecu_map, args.ecus)
+    elif args.ecus:
+        assigner = EcuAssigner(default_ecus=args.ecus)
+
+    writers = []
+    if args.candump:
+        writers.append(CandumpWriter(args.candump))
+    if args.pcap:
+        writers.append(PcapWriter(args.pcap))
+
+    frames = 0
+    pacer = Pacer()
+    wall_start = time.perf_counter()
+    try:
+        for batch in replay(read_frames(args.input, args.chunk_size, args.limit), args.speed, args.rate,
+                            paced=not args.no_pacing, ecu_assigner=assigner, pacer=pacer):
+            for writer in writers:
+                writer.write(batch)
+            frames += len(batch)
+    finally:
+        for writer in writers:
+            writer.close()
+
+    elapsed = time.perf_counter() - wall_start
+    print(f"Replayed {frames:,} frames in {elapsed:.2f}s ({frames / elapsed:,.0f} frames/s)")
+    if not args.no_pacing:
+        print(f"Maximum pacing lateness: {pacer.max_lateness * 1000:.3f} ms")
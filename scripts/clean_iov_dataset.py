@@ -1,48 +1,152 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 import pandas as pd
 from datetime import datetime
 
-def preprocess_iov(input_path, output_path):
-    # Load the raw data
-    df = pd.read_csv(input_path)
-    
-    print("Original columns:", df.columns.tolist())  # Debug
-    
-    # 1. Standardize column names
-    df = df.rename(columns={
-        "ID": "can_id",
-        "category": "attack_category",
-        "specific_class": "attack_type"
-    })
-    
+# Raw CICIoV column name -> cleaned column name
+COLUMN_MAP = {
+    "ID": "can_id",
+    "category": "attack_category",
+    "specific_class": "attack_type"
+}
+
+OUTPUT_COLUMNS = [
+    'timestamp',
+    'can_id',
+    'payload',
+    'attack_category',
+    'attack_type',
+    'is_malicious'
+]
+
+def encode_payload_hex(data):
+    """Hex-encode a (rows, n_bytes) array of byte values into one uppercase string per row"""
+    data = np.ascontiguousarray(data, dtype=np.uint8)
+    if data.size == 0:
+        return np.array([''] * len(data), dtype=object)
+    width = 2 * data.shape[1]
+    hex_bytes = data.tobytes().hex().upper().encode('ascii')
+    return np.frombuffer(hex_bytes, dtype=f'S{width}').astype(str).astype(object)
+
+def count_rows(path):
+    """Count data rows in a CSV file (excluding the header) without parsing it"""
+    lines = 0
+    last = b'\n'
+    with open(path, 'rb') as f:
+        while True:
+            block = f.read(1 << 24)
+            if not block:
+                break
+            lines += block.count(b'\n')
+            last = block[-1:]
+    if last != b'\n':
+        lines += 1
+    return max(lines - 1, 0)
+
+def clean_chunk(df, first_row, base_timestamp):
+    """
+    Clean one block of raw rows.
+
+    first_row is the index of the block's first row within the whole dataset,
+    so timestamps (base_timestamp + row index) keep increasing across blocks.
+    """
+    # 1. Standardize column names (dropping columns the rename would duplicate)
+    collisions = [new for old, new in COLUMN_MAP.items() if old in df.columns and new in df.columns]
+    df = df.drop(columns=collisions).rename(columns=COLUMN_MAP)
+
     # 2. Combine DATA columns into single CAN payload
     data_cols = [col for col in df.columns if col.startswith('DATA_')]
-    df['payload'] = df[data_cols].apply(
-        lambda x: ''.join(f"{int(val):02X}" for val in x), 
-        axis=1
-    )
-    
+    df['payload'] = encode_payload_hex(df[data_cols].to_numpy())
+
     # 3. Add timestamp (since original doesn't have one)
-    df['timestamp'] = [int(datetime.now().timestamp()) - len(df) + i for i in range(len(df))]
-    
+    df['timestamp'] = base_timestamp + first_row + np.arange(len(df), dtype=np.int64)
+
     # 4. Convert label to binary (0=benign, 1=attack)
-    df['is_malicious'] = df['label'].apply(lambda x: 0 if x == "BENIGN" else 1)
-    
+    df['is_malicious'] = (df['label'] != "BENIGN").astype(np.int64)
+
     # 5. Select final columns
-    clean_df = df[[
-        'timestamp',
-        'can_id',
-        'payload',
-        'attack_category',
-        'attack_type',
-        'is_malicious'
-    ]]
-    
+    return df[OUTPUT_COLUMNS]
+
+def _clean_chunk_task(args):
+    df, first_row, base_timestamp = args
+    return clean_chunk(df, first_row, base_timestamp)
+
+def preprocess_iov(input_path, output_path):
+    # Load the raw data
+    df = pd.read_csv(input_path)
+
+    print("Original columns:", df.columns.tolist())  # Debug
+
+    base_timestamp = int(datetime.now().timestamp()) - len(df)
+    clean_df = clean_chunk(df, 0, base_timestamp)
+
     clean_df.to_csv(output_path, index=False)
     print(f"Cleaned data saved to {output_path}")
     print("Sample output:", clean_df.head())
 
+def preprocess_iov_streaming(input_path, output_path, chunk_size=500_000, workers=1):
+    """
+    Clean the raw dataset in fixed-size chunks so memory stays bounded
+    regardless of input size. Each cleaned chunk is appended to output_path.
+
+    With workers > 1, chunks are cleaned in a process pool; at most two chunks
+    per worker are in flight and results are written in input order.
+    """
+    total_rows = count_rows(input_path)
+    base_timestamp = int(datetime.now().timestamp()) - total_rows
+    print(f"Streaming {total_rows:,} rows from {input_path} in chunks of {chunk_size:,}")
+
+    if os.path.exists(output_path):
+        os.remove(output_path)
+
+    written = 0
+
+    def write(clean_df):
+        nonlocal written
+        clean_df.to_csv(output_path, mode='a', header=(written == 0), index=False)
+        written += len(clean_df)
+
+    reader = pd.read_csv(input_path, chunksize=chunk_size)
+    first_row = 0
+
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            in_flight = deque()
+            for chunk in reader:
+                in_flight.append(pool.submit(_clean_chunk_task, (chunk, first_row, base_timestamp)))
+                first_row += len(chunk)
+                if len(in_flight) >= 2 * workers:
+                    write(in_flight.popleft().result())
+            while in_flight:
+                write(in_flight.popleft().result())
+    else:
+        for chunk in reader:
+            write(clean_chunk(chunk, first_row, base_timestamp))
+            first_row += len(chunk)
+
+    print(f"Cleaned data saved to {output_path} ({written:,} rows)")
+
 if __name__ == "__main__":
-    preprocess_iov(
-        input_path="data/raw_iov.csv", 
-        output_path="data/cleaned_iov.csv"
-    )
\ No newline at end of file
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Clean the merged CICIoV dataset')
+    parser.add_argument('--input', default='data/raw_iov.csv', help='Path to merged raw CSV')
+    parser.add_argument('--output', default='data/cleaned_iov.csv', help='Path for the cleaned CSV')
+    parser.add_argument('--stream', action='store_true',
+                        help='Process the input in chunks instead of loading it whole')
+    parser.add_argument('--chunk-size', type=int, default=500_000, help='Rows per chunk in streaming mode')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Clean chunks in a pool of this many processes (implies --stream)')
+
+    args = parser.parse_args()
+
+    if args.stream or args.workers > 1:
+        preprocess_iov_streaming(args.input, args.output, args.chunk_size, args.workers)
+    else:
+        preprocess_iov(
+            input_path=args.input,
+            output_path=args.output
+        )
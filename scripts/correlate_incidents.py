@@ -0,0 +1,487 @@
+#!/usr/bin/env python3
+"""
+Incident Correlation Engine
+Joins the three records a simulation run leaves behind on simulation time:
+injected anomalies (anomalies/anomalies.csv), vehicle trajectories
+(traffic/traffic.bin, or the older traffic_step_*.csv files) and Suricata
+alerts (eve.json). Kinematic detector flags in the anomalies log (runs with
+--detect-kinematics) give each injection its detection lag.
+
+Each source is indexed once into sorted numpy arrays: alerts by sim time and
+trajectories by (vehicle, sim time). A windowed join ("every alert within
+±Δt of each injection", "vehicle v's trajectory between t0 and t1") is then
+a pair of vectorized searchsorted calls instead of a scan per incident, so
+multi-million-row runs join in O((n + k) log n). The index and every query
+result are cached under <run_dir>/correlation/ and reused until one of the
+source files changes.
+
+Alert timestamps are mapped onto simulation time with the clocks recorded in
+the run's simulation_summary.json:
+    dataset  alerts carry the dataset's own timestamps (e.g. signature_scanner.py
+             over the run's input): sim_time = (t - time_origin) * time_scale
+    wall     alerts come from a live Suricata during the run:
+             sim_time = sim_start + (t - wallclock_start) * simulated seconds per wall second
+    auto     dataset when most alerts fall inside the dataset's time span, else wall
+
+Example:
+    python3 scripts/correlate_incidents.py logs/simulation_<ts> --eve logs/scan/eve.json --window 2
+    python3 scripts/correlate_incidents.py logs/simulation_<ts> --eve logs/scan/eve.json --vehicle veh_12_345
+"""
+
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from eve_index import alert_epochs, alert_fields
+from traffic_sink import TrafficLogReader
+
+INDEX_VERSION = 2
+TRAJECTORY_COLUMNS = ['x', 'y', 'speed', 'acceleration']
+TIMELINE_COLUMNS = ['vehicle_id', 'sim_time', 'event', 'attack_type', 'attack_category', 'can_id',
+                    'signature_id', 'signature', 'src_ip', 'delta', *TRAJECTORY_COLUMNS]
+# Order of events at the same instant within a timeline
+EVENT_ORDER = {'injection': 0, 'alert': 1, 'telemetry': 2}
+
+def _source_key(path):
+    """Identity of a source file for cache invalidation (None if it does not exist)"""
+    if path is None or not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    return [str(path), stat.st_size, stat.st_mtime_ns]
+
+def _traffic_sources(run_dir):
+    traffic_dir = Path(run_dir) / "traffic"
+    binary = traffic_dir / "traffic.bin"
+    if binary.exists():
+        return [binary]
+    return sorted(traffic_dir.glob("traffic_step_*.csv"))
+
+def load_summary(run_dir):
+    path = Path(run_dir) / "simulation_summary.json"
+    if not path.exists():
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def load_anomalies(run_dir):
+    """The run's injected anomalies and its kinematic detector flags, each sorted by sim_time"""
+    df = pd.read_csv(Path(run_dir) / "anomalies" / "anomalies.csv",
+                     dtype={'vehicle_id': str, 'payload': str, 'source': str, 'reason': str})
+    df = df.sort_values('sim_time', kind='stable')
+    # Logs from before the detector have no source column: every row is an injection
+    if 'source' not in df:
+        return df.reset_index(drop=True), pd.DataFrame({'sim_time': np.empty(0), 'vehicle_id': np.empty(0, dtype=str),
+                                                        'reason': np.empty(0, dtype=str)})
+    detected = (df['source'] == 'kinematic').to_numpy()
+    detections = df.loc[detected, ['sim_time', 'vehicle_id', 'reason']].reset_index(drop=True)
+    anomalies = df[~detected].reset_index(drop=True)
+    # The detector's rows leave can_id empty, which made the column float
+    anomalies['can_id'] = anomalies['can_id'].astype(np.int64)
+    return anomalies, detections
+
+def load_traffic(run_dir):
+    """Trajectory columns of a run (vehicle_id as codes) and the vehicle ID dictionary"""
+    sources = _traffic_sources(run_dir)
+    if sources and sources[0].suffix == ".bin":
+        reader = TrafficLogReader(sources[0])
+        columns = reader.read_columns()
+        return columns, np.array(reader.vehicle_ids, dtype=str)
+    if not sources:
+        empty = {name: np.empty(0) for name in ['sim_time', *TRAJECTORY_COLUMNS]}
+        empty['vehicle_id'] = np.empty(0, dtype=np.int64)
+        return empty, np.empty(0, dtype=str)
+    df = pd.concat([pd.read_csv(path, dtype={'vehicle_id': str}) for path in sources], ignore_index=True)
+    codes, vehicle_ids = pd.factorize(df['vehicle_id'])
+    columns = {name: df[name].to_numpy(dtype=np.float64) for name in ['sim_time', *TRAJECTORY_COLUMNS]}
+    columns['vehicle_id'] = codes
+    return columns, np.asarray(vehicle_ids, dtype=str)
+
+def load_alerts(eve_path):
+    """Alert records of an eve.json file as column arrays (timestamps as epoch seconds); malformed ones are skipped"""
+    rows = []
+    with open(eve_path) as f:
+        for line in f:
+            fields = alert_fields(line)
+            if fields is not None:
+                rows.append(fields)
+    timestamps, sids, signatures, src_ips = zip(*rows) if rows else ((), (), (), ())
+    epoch = alert_epochs(list(timestamps))
+    valid = ~np.isnan(epoch)
+    return {
+        'epoch': epoch[valid],
+        'signature_id': np.array(sids, dtype=np.int64)[valid],
+        'signature': np.array(signatures, dtype=str)[valid],
+        'src_ip': np.array(src_ips, dtype=str)[valid]
+    }
+
+def alert_clock(epoch, summary, clock='auto'):
+    """Map alert epoch timestamps onto sim_time; returns (sim_times, clock used)"""
+    if clock == 'auto':
+        clock = 'wall'
+        if 'time_origin' in summary and len(epoch):
+            span_end = summary['time_origin'] + summary['simulation_duration'] / summary['time_scale']
+            inside = (epoch >= summary['time_origin'] - 1) & (epoch <= span_end + 1)
+            if inside.mean() >= 0.5:
+                clock = 'dataset'
+    if clock == 'dataset':
+        if 'time_origin' not in summary:
+            raise ValueError("simulation_summary.json has no time_origin; re-run the simulation or use --clock wall")
+        return (epoch - summary['time_origin']) * summary['time_scale'], clock
+    if 'wallclock_start' not in summary:
+        raise ValueError("simulation_summary.json has no wallclock_start; re-run the simulation or use --clock dataset")
+    rate = summary.get('realtime_factor')
+    if not rate:
+        # Unpaced run: assume simulated time advanced evenly over its wall time
+        simulated = summary['simulation_duration'] - summary['sim_start']
+        rate = simulated / summary['wall_seconds'] if summary.get('wall_seconds') else 1.0
+    return summary['sim_start'] + (epoch - summary['wallclock_start']) * rate, clock
+
+def _expand(lo, hi):
+    """For ranges [lo_i, hi_i): (range number, position) of every element, in range order"""
+    counts = hi - lo
+    owner = np.repeat(np.arange(len(lo)), counts)
+    starts = np.repeat(lo - (np.cumsum(counts) - counts), counts)
+    return owner, starts + np.arange(counts.sum())
+
+class CorrelationIndex:
+    """
+    Sorted indexes over one run's anomalies, trajectories and (optionally)
+    alerts. Built on first use and cached in <run_dir>/correlation/.
+    """
+
+    def __init__(self, run_dir, eve_path=None, clock='auto', use_cache=True):
+        self.run_dir = Path(run_dir)
+        self.eve_path = eve_path
+        self.cache_dir = self.run_dir / "correlation"
+        self.summary = load_summary(run_dir)
+        self.key = {
+            "version": INDEX_VERSION,
+            "clock": clock,
+            "summary": _source_key(self.run_dir / "simulation_summary.json"),
+            "anomalies": _source_key(self.run_dir / "anomalies" / "anomalies.csv"),
+            "traffic": [_source_key(path) for path in _traffic_sources(run_dir)],
+            "eve": _source_key(eve_path)
+        }
+        if not (use_cache and self._load()):
+            self._build(clock)
+            if use_cache:
+                self._save()
+
+    def _build(self, clock):
+        self.anomalies, self.detections = load_anomalies(self.run_dir)
+
+        columns, self.vehicle_ids = load_traffic(self.run_dir)
+        order = np.lexsort((columns['sim_time'], columns['vehicle_id']))
+        self.traffic = {name: np.asarray(values)[order] for name, values in columns.items()}
+
+        # Alert strings are dictionary encoded so joins copy integer codes, not strings
+        self.clock = None
+        self.alerts = {'sim_time': np.empty(0), 'epoch': np.empty(0), 'signature_id': np.empty(0, dtype=np.int64),
+                       'signature': np.empty(0, dtype=np.int32), 'src_ip': np.empty(0, dtype=np.int32)}
+        self.labels = {'signature': np.empty(0, dtype=str), 'src_ip': np.empty(0, dtype=str)}
+        if self.eve_path:
+            alerts = load_alerts(self.eve_path)
+            alerts['sim_time'], self.clock = alert_clock(alerts['epoch'], self.summary, clock)
+            for name in self.labels:
+                codes, labels = pd.factorize(alerts[name])
+                alerts[name] = codes.astype(np.int32)
+                self.labels[name] = np.asarray(labels, dtype=str)
+            order = np.argsort(alerts['sim_time'], kind='stable')
+            self.alerts = {name: values[order] for name, values in alerts.items()}
+
+    def _save(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        self.cache_dir.mkdir(parents=True)
+        arrays = {f"traffic_{name}": values for name, values in self.traffic.items()}
+        arrays.update({f"alerts_{name}": values for name, values in self.alerts.items()})
+        arrays.update({f"labels_{name}": values for name, values in self.labels.items()})
+        np.savez(self.cache_dir / "index.npz", vehicle_ids=self.vehicle_ids, **arrays)
+        self.anomalies.to_csv(self.cache_dir / "anomalies_sorted.csv", index=False)
+        self.detections.to_csv(self.cache_dir / "detections_sorted.csv", index=False)
+        with open(self.cache_dir / "index.json", "w") as f:
+            json.dump({"key": self.key, "clock": self.clock}, f, indent=2)
+
+    def _load(self):
+        try:
+            with open(self.cache_dir / "index.json") as f:
+                meta = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return False
+        if meta.get("key") != self.key:
+            return False
+        with np.load(self.cache_dir / "index.npz") as data:
+            self.vehicle_ids = data["vehicle_ids"]
+            for group in ("traffic", "alerts", "labels"):
+                prefix = f"{group}_"
+                setattr(self, group, {name[len(prefix):]: data[name] for name in data.files if name.startswith(prefix)})
+        self.anomalies = pd.read_csv(self.cache_dir / "anomalies_sorted.csv",
+                                     dtype={'vehicle_id': str, 'payload': str, 'source': str, 'reason': str})
+        self.detections = pd.read_csv(self.cache_dir / "detections_sorted.csv",
+                                      dtype={'vehicle_id': str, 'reason': str})
+        self.clock = meta["clock"]
+        return True
+
+    # Index lookups ------------------------------------------------------
+
+    def alert_window(self, times, before, after=None):
+        """Index ranges [lo, hi) of the alerts with time - before <= sim_time <= time + after"""
+        after = before if after is None else after
+        times = np.asarray(times, dtype=np.float64)
+        alert_times = self.alerts['sim_time']
+        return (np.searchsorted(alert_times, times - before, side='left'),
+                np.searchsorted(alert_times, times + after, side='right'))
+
+    def alert_labels(self, name, rows):
+        """Categorical signature or src_ip of alert rows (-1 rows are missing)"""
+        codes = np.where(rows >= 0, self.alerts[name][np.maximum(rows, 0)], -1) if len(self.alerts[name]) \
+            else np.full(len(rows), -1)
+        return pd.Categorical.from_codes(codes, categories=self.labels[name])
+
+    def vehicle_codes(self, vehicle_ids):
+        """Trajectory codes of vehicle IDs (-1 for vehicles with no telemetry)"""
+        lookup = pd.Index(self.vehicle_ids)
+        return lookup.get_indexer(pd.Index(np.asarray(vehicle_ids, dtype=str)))
+
+    def _trajectory_keys(self):
+        # Rows are sorted by (vehicle, time); one float key per row keeps that order, so
+        # per-vehicle time ranges for many vehicles are found with a single searchsorted
+        if not hasattr(self, "_keys"):
+            times = self.traffic['sim_time']
+            self._t_min = times.min() if len(times) else 0.0
+            self._span = (times.max() - self._t_min if len(times) else 0.0) + 1.0
+            self._keys = self.traffic['vehicle_id'].astype(np.float64) * self._span + (times - self._t_min)
+        return self._keys
+
+    def trajectory_window(self, codes, start, end):
+        """Index ranges [lo, hi) of each vehicle's telemetry with start <= sim_time <= end"""
+        keys = self._trajectory_keys()
+        codes = np.asarray(codes, dtype=np.int64)
+        start = np.clip(np.asarray(start, dtype=np.float64) - self._t_min, 0, self._span - 1)
+        end = np.clip(np.asarray(end, dtype=np.float64) - self._t_min, -0.5, self._span - 1)
+        lo = np.searchsorted(keys, codes * self._span + start, side='left')
+        hi = np.maximum(np.searchsorted(keys, codes * self._span + end, side='right'), lo)
+        missing = codes < 0
+        lo[missing] = hi[missing] = 0
+        return lo, hi
+
+    def trajectory(self, vehicle_id, start=None, end=None):
+        """One vehicle's telemetry as a DataFrame, optionally limited to [start, end]"""
+        code = self.vehicle_codes([vehicle_id])
+        lo, hi = self.trajectory_window(code, -np.inf if start is None else start,
+                                        np.inf if end is None else end)
+        rows = slice(lo[0], hi[0])
+        frame = pd.DataFrame({name: self.traffic[name][rows] for name in ['sim_time', *TRAJECTORY_COLUMNS]})
+        frame.insert(1, 'vehicle_id', vehicle_id)
+        return frame
+
+    # Joins --------------------------------------------------------------
+
+    def _cached(self, name, params, compute, use_cache=True):
+        """Load a query result from the cache directory, or compute and store it"""
+        digest = hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()[:12]
+        # Pickled rather than CSV: results run to millions of rows and must load faster than they compute
+        path = self.cache_dir / f"{name}_{digest}.pkl"
+        if use_cache and path.exists():
+            return pd.read_pickle(path)
+        result = compute()
+        if use_cache and self.cache_dir.exists():
+            result.to_pickle(path)
+        return result
+
+    def _anomaly_column(self, name):
+        # Sorted categories, so category codes order vehicles the same way their IDs sort
+        return pd.Categorical(self.anomalies[name].astype(str))
+
+    def alert_matches(self, window, use_cache=True):
+        """One row per (anomaly, alert) pair with |alert time - injection time| <= window"""
+        def compute():
+            injection_times = self.anomalies['sim_time'].to_numpy()
+            lo, hi = self.alert_window(injection_times, window)
+            owner, alert = _expand(lo, hi)
+            return pd.DataFrame({
+                'vehicle_id': self._anomaly_column('vehicle_id')[owner],
+                'injection_time': injection_times[owner],
+                'attack_type': self._anomaly_column('attack_type')[owner],
+                'alert_time': self.alerts['sim_time'][alert],
+                'delta': self.alerts['sim_time'][alert] - injection_times[owner],
+                'signature_id': self.alerts['signature_id'][alert],
+                'signature': self.alert_labels('signature', alert),
+                'src_ip': self.alert_labels('src_ip', alert)
+            })
+        return self._cached("matches", {"window": window}, compute, use_cache)
+
+    def incidents(self, window, use_cache=True):
+        """
+        One row per injected anomaly: the alerts within ±window (count, first
+        alert at or after the injection and its delay), the vehicle's first
+        kinematic flag at or after the injection (detection lag) and its first
+        telemetry sample at or after the injection (as-of joins).
+        """
+        def compute():
+            df = self.anomalies.copy()
+            times = df['sim_time'].to_numpy()
+            lo, hi = self.alert_window(times, window)
+            df['alerts_in_window'] = hi - lo
+
+            alert_times = self.alerts['sim_time']
+            first = np.searchsorted(alert_times, times, side='left')
+            first = np.where(first < hi, first, -1)
+            df['first_alert_delay'] = np.where(first >= 0, alert_times[np.maximum(first, 0)] - times, np.nan) \
+                if len(alert_times) else np.nan
+            df['first_alert_signature'] = self.alert_labels('signature', first)
+
+            df['detection_delay'] = np.nan
+            df['detection_reason'] = pd.Categorical([None] * len(df))
+            if len(self.detections):
+                detected = pd.merge_asof(df[['sim_time', 'vehicle_id']],
+                                         self.detections.rename(columns={'sim_time': 'detection_time'}),
+                                         left_on='sim_time', right_on='detection_time', by='vehicle_id',
+                                         direction='forward')
+                df['detection_delay'] = (detected['detection_time'] - detected['sim_time']).to_numpy()
+                df['detection_reason'] = pd.Categorical(detected['reason'])
+
+            codes = self.vehicle_codes(df['vehicle_id'])
+            sample, sample_end = self.trajectory_window(codes, times, np.inf)
+            seen = sample < sample_end
+            sample = np.where(seen, sample, 0)
+            for name in ['sim_time', *TRAJECTORY_COLUMNS]:
+                values = self.traffic[name][sample] if len(self.traffic[name]) else np.zeros(len(df))
+                df[f"first_seen_{name}" if name == 'sim_time' else name] = np.where(seen, values, np.nan)
+            df['telemetry_samples'] = sample_end - np.where(seen, sample, sample_end)
+            return df
+        return self._cached("incidents", {"window": window}, compute, use_cache)
+
+    def timelines(self, window, trajectory_seconds=10.0, use_cache=True):
+        """
+        Per-vehicle incident timelines: each malicious vehicle's injection, the
+        alerts within ±window of it and its telemetry from the injection to
+        trajectory_seconds later, ordered by time.
+        """
+        def compute():
+            times = self.anomalies['sim_time'].to_numpy()
+            n = len(times)
+            lo, hi = self.alert_window(times, window)
+            alert_owner, alert = _expand(lo, hi)
+            lo, hi = self.trajectory_window(self.vehicle_codes(self.anomalies['vehicle_id']),
+                                            times, times + trajectory_seconds)
+            telemetry_owner, row = _expand(lo, hi)
+            # A vehicle injected more than once would list the same samples twice
+            row, first = np.unique(row, return_index=True)
+            telemetry_owner = telemetry_owner[first]
+
+            # Rows: injections, then alerts, then telemetry; each column is built whole
+            owner = np.concatenate([np.arange(n), alert_owner, telemetry_owner])
+            event = np.repeat(np.arange(3, dtype=np.int8), [n, len(alert), len(row)])
+            is_injection, is_alert, is_telemetry = event == 0, event == 1, event == 2
+            alert_rows = np.full(len(owner), -1)
+            alert_rows[is_alert] = alert
+            telemetry_rows = np.zeros(len(owner), dtype=np.int64)
+            telemetry_rows[is_telemetry] = row
+
+            def anomaly_labels(name):
+                column = self._anomaly_column(name)
+                return pd.Categorical.from_codes(np.where(is_injection, column.codes[owner], -1), dtype=column.dtype)
+
+            def masked(values, mask, dtype=np.float64):
+                out = np.full(len(owner), np.nan, dtype=dtype)
+                out[mask] = values
+                return out
+
+            vehicles = self._anomaly_column('vehicle_id')
+            sim_time = np.concatenate([times, self.alerts['sim_time'][alert], self.traffic['sim_time'][row]])
+            timeline = pd.DataFrame({
+                'vehicle_id': vehicles[owner],
+                'sim_time': sim_time,
+                'event': pd.Categorical.from_codes(event, categories=list(EVENT_ORDER)),
+                'attack_type': anomaly_labels('attack_type'),
+                'attack_category': anomaly_labels('attack_category'),
+                'can_id': pd.arrays.IntegerArray(
+                    np.where(is_injection, self.anomalies['can_id'].to_numpy(dtype=np.int64)[owner], 0), ~is_injection),
+                'signature_id': pd.arrays.IntegerArray(
+                    np.where(is_alert, self.alerts['signature_id'][np.maximum(alert_rows, 0)]
+                             if len(alert) else 0, 0).astype(np.int64), ~is_alert),
+                'signature': self.alert_labels('signature', alert_rows),
+                'src_ip': self.alert_labels('src_ip', alert_rows),
+                'delta': masked(self.alerts['sim_time'][alert] - times[alert_owner], is_alert),
+                **{name: masked(self.traffic[name][row], is_telemetry) for name in TRAJECTORY_COLUMNS}
+            })
+            order = np.lexsort((event, sim_time, vehicles.codes[owner]))
+            return timeline.take(order).reset_index(drop=True)
+
+        return self._cached("timelines", {"window": window, "trajectory_seconds": trajectory_seconds},
+                            compute, use_cache)
+
+def print_report(index, incidents, matches):
+    print(f"Injected anomalies: {len(incidents):,} on {incidents['vehicle_id'].nunique():,} vehicles")
+    print(f"Telemetry rows: {len(index.traffic['sim_time']):,}  Alerts: {len(index.alerts['sim_time']):,}"
+          f"{f' (clock: {index.clock})' if index.clock else ''}")
+    if not len(incidents):
+        return
+    covered = incidents['alerts_in_window'] > 0
+    print(f"Anomalies with an alert in the window: {covered.sum():,} ({covered.mean():.1%})")
+    delays = incidents['first_alert_delay'].dropna()
+    if len(delays):
+        print(f"Delay to first alert: median {delays.median():.3f}s, p90 {delays.quantile(0.9):.3f}s")
+    with_telemetry = incidents['telemetry_samples'] > 0
+    print(f"Anomalies with a trajectory: {with_telemetry.sum():,} ({with_telemetry.mean():.1%})")
+    if len(index.detections):
+        lags = incidents['detection_delay'].dropna()
+        flagged = index.detections['vehicle_id'].unique()
+        unlabelled = np.setdiff1d(flagged, incidents['vehicle_id'].to_numpy().astype(str))
+        print(f"Kinematic flags: {len(index.detections):,} on {len(flagged):,} vehicles "
+              f"({len(unlabelled):,} not injected as malicious)")
+        print(f"Anomalies detected kinematically: {len(lags):,} ({len(lags) / len(incidents):.1%})")
+        if len(lags):
+            print(f"Detection lag: median {lags.median():.3f}s, p90 {lags.quantile(0.9):.3f}s")
+    if len(matches):
+        print("\nMatched alerts by signature:")
+        print(matches.groupby('signature', observed=True).size().sort_values(ascending=False).to_string())
+        print("\nAlert coverage by attack type:")
+        coverage = incidents.assign(covered=covered).groupby('attack_type', observed=True)['covered'].mean()
+        print(coverage.map('{:.1%}'.format).to_string())
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description='Correlate a run\'s anomalies, trajectories and Suricata alerts')
+    parser.add_argument('run_dir', help='Simulation run directory (logs/simulation_<ts>)')
+    parser.add_argument('--eve', default=None, help='eve.json with the alerts to correlate')
+    parser.add_argument('--clock', choices=['auto', 'dataset', 'wall'], default='auto',
+                        help='How alert timestamps map onto simulation time')
+    parser.add_argument('--window', type=float, default=1.0, help='Join window ±Δt in simulation seconds')
+    parser.add_argument('--trajectory', type=float, default=10.0,
+                        help='Seconds of telemetry after each injection in the timelines')
+    parser.add_argument('--vehicle', default=None, help='Print this vehicle\'s incident timeline')
+    parser.add_argument('--export', default=None, metavar='DIR',
+                        help='Also write incidents.csv, alert_matches.csv and timelines.csv to DIR')
+    parser.add_argument('--no-cache', action='store_true', help='Rebuild the index and results without the cache')
+    args = parser.parse_args()
+
+    use_cache = not args.no_cache
+    started = time.perf_counter()
+    index = CorrelationIndex(args.run_dir, args.eve, args.clock, use_cache)
+    built = time.perf_counter()
+    incidents = index.incidents(args.window, use_cache)
+    matches = index.alert_matches(args.window, use_cache)
+    timelines = index.timelines(args.window, args.trajectory, use_cache)
+    finished = time.perf_counter()
+
+    print_report(index, incidents, matches)
+    print(f"\nIndex ready in {built - started:.2f}s, joins in {finished - built:.2f}s")
+    if use_cache:
+        print(f"Results cached in {index.cache_dir}")
+    if args.export:
+        os.makedirs(args.export, exist_ok=True)
+        for name, frame in [('incidents', incidents), ('alert_matches', matches), ('timelines', timelines)]:
+            frame.to_csv(os.path.join(args.export, f"{name}.csv"), index=False)
+        print(f"Results exported to {args.export}")
+    if args.vehicle:
+        timeline = timelines[timelines['vehicle_id'] == args.vehicle]
+        print(f"\nTimeline for {args.vehicle}:")
+        print(timeline.dropna(axis=1, how='all').to_string(index=False))
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Incremental eve.json Aggregation Index
+Streams Suricata's eve.json once and keeps a small on-disk table of alert
+counts per (time bucket, signature, source IP). The byte offset reached in
+each log is stored with the table (via EveTailer), so a later update only
+folds in the lines appended since; a rotated or truncated log is picked up
+from its start.
+
+Summary tables and plots (counts by signature, alert rate over time, top
+talkers) are computed from the table, which stays small however large the
+log grows, instead of re-parsing the log.
+
+Example:
+    python3 scripts/eve_index.py /var/log/suricata/eve.json --index logs/eve_index
+    python3 scripts/eve_index.py logs/scan/eve.json --index logs/scan/eve_index --bucket 10 --top 5
+"""
+
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from eve_tailer import EveTailer
+
+INDEX_FILE = "index.json"
+KEYS = ['bucket', 'signature_id', 'signature', 'src_ip']
+# Log data parsed per chunk while folding a backlog into the index
+CHUNK_BYTES = 64 * 1024 * 1024
+
+def alert_fields(line):
+    """(timestamp, signature_id, signature, src_ip) of an eve.json alert line; None for other or malformed lines"""
+    try:
+        record = json.loads(line)
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(record, dict) or record.get('event_type') != 'alert':
+        return None
+    alert = record.get('alert', {})
+    timestamp = record.get('timestamp')
+    if not isinstance(alert, dict) or not isinstance(timestamp, str):
+        return None
+    sid = alert.get('signature_id', 0)
+    if not isinstance(sid, int):
+        return None
+    return timestamp, sid, str(alert.get('signature', '')), str(record.get('src_ip', ''))
+
+def alert_epochs(timestamps):
+    """Epoch seconds of eve.json timestamps; unparseable ones become NaN"""
+    epoch = pd.to_datetime(pd.Series(timestamps, dtype=object), utc=True, format='ISO8601', errors='coerce')
+    return (epoch - pd.Timestamp(0, tz='UTC')).dt.total_seconds().to_numpy()
+
+def parse_alerts(lines):
+    """
+    The alert records among eve.json lines, as a DataFrame of KEYS columns
+    (bucket as epoch seconds). Malformed records are skipped so one bad line
+    cannot stall the index at the same offset forever.
+    """
+    rows = []
+    for line in lines:
+        # Cheap pre-filter: most non-alert events (flow, stats, ...) never reach json.loads
+        if '"alert"' not in line:
+            continue
+        fields = alert_fields(line)
+        if fields is not None:
+            rows.append(fields)
+    timestamps, sids, signatures, src_ips = zip(*rows) if rows else ((), (), (), ())
+    frame = pd.DataFrame({
+        'bucket': alert_epochs(list(timestamps)),
+        'signature_id': np.array(sids, dtype=np.int64),
+        'signature': np.array(signatures, dtype=object),
+        'src_ip': np.array(src_ips, dtype=object)
+    })
+    return frame[~np.isnan(frame['bucket'].to_numpy())].reset_index(drop=True)
+
+class EveIndex:
+    """
+    Alert counts per bucket_seconds time bucket, signature and source IP,
+    kept in index_dir. Opening an index built with another bucket size starts
+    it afresh.
+    """
+
+    def __init__(self, index_dir, bucket_seconds=60):
+        self.index_dir = Path(index_dir)
+        self.bucket_seconds = bucket_seconds
+        self.tailer = EveTailer()
+        self.generation = 0
+        self.counts = pd.DataFrame({'bucket': np.empty(0, dtype=np.int64), 'signature_id': np.empty(0, dtype=np.int64),
+                                    'signature': pd.Categorical([]), 'src_ip': pd.Categorical([]),
+                                    'count': np.empty(0, dtype=np.int64)})
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.index_dir / INDEX_FILE) as f:
+                meta = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return
+        if meta.get("bucket_seconds") != self.bucket_seconds:
+            print(f"⚠️  {self.index_dir} was built with {meta.get('bucket_seconds')}s buckets; rebuilding")
+            return
+        with np.load(self.index_dir / meta["counts_file"]) as data:
+            self.counts = pd.DataFrame({
+                'bucket': data['bucket'],
+                'signature_id': data['signature_id'],
+                'signature': pd.Categorical.from_codes(data['signature'], data['signature_labels'].astype(object)),
+                'src_ip': pd.Categorical.from_codes(data['src_ip'], data['src_ip_labels'].astype(object)),
+                'count': data['count']
+            })
+        self.tailer.positions = meta["positions"]
+        self.generation = meta["generation"]
+
+    def _save(self):
+        """
+        Write the counts under a new generation, then switch index.json (with
+        the log offsets they cover) to it atomically, so a crash mid-update
+        leaves the previous index intact.
+        """
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        self.generation += 1
+        counts_file = f"counts_{self.generation}.npz"
+        arrays = {name: self.counts[name].to_numpy() for name in ('bucket', 'signature_id', 'count')}
+        for name in ('signature', 'src_ip'):
+            column = self.counts[name].cat
+            arrays[name] = column.codes.to_numpy().astype(np.int32)
+            arrays[f"{name}_labels"] = np.asarray(column.categories, dtype=str)
+        np.savez(self.index_dir / counts_file, **arrays)
+
+        tmp_path = self.index_dir / f"{INDEX_FILE}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"bucket_seconds": self.bucket_seconds, "generation": self.generation,
+                       "counts_file": counts_file, "positions": self.tailer.positions}, f, indent=2)
+        os.replace(tmp_path, self.index_dir / INDEX_FILE)
+        for old in self.index_dir.glob("counts_*.npz"):
+            if old.name != counts_file:
+                old.unlink()
+
+    def update(self, eve_path, chunk_bytes=CHUNK_BYTES):
+        """Fold the lines appended to eve_path since the last update into the index; returns alerts added"""
+        added = 0
+        parts = [self.counts]
+        while True:
+            lines = self.tailer.read_new_lines(eve_path, chunk_bytes)
+            if not lines:
+                break
+            alerts = parse_alerts(lines)
+            if not len(alerts):
+                continue
+            alerts['bucket'] = (alerts['bucket'] // self.bucket_seconds * self.bucket_seconds).astype(np.int64)
+            parts.append(alerts.groupby(KEYS, sort=False).size().rename('count').reset_index())
+            added += len(alerts)
+        self.tailer.close()
+        if added:
+            merged = pd.concat([part.astype({'signature': object, 'src_ip': object}) for part in parts], ignore_index=True)
+            self.counts = merged.groupby(KEYS, sort=False)['count'].sum().reset_index()
+        # Strings are kept dictionary encoded, so the summary queries group on integer codes
+        self.counts = self.counts.astype({'signature': 'category', 'src_ip': 'category'})
+        self._save()
+        return added
+
+    # Summary tables -----------------------------------------------------
+
+    @property
+    def total(self):
+        return int(self.counts['count'].sum())
+
+    def by_signature(self):
+        """Alert counts per signature, most frequent first"""
+        return (self.counts.groupby(['signature_id', 'signature'], observed=True)['count'].sum()
+                .sort_values(ascending=False).reset_index())
+
+    def top_talkers(self, n=10):
+        """The n source IPs with the most alerts, with how many signatures each triggered"""
+        talkers = self.counts.groupby('src_ip', observed=True).agg(count=('count', 'sum'),
+                                                                   signatures=('signature_id', 'nunique'))
+        return talkers.sort_values('count', ascending=False).head(n).reset_index()
+
+    def rate(self, signatures=None):
+        """
+        Alerts per bucket over time (a DataFrame indexed by bucket start time,
+        one column per signature for the given signatures, else a total column)
+        """
+        counts = self.counts
+        if signatures is not None:
+            counts = counts[counts['signature'].isin(signatures)]
+            table = counts.pivot_table(index='bucket', columns='signature', values='count', aggfunc='sum',
+                                       fill_value=0, observed=True)
+        else:
+            table = counts.groupby('bucket')['count'].sum().to_frame('total')
+        if len(table):
+            # Empty buckets between the first and last alert count as zero
+            table = table.reindex(np.arange(table.index.min(), table.index.max() + 1, self.bucket_seconds), fill_value=0)
+        table.index = pd.to_datetime(table.index, unit='s', utc=True)
+        table.index.name = 'time'
+        return table
+
+def print_summary(index, top=10):
+    print(f"Alerts indexed: {index.total:,} in {index.counts['bucket'].nunique():,} buckets of {index.bucket_seconds}s")
+    if not index.total:
+        return
+    print("\nAlerts by signature:")
+    print(index.by_signature().head(top).to_string(index=False))
+    print(f"\nTop {top} talkers:")
+    print(index.top_talkers(top).to_string(index=False))
+    rate = index.rate()['total']
+    print(f"\nAlert rate per {index.bucket_seconds}s bucket: mean {rate.mean():.1f}, max {rate.max():,} at {rate.idxmax()}")
+
+if __name__ == "__main__":
+    import argparse
+    import shutil
+    import time
+
+    parser = argparse.ArgumentParser(description='Incrementally index eve.json alert counts and print summary tables')
+    parser.add_argument('eve', nargs='+', help='eve.json file(s) to fold into the index')
+    parser.add_argument('--index', default='logs/eve_index', help='Index directory')
+    parser.add_argument('--bucket', type=int, default=60, help='Time bucket in seconds')
+    parser.add_argument('--top', type=int, default=10, help='Rows in the signature and talker tables')
+    parser.add_argument('--rebuild', action='store_true', help='Discard the index and re-read the logs from the start')
+    args = parser.parse_args()
+
+    if args.rebuild:
+        shutil.rmtree(args.index, ignore_errors=True)
+    started = time.perf_counter()
+    index = EveIndex(args.index, args.bucket)
+    added = sum(index.update(path) for path in args.eve)
+    print(f"📥 Folded {added:,} new alerts into {args.index} in {time.perf_counter() - started:.2f}s\n")
+    print_summary(index, args.top)
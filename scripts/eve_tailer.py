@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Incremental eve.json Tailer
+Keeps a byte offset and inode per followed file so each poll only reads the
+complete lines appended since the previous one. Positions can be persisted to
+a small JSON state file so a restarted process continues where it left off
+instead of replaying the whole log. Handles Suricata log rotation (the path
+now points at a different inode) and truncation (the file shrank).
+"""
+
+import json
+import os
+from pathlib import Path
+
+class _FollowedFile:
+    def __init__(self, handle, inode):
+        self.handle = handle
+        self.inode = inode
+
+    @property
+    def offset(self):
+        return self.handle.tell()
+
+class EveTailer:
+    """Reads newly appended complete lines from one or more log files"""
+
+    def __init__(self, state_path=None):
+        self.state_path = Path(state_path) if state_path else None
+        self.positions = {}
+        self._files = {}
+        if self.state_path and self.state_path.exists():
+            try:
+                with open(self.state_path) as f:
+                    self.positions = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"Warning: could not read tailer state {self.state_path}: {e}")
+
+    def read_new_lines(self, path, max_bytes=None):
+        """
+        Return the complete lines appended to path since the last call.
+        A trailing line without a newline is left for the next call.
+        With max_bytes, stop after about that much data (whole lines), so a
+        large backlog can be consumed in chunks by calling until it returns [].
+        """
+        path = str(path)
+        lines = []
+        followed = self._files.get(path)
+
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            # Rotated away and not recreated yet: finish the old file if we have it
+            if followed is not None:
+                lines.extend(self._drain(followed))
+                self._forget(path)
+            return lines
+
+        if followed is not None and followed.inode != st.st_ino:
+            # Rotated: read what is left of the old file, then start the new one
+            lines.extend(self._drain(followed))
+            self._forget(path)
+            followed = None
+            self.positions[path] = {"inode": st.st_ino, "offset": 0}
+
+        if followed is None:
+            followed = self._open(path, st)
+        elif st.st_size < followed.offset:
+            # Truncated in place
+            followed.handle.seek(0)
+
+        lines.extend(self._drain(followed, max_bytes))
+        self.positions[path] = {"inode": followed.inode, "offset": followed.offset}
+        return lines
+
+    def save(self):
+        """Persist current positions (atomically) so a restart does not replay history"""
+        if not self.state_path:
+            return
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.state_path.with_name(self.state_path.name + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(self.positions, f)
+        os.replace(tmp_path, self.state_path)
+
+    def close(self):
+        for path in list(self._files):
+            self._forget(path)
+
+    def _open(self, path, st):
+        saved = self.positions.get(path)
+        offset = 0
+        if saved and saved.get("inode") == st.st_ino and saved.get("offset", 0) <= st.st_size:
+            offset = saved["offset"]
+        handle = open(path, "rb")
+        handle.seek(offset)
+        followed = _FollowedFile(handle, st.st_ino)
+        self._files[path] = followed
+        return followed
+
+    def _forget(self, path):
+        followed = self._files.pop(path, None)
+        if followed is not None:
+            followed.handle.close()
+
+    @staticmethod
+    def _drain(followed, max_bytes=None):
+        data = followed.handle.read(max_bytes or -1)
+        if not data:
+            return []
+        if max_bytes and not data.endswith(b"\n"):
+            # Finish the line the limit cut through
+            data += followed.handle.readline()
+        end = data.rfind(b"\n")
+        if end < 0:
+            followed.handle.seek(-len(data), os.SEEK_CUR)
+            return []
+        partial = len(data) - end - 1
+        if partial:
+            followed.handle.seek(-partial, os.SEEK_CUR)
+        return [line.decode("utf-8", errors="replace") for line in data[:end].split(b"\n") if line]
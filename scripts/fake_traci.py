@@ -0,0 +1,480 @@
+#!/usr/bin/env python3
+"""
+Stand-in TraCI Backend
+An in-process replacement for the traci package that implements the calls
+inject_sumo.py makes (simulation, vehicle, route and vehicletype domains,
+subscriptions and saved states), so the simulation loop can be run and
+benchmarked without a SUMO binary or a TraCI socket.
+
+Vehicles drive along polyline routes with simple kinematics: each step they
+accelerate towards their desired speed (the route's speed limit times a
+per-vehicle speed factor), move along the route and leave the simulation at
+its end. Vehicle state is kept in numpy arrays so a step costs the same
+handful of array operations regardless of how many vehicles are driving.
+
+Every TraCI call can be given a fixed latency to model the socket round trip
+of a real TraCI connection, and calls are counted per function.
+
+spoof_rate makes that fraction of malicious vehicles report spoofed telemetry
+some seconds after they depart (a position jump, a frozen position or an
+impossible acceleration, in turn), to exercise kinematic_detector.py.
+
+Example:
+    from fake_traci import FakeTraci, install
+    backend = install(FakeTraci(latency=50e-6, background_vehicles=500))
+    import inject_sumo
+    inject_sumo.run_simulation("data/cleaned_iov.csv", "sumo/simple.sumocfg", "logs", duration=600)
+"""
+
+import json
+import sys
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+# Default network: sumo/simple.net.xml's two edges between junction0 (0, 0) and junction1 (1000, 0)
+DEFAULT_ROUTES = {"route0": [(0.0, 0.0), (1000.0, 0.0), (0.0, 0.0)]}
+DEFAULT_SPEED_LIMIT = 13.89
+DEFAULT_VEHICLE_TYPES = ["DEFAULT_VEHTYPE", "car"]
+
+# Spoofed telemetry: mode per spoofing vehicle (0 = honest), the offset of a position jump
+# and the reported acceleration of an acceleration spoof
+SPOOF_MODES = ["none", "jump", "freeze", "acceleration"]
+SPOOF_JUMP = 250.0
+SPOOF_ACCEL = 15.0
+
+# Variable ids as in traci.constants
+constants = SimpleNamespace(
+    VAR_SPEED=0x40,
+    VAR_POSITION=0x42,
+    VAR_TYPE=0x4f,
+    VAR_ROUTE_ID=0x53,
+    VAR_ACCELERATION=0x72
+)
+
+class TraCIException(Exception):
+    pass
+
+exceptions = SimpleNamespace(TraCIException=TraCIException, FatalTraCIError=RuntimeError)
+
+class _Route:
+    """A polyline with cumulative distances, for interpolating positions"""
+
+    def __init__(self, points):
+        points = np.asarray(points, dtype=np.float64)
+        self.xs = points[:, 0]
+        self.ys = points[:, 1]
+        self.cumulative = np.concatenate([[0.0], np.cumsum(np.hypot(np.diff(self.xs), np.diff(self.ys)))])
+        self.length = float(self.cumulative[-1])
+
+    def positions(self, distance):
+        return np.interp(distance, self.cumulative, self.xs), np.interp(distance, self.cumulative, self.ys)
+
+class _Domain:
+    def __init__(self, backend):
+        self._backend = backend
+
+class _SimulationDomain(_Domain):
+    def getTime(self):
+        self._backend._call("simulation.getTime")
+        return self._backend.time
+
+    def getDepartedIDList(self):
+        self._backend._call("simulation.getDepartedIDList")
+        return list(self._backend.departed)
+
+    def getArrivedIDList(self):
+        self._backend._call("simulation.getArrivedIDList")
+        return list(self._backend.arrived)
+
+    def getMinExpectedNumber(self):
+        self._backend._call("simulation.getMinExpectedNumber")
+        return self._backend.count + len(self._backend.pending)
+
+    def saveState(self, path):
+        self._backend._call("simulation.saveState")
+        with open(path, "w") as f:
+            json.dump(self._backend.state(), f)
+
+    def loadState(self, path):
+        self._backend._call("simulation.loadState")
+        with open(path) as f:
+            self._backend.restore(json.load(f))
+
+class _VehicleDomain(_Domain):
+    def add(self, vehID, routeID, typeID="DEFAULT_VEHTYPE", depart=None, departLane="first",
+            departPos="base", departSpeed="0", **kwargs):
+        self._backend._call("vehicle.add")
+        self._backend.add_vehicle(vehID, routeID, typeID, departSpeed)
+
+    def getIDList(self):
+        self._backend._call("vehicle.getIDList")
+        return list(self._backend.ids)
+
+    def getIDCount(self):
+        self._backend._call("vehicle.getIDCount")
+        return self._backend.count
+
+    def getPosition(self, vehID):
+        self._backend._call("vehicle.getPosition")
+        slot = self._backend.slot(vehID)
+        return (float(self._backend.x[slot]), float(self._backend.y[slot]))
+
+    def getSpeed(self, vehID):
+        self._backend._call("vehicle.getSpeed")
+        return float(self._backend.speed[self._backend.slot(vehID)])
+
+    def getAcceleration(self, vehID):
+        self._backend._call("vehicle.getAcceleration")
+        return float(self._backend.accel[self._backend.slot(vehID)])
+
+    def getTypeID(self, vehID):
+        self._backend._call("vehicle.getTypeID")
+        return self._backend.types[self._backend.slot(vehID)]
+
+    def getRouteID(self, vehID):
+        self._backend._call("vehicle.getRouteID")
+        return self._backend.route_ids[self._backend.route_index[self._backend.slot(vehID)]]
+
+    def setColor(self, vehID, color):
+        self._backend._call("vehicle.setColor")
+        if vehID not in self._backend.slots and vehID not in self._backend.pending_ids:
+            raise TraCIException(f"Vehicle '{vehID}' is not known")
+
+    def subscribe(self, objectID, varIDs=(constants.VAR_ROUTE_ID, constants.VAR_POSITION), begin=None, end=None):
+        self._backend._call("vehicle.subscribe")
+        self._backend.slot(objectID)
+        self._backend.subscriptions[objectID] = list(varIDs)
+
+    def getAllSubscriptionResults(self):
+        self._backend._call("vehicle.getAllSubscriptionResults")
+        return self._backend.subscription_results()
+
+class _RouteDomain(_Domain):
+    def getIDList(self):
+        self._backend._call("route.getIDList")
+        return list(self._backend.route_ids)
+
+class _VehicleTypeDomain(_Domain):
+    def getIDList(self):
+        self._backend._call("vehicletype.getIDList")
+        return list(self._backend.vehicle_types)
+
+    def copy(self, origTypeID, newTypeID):
+        self._backend._call("vehicletype.copy")
+        if origTypeID not in self._backend.vehicle_types:
+            raise TraCIException(f"Vehicle type '{origTypeID}' is not known")
+        self._backend.vehicle_types.append(newTypeID)
+
+    def setColor(self, typeID, color):
+        self._backend._call("vehicletype.setColor")
+
+class FakeTraci:
+    """
+    Module-like stand-in for traci (use it wherever inject_sumo.py uses the
+    traci module).
+
+    latency: seconds added to every TraCI call (busy-waited, so sub-millisecond
+    values are honoured); routes: {route_id: [(x, y), ...]}; speed_limit in m/s;
+    background_vehicles: vehicles inserted at start that drive in a loop, to
+    benchmark telemetry against a given vehicle count; spoof_rate: fraction of
+    malicious_vehicle vehicles that start reporting spoofed telemetry between
+    0 and spoof_delay seconds after departing.
+    """
+
+    constants = constants
+    exceptions = exceptions
+
+    # Per-vehicle arrays (besides the x/y positions derived from them), in slot order
+    ARRAYS = ("route_index", "distance", "speed", "accel", "desired_speed", "looping",
+              "spoof_mode", "spoof_at", "frozen_x", "frozen_y")
+
+    def __init__(self, latency=0.0, routes=None, speed_limit=DEFAULT_SPEED_LIMIT, max_accel=2.6,
+                 background_vehicles=0, step_length=0.1, seed=0, spoof_rate=0.0, spoof_delay=20.0):
+        self.latency = latency
+        self.spoof_rate = spoof_rate
+        self.spoof_delay = spoof_delay
+        self.speed_limit = speed_limit
+        self.max_accel = max_accel
+        self.background_vehicles = background_vehicles
+        self.default_step_length = step_length
+        self.default_seed = seed
+        self.route_ids = list(routes or DEFAULT_ROUTES)
+        self.routes = [_Route(points) for points in (routes or DEFAULT_ROUTES).values()]
+        self.route_lengths = np.array([route.length for route in self.routes])
+        self.calls = {}
+        self.simulation = _SimulationDomain(self)
+        self.vehicle = _VehicleDomain(self)
+        self.route = _RouteDomain(self)
+        self.vehicletype = _VehicleTypeDomain(self)
+        self.loaded = False
+        self._reset(step_length, seed)
+
+    def _reset(self, step_length, seed, save_rng=False):
+        self.step_length = step_length
+        self.seed = seed
+        self.save_rng = save_rng
+        self.rng = np.random.default_rng(seed)
+        self.time = 0.0
+        self.steps = 0
+        self.vehicle_types = list(DEFAULT_VEHICLE_TYPES)
+        self.count = 0
+        self.ids = []
+        self.types = []
+        self.slots = {}
+        self.route_index = np.zeros(0, dtype=np.int32)
+        self.distance = np.zeros(0)
+        self.speed = np.zeros(0)
+        self.accel = np.zeros(0)
+        self.desired_speed = np.zeros(0)
+        self.looping = np.zeros(0, dtype=bool)
+        self.x = np.zeros(0)
+        self.y = np.zeros(0)
+        self.spoof_mode = np.zeros(0, dtype=np.int8)
+        self.spoof_at = np.zeros(0)
+        self.frozen_x = np.zeros(0)
+        self.frozen_y = np.zeros(0)
+        self.spoofers = 0
+        self.pending = []
+        self.pending_ids = set()
+        self.departed = []
+        self.arrived = []
+        self.subscriptions = {}
+
+    def _call(self, name):
+        self.calls[name] = self.calls.get(name, 0) + 1
+        if self.latency:
+            deadline = time.perf_counter() + self.latency
+            while time.perf_counter() < deadline:
+                pass
+
+    # Connection ---------------------------------------------------------
+
+    def start(self, cmd, port=None, label="default", **kwargs):
+        """Start a fresh simulation; --step-length, --seed and --save-state.rng in cmd are honoured"""
+        self._call("start")
+        options = dict(zip(cmd[1::2], cmd[2::2])) if cmd else {}
+        self._reset(float(options.get("--step-length", self.default_step_length)),
+                    int(options.get("--seed", self.default_seed)),
+                    options.get("--save-state.rng") == "true")
+        self.loaded = True
+        # Like car0 in sumo/simple.rou.xml, plus any requested background traffic; all depart in the first step
+        self.add_vehicle("car0", self.route_ids[0], "car", "0")
+        for i in range(self.background_vehicles):
+            self.add_vehicle(f"bg_{i}", self.route_ids[i % len(self.route_ids)], "car", "random", loop=True)
+        return (21, "SUMO stand-in")
+
+    def close(self, wait=True):
+        self._call("close")
+        self.loaded = False
+
+    def isLoaded(self):
+        return self.loaded
+
+    def simulationStep(self, step=0.0):
+        self._call("simulationStep")
+        self.arrived = self._advance()
+        self.departed = self._insert_pending()
+        self.time = round(self.time + self.step_length, 6)
+        self.steps += 1
+
+    # Vehicle state ------------------------------------------------------
+
+    def slot(self, veh_id):
+        slot = self.slots.get(veh_id)
+        if slot is None:
+            raise TraCIException(f"Vehicle '{veh_id}' is not known")
+        return slot
+
+    def add_vehicle(self, veh_id, route_id, type_id, depart_speed, loop=False):
+        if veh_id in self.slots or veh_id in self.pending_ids:
+            raise TraCIException(f"Vehicle '{veh_id}' already exists")
+        if route_id not in self.route_ids:
+            raise TraCIException(f"Route '{route_id}' is not known")
+        if type_id not in self.vehicle_types:
+            raise TraCIException(f"Vehicle type '{type_id}' is not known")
+        self.pending.append((veh_id, self.route_ids.index(route_id), type_id, depart_speed, loop))
+        self.pending_ids.add(veh_id)
+
+    def _grow(self, needed):
+        capacity = len(self.distance)
+        if needed <= capacity:
+            return
+        capacity = max(needed, 2 * capacity, 64)
+        for name in self.ARRAYS + ("x", "y"):
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def _insert_pending(self):
+        """Insert the vehicles added since the last step; returns their ids"""
+        pending, self.pending = self.pending, []
+        self.pending_ids.clear()
+        if not pending:
+            return []
+        start = self.count
+        self._grow(start + len(pending))
+        end = start + len(pending)
+        factors = self.rng.normal(1.0, 0.1, len(pending)).clip(0.8, 1.2)
+        self.desired_speed[start:end] = self.speed_limit * factors
+        draws = self.rng.random(len(pending))
+        # Only draw for spoofing when it is on, so runs without it keep their random sequence
+        spoof_draws = self.rng.random((len(pending), 2)) if self.spoof_rate else np.ones((len(pending), 2))
+        departed = []
+        for offset, (veh_id, route, type_id, depart_speed, loop) in enumerate(pending):
+            slot = start + offset
+            self.ids.append(veh_id)
+            self.types.append(type_id)
+            self.slots[veh_id] = slot
+            self.route_index[slot] = route
+            self.looping[slot] = loop
+            if depart_speed == "random":
+                self.speed[slot] = draws[offset] * self.desired_speed[slot]
+            elif depart_speed == "max":
+                self.speed[slot] = self.desired_speed[slot]
+            else:
+                self.speed[slot] = float(depart_speed or 0)
+            self.spoof_mode[slot] = 0
+            if type_id == "malicious_vehicle" and spoof_draws[offset, 0] < self.spoof_rate:
+                self.spoof_mode[slot] = self.spoofers % (len(SPOOF_MODES) - 1) + 1
+                self.spoof_at[slot] = self.time + spoof_draws[offset, 1] * self.spoof_delay
+                self.frozen_x[slot] = np.nan
+                self.spoofers += 1
+            departed.append(veh_id)
+        self.distance[start:end] = 0.0
+        self.accel[start:end] = 0.0
+        self.count = end
+        self._update_positions(start, end)
+        return departed
+
+    def _advance(self):
+        """Move every vehicle one step; returns the ids of vehicles that reached their route's end"""
+        n = self.count
+        if not n:
+            return []
+        speed = self.speed[:n]
+        new_speed = np.minimum(speed + self.max_accel * self.step_length, self.desired_speed[:n])
+        self.accel[:n] = (new_speed - speed) / self.step_length
+        speed[:] = new_speed
+        self.distance[:n] += new_speed * self.step_length
+
+        lengths = self.route_lengths[self.route_index[:n]]
+        finished = self.distance[:n] >= lengths
+        looping = finished & self.looping[:n]
+        self.distance[:n][looping] -= lengths[looping]
+        arrived_slots = np.flatnonzero(finished & ~self.looping[:n])
+        arrived = self._remove(arrived_slots)
+        self._update_positions(0, self.count)
+        return arrived
+
+    def _remove(self, slots):
+        """Drop vehicles by slot, keeping the arrays dense by moving the last vehicles into the gaps"""
+        if not len(slots):
+            return []
+        removed = [self.ids[slot] for slot in slots]
+        keep = np.ones(self.count, dtype=bool)
+        keep[slots] = False
+        kept = np.flatnonzero(keep)
+        for name in self.ARRAYS:
+            array = getattr(self, name)
+            array[:len(kept)] = array[kept]
+        self.ids = [self.ids[slot] for slot in kept]
+        self.types = [self.types[slot] for slot in kept]
+        self.slots = {veh_id: slot for slot, veh_id in enumerate(self.ids)}
+        self.count = len(kept)
+        for veh_id in removed:
+            self.subscriptions.pop(veh_id, None)
+        return removed
+
+    def _update_positions(self, start, end):
+        route = self.route_index[start:end]
+        for index, path in enumerate(self.routes):
+            mask = route == index
+            if mask.any():
+                self.x[start:end][mask], self.y[start:end][mask] = path.positions(self.distance[start:end][mask])
+        self._spoof(start, end)
+
+    def _spoof(self, start, end):
+        """Overwrite the reported position/acceleration of vehicles whose spoofing has begun"""
+        mode = self.spoof_mode[start:end]
+        active = (mode > 0) & (self.spoof_at[start:end] <= self.time)
+        if not active.any():
+            return
+        x, y = self.x[start:end], self.y[start:end]
+        y[active & (mode == 1)] += SPOOF_JUMP
+        frozen = active & (mode == 2)
+        frozen_x, frozen_y = self.frozen_x[start:end], self.frozen_y[start:end]
+        onset = frozen & np.isnan(frozen_x)
+        frozen_x[onset], frozen_y[onset] = x[onset], y[onset]
+        x[frozen], y[frozen] = frozen_x[frozen], frozen_y[frozen]
+        self.accel[start:end][active & (mode == 3)] = SPOOF_ACCEL
+
+    def subscription_results(self):
+        if not self.subscriptions:
+            return {}
+        slots = [self.slots[veh_id] for veh_id in self.subscriptions]
+        xs = self.x[slots].tolist()
+        ys = self.y[slots].tolist()
+        speeds = self.speed[slots].tolist()
+        accels = self.accel[slots].tolist()
+        results = {}
+        for i, (veh_id, variables) in enumerate(self.subscriptions.items()):
+            values = {
+                constants.VAR_POSITION: (xs[i], ys[i]),
+                constants.VAR_SPEED: speeds[i],
+                constants.VAR_ACCELERATION: accels[i],
+                constants.VAR_TYPE: self.types[slots[i]],
+                constants.VAR_ROUTE_ID: self.route_ids[self.route_index[slots[i]]]
+            }
+            results[veh_id] = {var: values[var] for var in variables}
+        return results
+
+    # Saved states -------------------------------------------------------
+
+    def state(self):
+        """Saved state; like SUMO, the RNG is only included when started with --save-state.rng true"""
+        n = self.count
+        state = {
+            "time": self.time,
+            "steps": self.steps,
+            "vehicle_types": self.vehicle_types,
+            "ids": self.ids,
+            "types": self.types,
+            "spoofers": self.spoofers,
+            "arrays": {name: getattr(self, name)[:n].tolist() for name in self.ARRAYS}
+        }
+        if self.save_rng:
+            state["rng"] = self.rng.bit_generator.state
+        return state
+
+    def restore(self, state):
+        # Without a saved RNG the generator keeps the freshly seeded state of this process, as SUMO's does
+        self._reset(self.step_length, self.seed, self.save_rng)
+        self.time = state["time"]
+        self.steps = state["steps"]
+        self.vehicle_types = state["vehicle_types"]
+        self.ids = state["ids"]
+        self.types = state["types"]
+        self.spoofers = state.get("spoofers", 0)
+        self.count = len(self.ids)
+        self.slots = {veh_id: slot for slot, veh_id in enumerate(self.ids)}
+        self._grow(self.count)
+        for name, values in state["arrays"].items():
+            array = getattr(self, name)
+            array[:self.count] = np.asarray(values, dtype=array.dtype)
+        if "rng" in state:
+            self.rng.bit_generator.state = state["rng"]
+        self._update_positions(0, self.count)
+
+def install(backend=None):
+    """
+    Make `import traci` return the stand-in (so inject_sumo.py imports without
+    SUMO installed) and point an already imported inject_sumo at it.
+    """
+    backend = backend or FakeTraci()
+    sys.modules["traci"] = backend
+    if "inject_sumo" in sys.modules:
+        sys.modules["inject_sumo"].traci = backend
+    return backend
@@ -6,54 +6,265 @@ into a SUMO simulation and exports detailed logs and timestamped traffic data.
 """
 
 import traci
-import pandas as pd
 import numpy as np
 import time
 import random
 import os
 import sys
 import datetime
+import csv
+import json
+import logging
 from pathlib import Path
 
-def setup_logging(output_dir):
-    """Set up directories for logging simulation data"""
-    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-    log_dir = Path(output_dir) / f"simulation_{timestamp}"
+from iov_binary import read_dataset
+from kinematic_detector import KinematicDetector
+from sim_metrics import NullMetrics, SimMetrics, configure_logging
+from traffic_sink import TrafficSink
+
+logger = logging.getLogger("inject_sumo")
+
+STEP_LENGTH = 0.1  # Seconds of simulation time advanced per TraCI step
+
+class InjectionSchedule:
+    """
+    Precomputed injection schedule over the time-sorted dataset.
+
+    The columns needed for injection are pulled out of the DataFrame once, and a
+    cursor walks forward through them so each simulation step only touches the
+    rows that became due since the previous step.
+    """
+
+    def __init__(self, df):
+        df = df.sort_values('sim_time', kind='stable')
+        self.sim_time = df['sim_time'].to_numpy(dtype=np.float64)
+        self.is_malicious = df['is_malicious'].astype(int).tolist()
+        self.can_id = df['can_id'].tolist()
+        self.payload = df['payload'].tolist()
+        self.attack_category = df['attack_category'].tolist()
+        self.attack_type = df['attack_type'].tolist()
+        self.cursor = 0
+
+    def __len__(self):
+        return len(self.sim_time)
+
+    def due(self, current_time):
+        """Return the index range of rows with sim_time <= current_time not yet injected"""
+        end = int(np.searchsorted(self.sim_time, current_time, side='right'))
+        start = self.cursor
+        self.cursor = max(end, start)
+        return range(start, self.cursor)
+
+    def exhausted(self):
+        return self.cursor >= len(self.sim_time)
+
+class TelemetryCollector:
+    """
+    Collects position, speed, acceleration and type for every vehicle in the
+    simulation and returns them as column arrays.
+
+    mode='poll' issues the four per-vehicle getters on every collection step.
+    mode='subscribe' subscribes each vehicle to those variables once when it
+    departs, so a collection step is a single getAllSubscriptionResults call.
+    """
+
+    def __init__(self, mode='poll', metrics=None):
+        if mode not in ('poll', 'subscribe'):
+            raise ValueError(f"Unknown telemetry mode: {mode}")
+        self.mode = mode
+        self.metrics = metrics or NullMetrics()
+        self.variables = [
+            traci.constants.VAR_POSITION,
+            traci.constants.VAR_SPEED,
+            traci.constants.VAR_ACCELERATION,
+            traci.constants.VAR_TYPE
+        ]
+
+    def on_step(self):
+        """Subscribe the vehicles that departed during the last simulation step"""
+        if self.mode != 'subscribe':
+            return
+        departed = traci.simulation.getDepartedIDList()
+        for veh_id in departed:
+            traci.vehicle.subscribe(veh_id, self.variables)
+        self.metrics.count('simulation.getDepartedIDList')
+        self.metrics.count('vehicle.subscribe', len(departed))
+
+    def resubscribe(self):
+        """Subscribe every vehicle currently in the simulation (after loading a saved state)"""
+        if self.mode != 'subscribe':
+            return
+        for veh_id in traci.vehicle.getIDList():
+            traci.vehicle.subscribe(veh_id, self.variables)
+
+    def collect(self, current_time):
+        """Return a dict of column arrays for all vehicles, or None if there are none"""
+        if self.mode == 'subscribe':
+            return self._collect_subscribed(current_time)
+        return self._collect_polled(current_time)
+
+    def _collect_polled(self, current_time):
+        ids, xs, ys, speeds, accels, types = [], [], [], [], [], []
+        vehicle_ids = traci.vehicle.getIDList()
+        self.metrics.count('vehicle.getIDList')
+        self.metrics.count('vehicle.get*', 4 * len(vehicle_ids))
+        for veh_id in vehicle_ids:
+            try:
+                position = traci.vehicle.getPosition(veh_id)
+                speed = traci.vehicle.getSpeed(veh_id)
+                accel = traci.vehicle.getAcceleration(veh_id)
+                type_id = traci.vehicle.getTypeID(veh_id)
+            except traci.exceptions.TraCIException as e:
+                logger.warning("Error collecting data for vehicle %s: %s", veh_id, e)
+                continue
+            ids.append(veh_id)
+            xs.append(position[0])
+            ys.append(position[1])
+            speeds.append(speed)
+            accels.append(accel)
+            types.append(type_id)
+        return self._columns(current_time, ids, xs, ys, speeds, accels, types)
+
+    def _collect_subscribed(self, current_time):
+        results = traci.vehicle.getAllSubscriptionResults()
+        self.metrics.count('vehicle.getAllSubscriptionResults')
+        pos_var, speed_var, accel_var, type_var = self.variables
+        ids = list(results)
+        values = [results[veh_id] for veh_id in ids]
+        positions = [v[pos_var] for v in values]
+        return self._columns(
+            current_time,
+            ids,
+            [p[0] for p in positions],
+            [p[1] for p in positions],
+            [v[speed_var] for v in values],
+            [v[accel_var] for v in values],
+            [v[type_var] for v in values]
+        )
+
+    @staticmethod
+    def _columns(current_time, ids, xs, ys, speeds, accels, types):
+        if not ids:
+            return None
+        types = np.array(types, dtype=object)
+        # vehicle_type is for the kinematic detector; the traffic sink only stores its COLUMNS
+        return {
+            "sim_time": np.full(len(ids), current_time, dtype=np.float64),
+            "vehicle_id": np.array(ids, dtype=object),
+            "x": np.array(xs, dtype=np.float64),
+            "y": np.array(ys, dtype=np.float64),
+            "speed": np.array(speeds, dtype=np.float64),
+            "acceleration": np.array(accels, dtype=np.float64),
+            "is_malicious": (types == "malicious_vehicle").astype(np.uint8),
+            "vehicle_type": types
+        }
+
+def setup_logging(output_dir, run_name=None):
+    """Set up directories for logging simulation data (output_dir/run_name, or a timestamped directory)"""
+    if run_name is None:
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        run_name = f"simulation_{timestamp}"
+    log_dir = Path(output_dir) / run_name
     log_dir.mkdir(parents=True, exist_ok=True)
     
     # Create subdirectories for different log types
     (log_dir / "traffic").mkdir(exist_ok=True)
     (log_dir / "anomalies").mkdir(exist_ok=True)
     
-    print(f"Logs will be saved to: {log_dir}")
+    logger.info("Logs will be saved to: %s", log_dir)
     return log_dir
 
-def log_traffic_data(log_dir, step, vehicles_data):
-    """Log detailed traffic data for the current simulation step"""
-    if not vehicles_data:
+def log_traffic_data(sink, vehicles_data):
+    """Queue traffic data (a dict of column arrays) for the run's traffic log"""
+    if vehicles_data is None:
         return
     
-    filename = log_dir / "traffic" / f"traffic_step_{step:.1f}.csv"
-    df = pd.DataFrame(vehicles_data)
-    df.to_csv(filename, index=False)
+    sink.append(vehicles_data)
 
-def log_anomaly_data(log_dir, anomalies_data):
-    """Log anomaly data at the end of simulation"""
-    if not anomalies_data:
-        return
-    
-    filename = log_dir / "anomalies" / "anomalies.csv"
-    df = pd.DataFrame(anomalies_data)
-    df.to_csv(filename, index=False)
+class AnomalyLog:
+    """
+    Appends anomaly rows to anomalies/anomalies.csv as they happen (flushed
+    per row, so a crash loses nothing). resume_size truncates an existing log
+    back to the size recorded in a checkpoint and appends from there.
+    source tells injected labels ("injected") from detector flags
+    ("kinematic", with the failed checks in reason).
+    """
+
+    FIELDS = ['sim_time', 'vehicle_id', 'can_id', 'payload', 'attack_category', 'attack_type', 'source', 'reason']
+
+    def __init__(self, log_dir, resume_size=None):
+        self.path = Path(log_dir) / "anomalies" / "anomalies.csv"
+        if resume_size is None:
+            self.file = open(self.path, "w", newline="")
+            csv.writer(self.file).writerow(self.FIELDS)
+        else:
+            self.file = open(self.path, "r+", newline="")
+            self.file.truncate(resume_size)
+            self.file.seek(resume_size)
+        self.writer = csv.DictWriter(self.file, fieldnames=self.FIELDS)
+        self.file.flush()
+
+    def write(self, row):
+        self.writer.writerow(row)
+        self.file.flush()
 
-def run_simulation(input_csv, sumo_config, output_dir, duration=3600, sample_rate=0.01):
+    def write_many(self, rows):
+        self.writer.writerows(rows)
+        self.file.flush()
+
+    def size(self):
+        return self.file.tell()
+
+    def close(self):
+        self.file.close()
+
+CHECKPOINT_FILE = "checkpoint.json"
+
+def save_checkpoint(log_dir, checkpoint):
+    """
+    Save the SUMO state for the current time plus the run's own state.
+    The checkpoint JSON is replaced atomically and only the state file it
+    refers to is kept, so the latest checkpoint is always complete.
+    """
+    checkpoint_dir = Path(log_dir) / "checkpoints"
+    checkpoint_dir.mkdir(exist_ok=True)
+    state_file = checkpoint_dir / f"sumo_state_{checkpoint['sim_time']:.1f}.xml"
+    traci.simulation.saveState(str(state_file))
+    checkpoint = dict(checkpoint, state_file=state_file.name)
+
+    tmp_path = checkpoint_dir / f"{CHECKPOINT_FILE}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(checkpoint, f, indent=2)
+    os.replace(tmp_path, checkpoint_dir / CHECKPOINT_FILE)
+
+    for old in checkpoint_dir.glob("sumo_state_*.xml"):
+        if old.name != state_file.name:
+            old.unlink()
+
+def load_checkpoint(log_dir):
+    path = Path(log_dir) / "checkpoints" / CHECKPOINT_FILE
+    if not path.exists():
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+def find_latest_checkpointed_run(output_dir):
+    """The most recently checkpointed run directory under output_dir, or None"""
+    candidates = sorted(Path(output_dir).glob(f"*/checkpoints/{CHECKPOINT_FILE}"), key=lambda p: p.stat().st_mtime)
+    return candidates[-1].parent.parent if candidates else None
+
+def run_simulation(input_csv, sumo_config, output_dir, duration=3600, sample_rate=0.01,
+                   realtime_factor=None, telemetry_mode='poll', log_interval=10,
+                   seed=None, port=8813, label='default', run_name=None,
+                   checkpoint_interval=None, resume_dir=None, metrics_interval=None,
+                   detect_kinematics=False):
     """
     Run the SUMO simulation with data injection and logging
     
     Parameters:
     -----------
     input_csv : str
-        Path to the cleaned IoV dataset
+        Path to the cleaned IoV dataset (CSV, or a binary dataset directory from iov_binary.py)
     sumo_config : str
         Path to the SUMO configuration file
     output_dir : str
@@ -62,14 +273,55 @@ def run_simulation(input_csv, sumo_config, output_dir, duration=3600, sample_rat
         Simulation duration in seconds
     sample_rate : float
         Rate at which to sample from the dataset (0.01 = 1%)
+    realtime_factor : float or None
+        Pace the loop so that simulation time advances this many times faster
+        than wall-clock time (1.0 = real time). None runs as fast as possible.
+    telemetry_mode : str
+        'poll' queries every vehicle individually; 'subscribe' uses TraCI
+        subscriptions so each collection step is a single round-trip
+    log_interval : float
+        Simulation seconds between traffic data collections
+    seed : int or None
+        Seed for dataset sampling, vehicle IDs/routes and SUMO itself, so a
+        run can be reproduced exactly. None keeps the unseeded behaviour.
+    port : int or None
+        TraCI port for this instance (None lets TraCI pick a free port)
+    label : str
+        TraCI connection label, so several instances can coexist
+    run_name : str or None
+        Log directory name under output_dir (default: simulation_<timestamp>)
+    checkpoint_interval : float or None
+        Simulation seconds between checkpoints (SUMO state, injection cursor,
+        counters, RNG state and log sizes); None disables checkpointing
+    resume_dir : str or None
+        Run directory to continue from its latest checkpoint. The dataset,
+        sample rate, seed and duration must match the interrupted run.
+    metrics_interval : float or None
+        Wall seconds between metrics exports (metrics.json / metrics.prom in
+        the run directory); None switches instrumentation off
+    detect_kinematics : bool
+        Run the kinematic spoofing detector (kinematic_detector.py) on every
+        telemetry collection and log its flags to the anomalies log
     """
-    log_dir = setup_logging(output_dir)
+    checkpoint = None
+    if resume_dir is not None:
+        log_dir = Path(resume_dir)
+        checkpoint = load_checkpoint(log_dir)
+        if checkpoint is None:
+            raise FileNotFoundError(f"No checkpoint found in {log_dir}")
+        logger.info("Resuming %s from checkpoint at %.1fs", log_dir, checkpoint['sim_time'])
+    else:
+        log_dir = setup_logging(output_dir, run_name)
+    rng = random.Random(seed)
+    metrics = SimMetrics(log_dir, metrics_interval) if metrics_interval else NullMetrics()
+    traffic_sink = None
+    anomaly_log = None
     
     try:
         # Load dataset
-        print(f"Loading dataset from {input_csv}...")
-        df = pd.read_csv(input_csv)
-        print(f"Dataset loaded with {len(df)} entries")
+        logger.info("Loading dataset from %s...", input_csv)
+        df = read_dataset(input_csv)
+        logger.info("Dataset loaded with %d entries", len(df))
         
         # Handle Unix timestamps by normalizing to simulation time
         min_timestamp = df['timestamp'].min()
@@ -78,149 +330,213 @@ def run_simulation(input_csv, sumo_config, output_dir, duration=3600, sample_rat
         # Sample the data if there are too many entries
         if sample_rate < 1.0:
             original_size = len(df)
-            df = df.sample(frac=sample_rate, random_state=42)
-            print(f"Sampled dataset from {original_size} to {len(df)} entries (rate: {sample_rate})")
+            df = df.sample(frac=sample_rate, random_state=42 if seed is None else seed)
+            logger.info("Sampled dataset from %d to %d entries (rate: %s)", original_size, len(df), sample_rate)
         
         # Scale timestamps to fit within simulation duration if needed
+        time_scale = 1.0
         max_sim_time = df['sim_time'].max()
         if max_sim_time > duration:
             scale_factor = duration / max_sim_time
             df['sim_time'] = df['sim_time'] * scale_factor
-            print(f"Scaled timestamps by factor {scale_factor:.4f} to fit within {duration}s simulation")
+            time_scale = float(scale_factor)
+            logger.info("Scaled timestamps by factor %.4f to fit within %ss simulation", scale_factor, duration)
+        
+        if checkpoint is not None:
+            # The cursor indexes the sampled, rescaled rows; any other settings would
+            # silently continue the run from the wrong rows
+            expected = {'dataset_entries': len(df), 'sample_rate': sample_rate, 'seed': seed, 'duration': duration}
+            mismatched = [f"{key} {checkpoint.get(key)!r} (now {value!r})"
+                          for key, value in expected.items() if checkpoint.get(key) != value]
+            if mismatched:
+                raise ValueError("Checkpoint was taken with different settings: " + ", ".join(mismatched))
         
         # Start SUMO with TraCI
         sumo_cmd = [
             "sumo",
             "-c", os.path.abspath(sumo_config),
-            "--step-length", "0.1",   # 100ms time steps
+            "--step-length", str(STEP_LENGTH),   # 100ms time steps
             "--no-warnings", "true"
         ]
+        if seed is not None:
+            sumo_cmd += ["--seed", str(seed)]
+        if checkpoint_interval or resume_dir is not None:
+            # Include SUMO's RNG in saved states, or random departSpeed and the driver
+            # models diverge from the uninterrupted run after loadState
+            sumo_cmd += ["--save-state.rng", "true"]
         
-        traci.start(sumo_cmd, port=8813)
-        print("SUMO started successfully!")
+        traci.start(sumo_cmd, port=port, label=label)
+        logger.info("SUMO started successfully!")
         
         # Prepare data structures for the simulation
-        df = df.sort_values('sim_time')  # Ensure data is sorted by simulation time
+        schedule = InjectionSchedule(df)
+        telemetry = TelemetryCollector(telemetry_mode, metrics)
+        detector = KinematicDetector() if detect_kinematics else None
+        if checkpoint is None:
+            traffic_sink = TrafficSink(log_dir / "traffic" / "traffic.bin")
+            anomaly_log = AnomalyLog(log_dir)
+        else:
+            traci.simulation.loadState(str(log_dir / "checkpoints" / checkpoint['state_file']))
+            telemetry.resubscribe()
+            schedule.cursor = checkpoint['cursor']
+            version, internal, gauss = checkpoint['rng_state']
+            rng.setstate((version, tuple(internal), gauss))
+            traffic_sink = TrafficSink(log_dir / "traffic" / "traffic.bin", resume_size=checkpoint['traffic_size'])
+            anomaly_log = AnomalyLog(log_dir, resume_size=checkpoint['anomalies_size'])
+            if detector is not None and checkpoint.get('kinematic_state'):
+                detector.restore(checkpoint['kinematic_state'])
         
         # Create vehicle type for malicious vehicles if it doesn't exist
         try:
             if "malicious_vehicle" not in traci.vehicletype.getIDList():
                 traci.vehicletype.copy("car", "malicious_vehicle")
                 traci.vehicletype.setColor("malicious_vehicle", (255, 0, 0, 255))  # Red color
-                print("Created malicious vehicle type")
+                logger.info("Created malicious vehicle type")
         except:
-            print("Warning: Could not create malicious vehicle type, using default")
+            logger.warning("Could not create malicious vehicle type, using default")
         
         # Variables to track simulation progress
-        injected_vehicles = 0
-        injected_anomalies = 0
-        processed_idx = 0
-        anomalies_data = []
-        last_log_time = 0
-        log_interval = 10  # Log traffic data every 10 seconds
+        injected_vehicles = checkpoint['injected_vehicles'] if checkpoint else 0
+        injected_anomalies = checkpoint['injected_anomalies'] if checkpoint else 0
+        kinematic_flags = checkpoint.get('kinematic_flags', 0) if checkpoint else 0
+        last_log_time = checkpoint['last_log_time'] if checkpoint else 0
+        last_checkpoint_time = traci.simulation.getTime()
+        sim_start = last_checkpoint_time
         
-        print(f"Starting simulation for {duration} seconds...")
+        # Routes are fixed by the SUMO config, so look them up once rather than per injected vehicle
+        routes = traci.route.getIDList()
+        metrics.count('route.getIDList')
+        
+        if realtime_factor:
+            logger.info("Starting simulation for %s seconds (pacing at %sx real time)...", duration, realtime_factor)
+        else:
+            logger.info("Starting simulation for %s seconds (as fast as possible)...", duration)
+        wall_start = time.perf_counter()
+        wallclock_start = time.time()
         
         # Main simulation loop
         while traci.simulation.getTime() < duration:
+            step_started = time.perf_counter()
             current_time = traci.simulation.getTime()
+            metrics.count('simulation.getTime', 2)
             
-            # Find entries to inject at the current time step
-            # Get data points with timestamp in current time window
-            relevant_rows = df[(df['sim_time'] > current_time - 0.1) & 
-                              (df['sim_time'] <= current_time)]
+            # Checkpoint at the top of a step, before anything is injected for it
+            if checkpoint_interval and current_time - last_checkpoint_time >= checkpoint_interval - 1e-9:
+                with metrics.phase('checkpoint'):
+                    save_checkpoint(log_dir, {
+                        'sim_time': current_time,
+                        'cursor': schedule.cursor,
+                        'injected_vehicles': injected_vehicles,
+                        'injected_anomalies': injected_anomalies,
+                        'kinematic_flags': kinematic_flags,
+                        'kinematic_state': detector.state() if detector is not None else None,
+                        'last_log_time': last_log_time,
+                        'rng_state': rng.getstate(),
+                        'traffic_size': traffic_sink.flush(),
+                        'anomalies_size': anomaly_log.size(),
+                        'dataset_entries': len(df),
+                        'sample_rate': sample_rate,
+                        'seed': seed,
+                        'duration': duration
+                    })
+                last_checkpoint_time = current_time
+                logger.info("💾 Checkpoint saved at %.1fs", current_time)
             
-            # Inject vehicles
-            for _, row in relevant_rows.iterrows():
-                vehicle_id = f"veh_{int(current_time)}_{random.randint(1000,9999)}"
-                vehicle_type = "malicious_vehicle" if row['is_malicious'] == 1 else "car"
-                
-                try:
-                    # Get one of the available routes randomly
-                    routes = traci.route.getIDList()
-                    route_id = random.choice(routes) if routes else "route0"
-                    
-                    # Add the vehicle
-                    traci.vehicle.add(
-                        vehicle_id,
-                        route_id,
-                        typeID=vehicle_type,
-                        depart="now",
-                        departSpeed="random"
-                    )
+            # Inject the vehicles whose rows became due during this step
+            with metrics.phase('inject'):
+                for i in schedule.due(current_time):
+                    is_malicious = schedule.is_malicious[i] == 1
+                    vehicle_id = f"veh_{int(current_time)}_{i}"  # row index keeps IDs unique
+                    vehicle_type = "malicious_vehicle" if is_malicious else "car"
                     
-                    # Set vehicle color based on malicious status
-                    if row['is_malicious'] == 1:
-                        traci.vehicle.setColor(vehicle_id, (255, 0, 0, 255))  # Red for malicious
-                        injected_anomalies += 1
-                        
-                        # Collect anomaly data
-                        anomaly_data = {
-                            'sim_time': current_time,
-                            'vehicle_id': vehicle_id,
-                            'can_id': row['can_id'],
-                            'payload': row['payload'],
-                            'attack_category': row['attack_category'],
-                            'attack_type': row['attack_type']
-                        }
-                        anomalies_data.append(anomaly_data)
-                        print(f"🚨 Injected malicious vehicle {vehicle_id} at {current_time:.1f}s - {row['attack_type']}")
-                    else:
-                        traci.vehicle.setColor(vehicle_id, (0, 255, 0, 255))  # Green for normal
-                        print(f"🚗 Injected normal vehicle {vehicle_id} at {current_time:.1f}s")
-                    
-                    injected_vehicles += 1
-                    
-                except traci.exceptions.TraCIException as e:
-                    print(f"Failed to inject vehicle: {e}")
-            
-            # Collect and log traffic data at regular intervals
-            if current_time - last_log_time >= log_interval or current_time < 1:
-                vehicles_data = []
-                vehicle_ids = traci.vehicle.getIDList()
-                
-                for veh_id in vehicle_ids:
                     try:
-                        position = traci.vehicle.getPosition(veh_id)
-                        speed = traci.vehicle.getSpeed(veh_id)
-                        accel = traci.vehicle.getAcceleration(veh_id)
-                        type_id = traci.vehicle.getTypeID(veh_id)
+                        # Pick one of the available routes randomly
+                        route_id = rng.choice(routes) if routes else "route0"
+                        
+                        # Add the vehicle
+                        traci.vehicle.add(
+                            vehicle_id,
+                            route_id,
+                            typeID=vehicle_type,
+                            depart="now",
+                            departSpeed="random"
+                        )
+                        metrics.count('vehicle.add')
+                        
+                        # Set vehicle color based on malicious status
+                        if is_malicious:
+                            traci.vehicle.setColor(vehicle_id, (255, 0, 0, 255))  # Red for malicious
+                            injected_anomalies += 1
+                            
+                            # Log the anomaly immediately
+                            anomaly_log.write({
+                                'sim_time': current_time,
+                                'vehicle_id': vehicle_id,
+                                'can_id': schedule.can_id[i],
+                                'payload': schedule.payload[i],
+                                'attack_category': schedule.attack_category[i],
+                                'attack_type': schedule.attack_type[i],
+                                'source': 'injected'
+                            })
+                            logger.debug("🚨 Injected malicious vehicle %s at %.1fs - %s",
+                                         vehicle_id, current_time, schedule.attack_type[i])
+                        else:
+                            traci.vehicle.setColor(vehicle_id, (0, 255, 0, 255))  # Green for normal
+                            logger.debug("🚗 Injected normal vehicle %s at %.1fs", vehicle_id, current_time)
+                        metrics.count('vehicle.setColor')
                         
-                        # Collect vehicle data
-                        vehicle_data = {
-                            "sim_time": current_time,
-                            "vehicle_id": veh_id,
-                            "x": position[0],
-                            "y": position[1],
-                            "speed": speed,
-                            "acceleration": accel,
-                            "is_malicious": 1 if type_id == "malicious_vehicle" else 0
-                        }
+                        injected_vehicles += 1
                         
-                        vehicles_data.append(vehicle_data)
                     except traci.exceptions.TraCIException as e:
-                        print(f"Error collecting data for vehicle {veh_id}: {e}")
+                        logger.warning("Failed to inject vehicle: %s", e)
+            
+            # Collect and log traffic data at regular intervals
+            if current_time - last_log_time >= log_interval - 1e-9 or current_time < 1:
+                with metrics.phase('telemetry'):
+                    vehicles_data = telemetry.collect(current_time)
                 
                 # Log traffic data
-                if vehicles_data:
-                    log_traffic_data(log_dir, current_time, vehicles_data)
-                    print(f"📊 Logged traffic data at {current_time:.1f}s for {len(vehicles_data)} vehicles")
+                if vehicles_data is not None:
+                    with metrics.phase('sink'):
+                        log_traffic_data(traffic_sink, vehicles_data)
+                    logger.debug("📊 Logged traffic data at %.1fs for %d vehicles",
+                                 current_time, len(vehicles_data['vehicle_id']))
+                    
+                    # Check the collection for physically impossible motion
+                    if detector is not None:
+                        with metrics.phase('detect'):
+                            detector.check(vehicles_data)
+                            flagged = detector.anomaly_rows(vehicles_data)
+                            if flagged:
+                                anomaly_log.write_many(flagged)
+                        kinematic_flags += len(flagged)
+                        for row in flagged:
+                            logger.debug("🛑 Kinematic flag for %s at %.1fs - %s",
+                                         row['vehicle_id'], current_time, row['reason'])
                 
                 last_log_time = current_time
             
             # Advance simulation
-            traci.simulationStep()
+            with metrics.phase('step'):
+                traci.simulationStep()
+                telemetry.on_step()
+            metrics.count('simulationStep')
             
-            # Small delay to reduce CPU load
-            time.sleep(0.01)
+            # Optional real-time pacing; otherwise run as fast as possible
+            if realtime_factor:
+                with metrics.phase('pacing'):
+                    target = wall_start + (current_time + STEP_LENGTH - sim_start) / realtime_factor
+                    delay = target - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
             
             # Progress indicator (every 100 seconds)
             if int(current_time) % 100 == 0 and current_time > 0 and abs(current_time % 100) < 0.11:
-                print(f"Simulation progress: {current_time:.1f}/{duration} seconds ({(current_time/duration*100):.1f}%)")
-                print(f"  Vehicles injected so far: {injected_vehicles} ({injected_anomalies} malicious)")
-        
-        # Log all anomalies
-        log_anomaly_data(log_dir, anomalies_data)
+                logger.info("Simulation progress: %.1f/%s seconds (%.1f%%)",
+                            current_time, duration, current_time / duration * 100)
+                logger.info("  Vehicles injected so far: %d (%d malicious)", injected_vehicles, injected_anomalies)
+            
+            metrics.step_done(time.perf_counter() - step_started, current_time)
         
         # Create a summary file
         summary = {
@@ -228,26 +544,48 @@ def run_simulation(input_csv, sumo_config, output_dir, duration=3600, sample_rat
             'malicious_vehicles': injected_anomalies,
             'simulation_duration': duration,
             'dataset_entries': len(df),
+            'sample_rate': sample_rate,
+            'seed': seed,
+            'telemetry_mode': telemetry_mode,
+            'kinematic_flags': kinematic_flags if detector is not None else None,
+            'wall_seconds': round(time.perf_counter() - wall_start, 3),
+            'resumed_from': checkpoint['sim_time'] if checkpoint else None,
+            # Clocks for mapping other records onto sim_time (see correlate_incidents.py):
+            # dataset timestamp t ran at sim_time (t - time_origin) * time_scale, and the
+            # loop (its last segment, for a resumed run) started at wallclock_start / sim_start
+            'time_origin': float(min_timestamp),
+            'time_scale': time_scale,
+            'sim_start': sim_start,
+            'wallclock_start': wallclock_start,
+            'realtime_factor': realtime_factor,
             'timestamp': datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         }
         
         with open(log_dir / "simulation_summary.json", 'w') as f:
-            import json
             json.dump(summary, f, indent=2)
         
-        print("\n--- SIMULATION COMPLETE ---")
-        print(f"Total vehicles injected: {injected_vehicles}")
-        print(f"Malicious vehicles injected: {injected_anomalies}")
-        print(f"All logs saved to: {log_dir}")
+        logger.info("--- SIMULATION COMPLETE ---")
+        logger.info("Total vehicles injected: %d", injected_vehicles)
+        logger.info("Malicious vehicles injected: %d", injected_anomalies)
+        if detector is not None:
+            logger.info("Kinematic flags logged: %d", kinematic_flags)
+        logger.info("All logs saved to: %s", log_dir)
         
     except Exception as e:
-        print(f"Simulation error: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Simulation error: %s", e)
     finally:
+        # Flush the run's data before anything optional that could fail
+        if traffic_sink is not None:
+            traffic_sink.close()
+        if anomaly_log is not None:
+            anomaly_log.close()
+        try:
+            metrics.export()
+        except Exception as e:
+            logger.warning("Could not export metrics: %s", e)
         if 'traci' in locals() and traci.isLoaded():
             traci.close()
-        print("Simulation ended")
+        logger.info("Simulation ended")
         return log_dir
 
 if __name__ == "__main__":
@@ -263,8 +601,40 @@ if __name__ == "__main__":
     parser.add_argument('--duration', type=int, default=3600,
                         help='Simulation duration in seconds')
     parser.add_argument('--sample-rate', type=float, default=0.01,
-                        help='Sample rate from dataset (0.01 = 1%)')
+                        help='Sample rate from dataset (0.01 = 1%%)')
+    parser.add_argument('--realtime', type=float, default=None, metavar='FACTOR',
+                        help='Pace the simulation at FACTOR x real time (default: as fast as possible)')
+    parser.add_argument('--telemetry', choices=['poll', 'subscribe'], default='poll',
+                        help='Telemetry collection mode (subscribe = one TraCI round-trip per collection)')
+    parser.add_argument('--log-interval', type=float, default=10,
+                        help='Simulation seconds between traffic data collections')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='Seed sampling, vehicle IDs/routes and SUMO for a reproducible run')
+    parser.add_argument('--port', type=int, default=8813, help='TraCI port')
+    parser.add_argument('--checkpoint-interval', type=float, default=None,
+                        help='Simulation seconds between checkpoints (default: no checkpoints)')
+    parser.add_argument('--resume', nargs='?', const='latest', default=None, metavar='RUN_DIR',
+                        help='Continue a run from its latest checkpoint (default: latest checkpointed run in --output)')
+    parser.add_argument('--metrics-interval', type=float, default=None, metavar='SECONDS',
+                        help='Export loop metrics (metrics.json, metrics.prom) every SECONDS of wall time (default: off)')
+    parser.add_argument('--log-level', default='INFO', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'],
+                        help='Console log level (DEBUG logs every injected vehicle, rate-limited)')
+    parser.add_argument('--detect-kinematics', action='store_true',
+                        help='Flag impossible position jumps, accelerations and speed/position mismatches '
+                             'in the anomalies log')
     
     args = parser.parse_args()
+    configure_logging(args.log_level)
+    
+    resume_dir = args.resume
+    if resume_dir == 'latest':
+        resume_dir = find_latest_checkpointed_run(args.output)
+        if resume_dir is None:
+            logger.error("No checkpointed run found in %s", args.output)
+            sys.exit(1)
     
-    run_simulation(args.input, args.config, args.output, args.duration, args.sample_rate)
\ No newline at end of file
+    run_simulation(args.input, args.config, args.output, args.duration, args.sample_rate,
+                   realtime_factor=args.realtime, telemetry_mode=args.telemetry,
+                   log_interval=args.log_interval, seed=args.seed, port=args.port,
+                   checkpoint_interval=args.checkpoint_interval, resume_dir=resume_dir,
+                   metrics_interval=args.metrics_interval, detect_kinematics=args.detect_kinematics)
\ No newline at end of file
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Binary IoV Dataset Format
+A compact, memory-mappable alternative to cleaned_iov.csv. A dataset is a
+directory with one .npy file per fixed-width column plus meta.json:
+
+    timestamp.npy        int64 (float64 if the source has fractional timestamps)
+    can_id.npy           uint16, or uint32 for extended IDs
+    payload.npy          uint8[rows, 8]
+    dlc.npy              uint8 payload length (only written if any payload is shorter than 8 bytes)
+    attack_category.npy  uint8/uint16 codes into meta.json's dictionary
+    attack_type.npy      uint8/uint16 codes into meta.json's dictionary
+    is_malicious.npy     uint8
+
+Columns open zero-copy with numpy memmaps; read_table() rebuilds the same
+DataFrame pd.read_csv gives for the CSV, and read_dataset()/read_chunks()
+accept either format so existing scripts can take a .iov directory in place
+of the CSV.
+
+Command line usage:
+    python3 iov_binary.py convert data/cleaned_iov.csv data/cleaned_iov.iov
+    python3 iov_binary.py info data/cleaned_iov.iov
+"""
+
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from can_replay import decode_payloads
+from clean_iov_dataset import count_rows, encode_payload_hex
+
+FORMAT_NAME = "iov-binary"
+FORMAT_VERSION = 1
+CATEGORICAL_COLUMNS = ['attack_category', 'attack_type']
+COLUMN_ORDER = ['timestamp', 'can_id', 'payload', 'attack_category', 'attack_type', 'is_malicious']
+
+def is_binary_dataset(path):
+    return os.path.isdir(path) and os.path.exists(os.path.join(path, "meta.json"))
+
+def dataset_size(path):
+    """Bytes on disk of a CSV file or a binary dataset directory"""
+    if not os.path.isdir(path):
+        return os.path.getsize(path)
+    return sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+
+def load_meta(path):
+    with open(os.path.join(path, "meta.json")) as f:
+        meta = json.load(f)
+    if meta.get("format") != FORMAT_NAME:
+        raise ValueError(f"{path} is not an {FORMAT_NAME} dataset")
+    return meta
+
+def _shrink(path, dtype):
+    """Rewrite a column file with a narrower dtype once its value range is known"""
+    column = np.load(path, mmap_mode='r')
+    if not len(column) or column.max() <= np.iinfo(dtype).max:
+        narrowed = np.asarray(column).astype(dtype)
+        del column
+        np.save(path, narrowed)
+
+def convert_csv(csv_path, output_dir, chunk_size=500_000):
+    """
+    Convert a cleaned dataset CSV into a binary dataset directory in one
+    chunked pass; columns are preallocated from a row count so memory stays
+    bounded by the chunk size.
+    """
+    rows = count_rows(csv_path)
+    print(f"Converting {rows:,} rows from {csv_path} to {output_dir}")
+    tmp_dir = f"{output_dir}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    def column(name, dtype, shape=()):
+        return np.lib.format.open_memmap(os.path.join(tmp_dir, f"{name}.npy"), mode='w+',
+                                         dtype=dtype, shape=(rows,) + shape)
+
+    first = pd.read_csv(csv_path, nrows=1000)
+    integral_time = pd.api.types.is_integer_dtype(first['timestamp'])
+    timestamp = column("timestamp", np.int64 if integral_time else np.float64)
+    can_id = column("can_id", np.uint32)
+    payload = column("payload", np.uint8, (8,))
+    dlc = column("dlc", np.uint8)
+    is_malicious = column("is_malicious", np.uint8)
+    codes = {name: column(name, np.uint16) for name in CATEGORICAL_COLUMNS}
+    dictionaries = {name: {} for name in CATEGORICAL_COLUMNS}
+
+    offset = 0
+    for chunk in pd.read_csv(csv_path, chunksize=chunk_size, dtype={'payload': str}):
+        end = offset + len(chunk)
+        if integral_time and not pd.api.types.is_integer_dtype(chunk['timestamp']):
+            raise ValueError("Timestamps became fractional after the first rows; cannot store them as int64")
+        timestamp[offset:end] = chunk['timestamp'].to_numpy()
+        can_id[offset:end] = chunk['can_id'].to_numpy(dtype=np.uint32)
+        payload[offset:end], dlc[offset:end] = decode_payloads(chunk['payload'])
+        is_malicious[offset:end] = chunk['is_malicious'].to_numpy(dtype=np.uint8)
+        for name in CATEGORICAL_COLUMNS:
+            values = chunk[name].astype(str).to_numpy()
+            unique, inverse = np.unique(values, return_inverse=True)
+            mapping = dictionaries[name]
+            unique_codes = np.array([mapping.setdefault(value, len(mapping)) for value in unique.tolist()],
+                                    dtype=np.uint16)
+            codes[name][offset:end] = unique_codes[inverse]
+        offset = end
+
+    short_payloads = bool(rows) and bool((dlc != 8).any())
+    for array in [timestamp, can_id, payload, dlc, is_malicious, *codes.values()]:
+        array.flush()
+    del timestamp, can_id, payload, dlc, is_malicious, codes
+
+    if not short_payloads:
+        os.remove(os.path.join(tmp_dir, "dlc.npy"))
+    _shrink(os.path.join(tmp_dir, "can_id.npy"), np.uint16)
+    for name in CATEGORICAL_COLUMNS:
+        _shrink(os.path.join(tmp_dir, f"{name}.npy"), np.uint8)
+
+    stat = os.stat(csv_path)
+    meta = {
+        "format": FORMAT_NAME,
+        "version": FORMAT_VERSION,
+        "rows": rows,
+        "columns": list(COLUMN_ORDER),
+        "has_dlc": short_payloads,
+        "dictionaries": {name: list(mapping) for name, mapping in dictionaries.items()},
+        "source": {"path": csv_path, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    }
+    with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=2)
+
+    shutil.rmtree(output_dir, ignore_errors=True)
+    os.replace(tmp_dir, output_dir)
+    binary_size = dataset_size(output_dir)
+    print(f"Binary dataset saved to {output_dir}: {binary_size / (1024*1024):.2f} MB "
+          f"({stat.st_size / max(binary_size, 1):.1f}x smaller than the CSV)")
+    return meta
+
+def open_columns(path):
+    """Memory-map every column of a binary dataset (no data is read until it is touched)"""
+    meta = load_meta(path)
+    names = ['timestamp', 'can_id', 'payload', 'is_malicious', *CATEGORICAL_COLUMNS]
+    if meta["has_dlc"]:
+        names.append('dlc')
+    columns = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r') for name in names}
+    return meta, columns
+
+def _frame(meta, columns, start, end, names):
+    frame = {}
+    for name in names:
+        if name == 'payload':
+            data = columns['payload'][start:end]
+            hex_payload = encode_payload_hex(data)
+            if meta["has_dlc"]:
+                widths = 2 * columns['dlc'][start:end]
+                hex_payload = np.array([p[:w] for p, w in zip(hex_payload, widths)], dtype=object)
+            frame[name] = hex_payload
+        elif name in CATEGORICAL_COLUMNS:
+            frame[name] = pd.Categorical.from_codes(columns[name][start:end].astype(np.int32),
+                                                    categories=meta["dictionaries"][name])
+        else:
+            frame[name] = columns[name][start:end]
+    return pd.DataFrame(frame)
+
+def read_table(path, columns=None, start=0, end=None):
+    """
+    Load rows [start, end) of a binary dataset as a DataFrame with the CSV's
+    columns (payload as hex strings, labels as categoricals). Numeric columns
+    are views of the memory-mapped files.
+    """
+    meta, mapped = open_columns(path)
+    return _frame(meta, mapped, start, meta["rows"] if end is None else end, columns or meta["columns"])
+
+def read_dataset(path, columns=None):
+    """Load a cleaned dataset from either a CSV file or a binary dataset directory"""
+    if is_binary_dataset(path):
+        return read_table(path, columns)
+    return pd.read_csv(path, usecols=columns)
+
+def read_chunks(path, chunk_size=500_000, columns=None):
+    """Yield DataFrame chunks of a cleaned dataset from either a CSV file or a binary dataset directory"""
+    if not is_binary_dataset(path):
+        yield from pd.read_csv(path, chunksize=chunk_size, usecols=columns)
+        return
+    meta, mapped = open_columns(path)
+    for start in range(0, meta["rows"], chunk_size):
+        yield _frame(meta, mapped, start, min(start + chunk_size, meta["rows"]), columns or meta["columns"])
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Convert and inspect binary IoV datasets')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    convert_parser = subparsers.add_parser('convert', help='Convert a cleaned dataset CSV')
+    convert_parser.add_argument('input', help='Cleaned dataset CSV')
+    convert_parser.add_argument('output', help='Output dataset directory (e.g. data/cleaned_iov.iov)')
+    convert_parser.add_argument('--chunk-size', type=int, default=500_000, help='Rows per chunk')
+
+    info_parser = subparsers.add_parser('info', help='Print a binary dataset\'s metadata and first rows')
+    info_parser.add_argument('path', help='Binary dataset directory')
+
+    args = parser.parse_args()
+
+    if args.command == 'convert':
+        convert_csv(args.input, args.output, args.chunk_size)
+    else:
+        meta = load_meta(args.path)
+        print(json.dumps({k: v for k, v in meta.items() if k != 'dictionaries'}, indent=2))
+        for name, values in meta["dictionaries"].items():
+            print(f"{name}: {', '.join(values)}")
+        print(read_table(args.path, end=5).to_string())
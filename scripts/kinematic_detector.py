@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+Online Kinematic Spoofing Detector
+Checks each telemetry collection of a simulation run (the column arrays
+TelemetryCollector returns: vehicle_id, x, y, speed, acceleration and
+vehicle_type) against the vehicle's previous sample and its type's physical
+limits:
+
+- position_jump: the vehicle moved farther than its type's top speed allows
+  in the elapsed time (teleport / position spoofing)
+- acceleration: reported acceleration, or the change in reported speed since
+  the previous sample, beyond the type's acceleration / emergency braking limits
+- speed_mismatch: the displacement does not fit the reported speeds (moved
+  farther than they allow, or kept its position over consecutive samples
+  while reporting motion), or the reported speed exceeds the type's top speed
+
+Per-vehicle state (last time, position, speed and raised flags) lives in
+NumPy arrays indexed by a slot per vehicle, and every check runs on the whole
+collection at once. Vehicles not seen for forget_after seconds are dropped so
+the state stays proportional to the vehicles currently driving.
+
+anomaly_rows reports a flag when it is raised, not on every sample it stays
+raised, so the anomalies log records when each vehicle was first caught.
+
+Run on its own, it replays a finished run's traffic log through the detector
+and compares the flags with the is_malicious labels.
+
+Example:
+    python3 scripts/kinematic_detector.py logs/simulation_<ts>
+"""
+
+import numpy as np
+import pandas as pd
+
+FLAG_ORDER = ["position_jump", "acceleration", "speed_mismatch"]
+FLAG_BITS = np.array([1, 2, 4], dtype=np.uint8)
+
+# Per vehicle type: (max acceleration, emergency deceleration) in m/s^2 and top speed in m/s.
+# "DEFAULT" is SUMO's passenger car (accel 2.6, emergencyDecel 9.0, maxSpeed 55.56),
+# which the "car" and "malicious_vehicle" types in sumo/simple.rou.xml inherit.
+VEHICLE_LIMITS = {
+    "DEFAULT": (2.6, 9.0, 55.56),
+    "truck": (1.3, 7.0, 36.11),
+    "bus": (1.2, 7.0, 27.78),
+    "motorcycle": (6.0, 10.0, 55.56)
+}
+
+class KinematicDetector:
+    """
+    Incremental per-vehicle kinematic plausibility checks.
+
+    limits overrides/extends VEHICLE_LIMITS; position_tolerance (m),
+    speed_tolerance (m/s) and accel_tolerance (m/s^2) absorb rounding and
+    step quantisation. A vehicle counts as frozen once it has moved at most
+    freeze_distance for freeze_samples consecutive samples while its reported
+    speeds imply at least min_travel over them (one still sample alone can be
+    a U-turn).
+    """
+
+    # Per-vehicle arrays, in slot order
+    STATE = ("last_time", "last_x", "last_y", "last_speed", "still_samples", "still_travel", "raised")
+
+    def __init__(self, limits=None, position_tolerance=1.0, speed_tolerance=0.5, accel_tolerance=0.5,
+                 freeze_distance=0.1, freeze_samples=2, min_travel=5.0, forget_after=60.0, initial_slots=1024):
+        self.position_tolerance = position_tolerance
+        self.speed_tolerance = speed_tolerance
+        self.accel_tolerance = accel_tolerance
+        self.freeze_distance = freeze_distance
+        self.freeze_samples = freeze_samples
+        self.min_travel = min_travel
+        self.forget_after = forget_after
+
+        limits = {**VEHICLE_LIMITS, **(limits or {})}
+        self.type_names = list(limits)
+        self.type_codes = {name: code for code, name in enumerate(self.type_names)}
+        table = np.array([limits[name] for name in self.type_names], dtype=np.float64)
+        self.max_accel, self.max_decel, self.max_speed = table.T
+
+        self.slots = {}
+        self.free = []
+        self.last_time = np.full(initial_slots, np.nan)
+        self.last_x = np.zeros(initial_slots)
+        self.last_y = np.zeros(initial_slots)
+        self.last_speed = np.zeros(initial_slots)
+        self.still_samples = np.zeros(initial_slots, dtype=np.int32)
+        self.still_travel = np.zeros(initial_slots)
+        self.raised = np.zeros(initial_slots, dtype=np.uint8)
+        self.checked = 0
+        self.newly_raised = np.zeros((0, len(FLAG_ORDER)), dtype=bool)
+        self.flag_counts = np.zeros(len(FLAG_ORDER), dtype=np.int64)
+
+    def _grow(self, size):
+        """Enlarge the per-vehicle arrays to hold at least size vehicles"""
+        old = len(self.last_time)
+        pad = max(size, 2 * old) - old
+        self.last_time = np.concatenate([self.last_time, np.full(pad, np.nan)])
+        self.last_x = np.concatenate([self.last_x, np.zeros(pad)])
+        self.last_y = np.concatenate([self.last_y, np.zeros(pad)])
+        self.last_speed = np.concatenate([self.last_speed, np.zeros(pad)])
+        self.still_samples = np.concatenate([self.still_samples, np.zeros(pad, dtype=np.int32)])
+        self.still_travel = np.concatenate([self.still_travel, np.zeros(pad)])
+        self.raised = np.concatenate([self.raised, np.zeros(pad, dtype=np.uint8)])
+
+    def _slot_indices(self, vehicle_ids):
+        slots = self.slots
+        indices = np.fromiter((slots.get(v, -1) for v in vehicle_ids), dtype=np.int64, count=len(vehicle_ids))
+        new = np.flatnonzero(indices < 0)
+        for i in new.tolist():
+            slot = self.free.pop() if self.free else len(slots)
+            slots[vehicle_ids[i]] = slot
+            indices[i] = slot
+        if len(new):
+            if indices.max() >= len(self.last_time):
+                self._grow(indices.max() + 1)
+            fresh = indices[new]
+            self.last_time[fresh] = np.nan
+            self.still_samples[fresh] = 0
+            self.still_travel[fresh] = 0.0
+            self.raised[fresh] = 0
+        return indices
+
+    def _type_indices(self, columns, n):
+        types = columns.get("vehicle_type")
+        if types is None:
+            return np.zeros(n, dtype=np.int64)
+        codes, names = pd.factorize(np.asarray(types, dtype=object))
+        default = self.type_codes["DEFAULT"]
+        lookup = np.array([self.type_codes.get(name, default) for name in names], dtype=np.int64)
+        return lookup[codes] if len(lookup) else np.full(n, default)
+
+    def check(self, columns):
+        """
+        Score one collection (a dict of column arrays, one row per vehicle) and
+        update the per-vehicle state. Returns a bool array of shape
+        (rows, len(FLAG_ORDER)); the flags not raised at each vehicle's previous
+        sample are kept in newly_raised.
+        """
+        n = len(columns["vehicle_id"])
+        flags = np.zeros((n, len(FLAG_ORDER)), dtype=bool)
+        self.newly_raised = flags
+        if n == 0:
+            return flags
+
+        slot = self._slot_indices(columns["vehicle_id"])
+        kind = self._type_indices(columns, n)
+        max_accel = self.max_accel[kind] + self.accel_tolerance
+        max_decel = self.max_decel[kind] + self.accel_tolerance
+        max_speed = self.max_speed[kind] + self.speed_tolerance
+
+        t = np.asarray(columns["sim_time"], dtype=np.float64)
+        x = np.asarray(columns["x"], dtype=np.float64)
+        y = np.asarray(columns["y"], dtype=np.float64)
+        v1 = np.asarray(columns["speed"], dtype=np.float64)
+        accel = np.asarray(columns["acceleration"], dtype=np.float64)
+
+        dt = t - self.last_time[slot]
+        has_prev = dt > 0
+        dt = np.where(has_prev, dt, 1.0)
+        v0 = self.last_speed[slot]
+        distance = np.hypot(x - self.last_x[slot], y - self.last_y[slot])
+
+        # Farthest the vehicle can get given its previous speed, and given its current speed
+        reach_from_v0 = v0 * dt + 0.5 * max_accel * dt ** 2
+        reach_to_v1 = v1 * dt + 0.5 * max_decel * dt ** 2
+        # Shortest path length consistent with the reported speeds (braking / accelerating flat out)
+        least_from_v0 = np.where(v0 >= max_decel * dt, v0 * dt - 0.5 * max_decel * dt ** 2, v0 ** 2 / (2 * max_decel))
+        least_to_v1 = np.where(v1 >= max_accel * dt, v1 * dt - 0.5 * max_accel * dt ** 2, v1 ** 2 / (2 * max_accel))
+        speed_change = v1 - v0
+
+        # Consecutive samples without movement, and the travel the reported speeds imply over them
+        still = has_prev & (distance <= self.freeze_distance)
+        still_samples = np.where(still, self.still_samples[slot] + 1, 0)
+        still_travel = np.where(still, self.still_travel[slot] + np.maximum(least_from_v0, least_to_v1), 0.0)
+
+        flags[:, 0] = has_prev & (distance > max_speed * dt + self.position_tolerance)
+        flags[:, 1] = (accel > max_accel) | (accel < -max_decel) | (has_prev & (
+            (speed_change > max_accel * dt + self.speed_tolerance) |
+            (speed_change < -max_decel * dt - self.speed_tolerance)))
+        flags[:, 2] = (v1 > max_speed) | (has_prev & (
+            (distance > np.minimum(reach_from_v0, reach_to_v1) + self.position_tolerance) |
+            ((still_samples >= self.freeze_samples) & (still_travel >= self.min_travel))))
+
+        self.last_time[slot] = t
+        self.last_x[slot] = x
+        self.last_y[slot] = y
+        self.last_speed[slot] = v1
+        self.still_samples[slot] = still_samples
+        self.still_travel[slot] = still_travel
+        bits = flags.astype(np.uint8) @ FLAG_BITS
+        self.newly_raised = (bits & ~self.raised[slot])[:, None] & FLAG_BITS > 0
+        self.raised[slot] = bits
+        self.checked += n
+        self.flag_counts += flags.sum(axis=0)
+        if len(t):
+            self._forget(t.max())
+        return flags
+
+    def _forget(self, now):
+        """Release the slots of vehicles not seen for forget_after seconds"""
+        if len(self.slots) < len(self.last_time) // 2:
+            return
+        stale = self.last_time < now - self.forget_after
+        if not stale.any():
+            return
+        for veh_id, slot in list(self.slots.items()):
+            if stale[slot]:
+                del self.slots[veh_id]
+                self.free.append(slot)
+        self.last_time[stale] = np.nan
+
+    def anomaly_rows(self, columns):
+        """
+        Anomaly log rows (source "kinematic") for the vehicles of the collection
+        last passed to check that raised a flag they did not have at their
+        previous sample
+        """
+        raised = self.newly_raised
+        rows = []
+        for i in np.flatnonzero(raised.any(axis=1)).tolist():
+            rows.append({
+                'sim_time': float(columns["sim_time"][i]),
+                'vehicle_id': columns["vehicle_id"][i],
+                'source': 'kinematic',
+                'reason': ';'.join(name for name, hit in zip(FLAG_ORDER, raised[i]) if hit)
+            })
+        return rows
+
+    def state(self):
+        """JSON-serialisable state of the vehicles currently tracked (for checkpoints)"""
+        slots = np.array(list(self.slots.values()), dtype=np.int64)
+        return {
+            "vehicle_ids": list(self.slots),
+            "last_time": self.last_time[slots].tolist(),
+            "last_x": self.last_x[slots].tolist(),
+            "last_y": self.last_y[slots].tolist(),
+            "last_speed": self.last_speed[slots].tolist(),
+            "still_samples": self.still_samples[slots].tolist(),
+            "still_travel": self.still_travel[slots].tolist(),
+            "raised": self.raised[slots].tolist(),
+            "checked": self.checked,
+            "flag_counts": self.flag_counts.tolist()
+        }
+
+    def restore(self, state):
+        n = len(state["vehicle_ids"])
+        self.slots = {veh_id: slot for slot, veh_id in enumerate(state["vehicle_ids"])}
+        self.free = []
+        self.last_time = np.full(len(self.last_time), np.nan)
+        if n > len(self.last_time):
+            self._grow(n)
+        for name in self.STATE:
+            getattr(self, name)[:n] = state[name]
+        self.checked = state["checked"]
+        self.flag_counts = np.array(state["flag_counts"], dtype=np.int64)
+
+def evaluate_run(run_dir, detector=None):
+    """Replay a run's traffic log through the detector, one collection step at a time"""
+    from pathlib import Path
+    from traffic_sink import TrafficLogReader
+
+    detector = detector or KinematicDetector()
+    df = TrafficLogReader(Path(run_dir) / "traffic" / "traffic.bin").read()
+    df = df.sort_values("sim_time", kind="stable")
+    steps = np.flatnonzero(np.r_[True, df["sim_time"].to_numpy()[1:] != df["sim_time"].to_numpy()[:-1]])
+    bounds = np.r_[steps, len(df)]
+    columns = {name: df[name].to_numpy() for name in ["sim_time", "vehicle_id", "x", "y", "speed", "acceleration"]}
+    malicious = df["is_malicious"].to_numpy().astype(bool)
+
+    flagged = np.zeros(len(df), dtype=bool)
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        step = {name: values[start:end] for name, values in columns.items()}
+        flagged[start:end] = detector.check(step).any(axis=1)
+
+    vehicles = df.assign(flagged=flagged).groupby("vehicle_id").agg(
+        malicious=("is_malicious", "max"), flagged=("flagged", "any"))
+    return {
+        "samples": len(df),
+        "collections": len(steps),
+        "flags": dict(zip(FLAG_ORDER, detector.flag_counts.tolist())),
+        "flagged_samples": int(flagged.sum()),
+        "flagged_malicious_samples": int((flagged & malicious).sum()),
+        "vehicles": len(vehicles),
+        "flagged_vehicles": int(vehicles["flagged"].sum()),
+        "flagged_malicious_vehicles": int((vehicles["flagged"] & (vehicles["malicious"] == 1)).sum()),
+        "malicious_vehicles": int((vehicles["malicious"] == 1).sum())
+    }
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description='Replay a run\'s traffic log through the kinematic detector')
+    parser.add_argument('run_dir', help='Simulation run directory (logs/simulation_<ts>)')
+    parser.add_argument('--position-tolerance', type=float, default=1.0, help='Metres')
+    parser.add_argument('--speed-tolerance', type=float, default=0.5, help='m/s')
+    parser.add_argument('--accel-tolerance', type=float, default=0.5, help='m/s^2')
+    args = parser.parse_args()
+
+    detector = KinematicDetector(position_tolerance=args.position_tolerance,
+                                 speed_tolerance=args.speed_tolerance, accel_tolerance=args.accel_tolerance)
+    print(json.dumps(evaluate_run(args.run_dir, detector), indent=2))
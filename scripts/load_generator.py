@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+Fleet Load Generator
+Runs thousands of simulated ECUs (ECUSimulator) concurrently against the
+blockchain API server, optionally spread over a process pool, to show how the
+API server and ledger behave under a realistic fleet.
+
+Arrivals are open loop: each ECU sends on its own schedule (constant, Poisson
+or burst) regardless of how quickly earlier requests complete, and latency is
+measured from the scheduled send time so a slow server cannot hide queueing
+delay (no coordinated omission). A run has warm-up, measure and cool-down
+phases; only requests scheduled in the measure phase are reported.
+
+Example (against the in-process stand-in server):
+    python3 scripts/load_generator.py --ecus 2000 --rate 0.5 --arrival poisson --stub --stub-latency 0.02
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+import aiohttp
+
+from simulate_ecu import API_URL, ECUSimulator
+
+class LatencyHistogram:
+    """
+    HDR-style log-linear histogram of latencies in microseconds.
+
+    Values below 2**sub_bits are exact; above that each power-of-two range is
+    split into 2**(sub_bits-1) buckets, giving a relative error under
+    2**-(sub_bits-1). Counts are kept sparse so histograms merge cheaply
+    across processes.
+    """
+
+    def __init__(self, sub_bits=8):
+        self.sub_bits = sub_bits
+        self.half = 1 << (sub_bits - 1)
+        self.counts = {}
+        self.total = 0
+        self.max_value = 0
+
+    def _index(self, value):
+        shift = max(0, value.bit_length() - self.sub_bits)
+        if shift == 0:
+            return value
+        return 2 * self.half + (shift - 1) * self.half + ((value >> shift) - self.half)
+
+    def _value(self, index):
+        if index < 2 * self.half:
+            return index
+        shift = (index - 2 * self.half) // self.half + 1
+        top = (index - 2 * self.half) % self.half + self.half
+        # Midpoint of the bucket
+        return (top << shift) + (1 << (shift - 1))
+
+    def record(self, seconds):
+        value = max(0, int(seconds * 1e6))
+        index = self._index(value)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.total += 1
+        self.max_value = max(self.max_value, value)
+
+    def merge(self, other):
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.total += other.total
+        self.max_value = max(self.max_value, other.max_value)
+
+    def percentile(self, p):
+        """Latency in milliseconds at percentile p (0-100)"""
+        if not self.total:
+            return None
+        target = max(1, int(round(p / 100 * self.total)))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= target:
+                return round(min(self._value(index), self.max_value) / 1000, 3)
+        return round(self.max_value / 1000, 3)
+
+    def to_dict(self):
+        return {"sub_bits": self.sub_bits, "counts": self.counts, "total": self.total, "max": self.max_value}
+
+    @classmethod
+    def from_dict(cls, data):
+        histogram = cls(data["sub_bits"])
+        histogram.counts = {int(k): v for k, v in data["counts"].items()}
+        histogram.total = data["total"]
+        histogram.max_value = data["max"]
+        return histogram
+
+def arrival_times(mode, rate, start, end, rng, burst_size=10):
+    """Yield scheduled send times (monotonic seconds) for one ECU between start and end"""
+    if rate <= 0:
+        return
+    if mode == "constant":
+        t = start + rng.uniform(0, 1 / rate)
+        while t < end:
+            yield t
+            t += 1 / rate
+    elif mode == "poisson":
+        t = start + rng.expovariate(rate)
+        while t < end:
+            yield t
+            t += rng.expovariate(rate)
+    elif mode == "burst":
+        # burst_size back-to-back messages, with the same average rate
+        period = burst_size / rate
+        t = start + rng.uniform(0, period)
+        while t < end:
+            for _ in range(burst_size):
+                yield t
+            t += period
+    else:
+        raise ValueError(f"Unknown arrival mode: {mode}")
+
+async def _run_fleet(config, ecu_ids, seed):
+    histogram = LatencyHistogram()
+    stats = {"sent": 0, "ok": 0, "errors": {}, "attacks": 0, "messages": {}}
+    semaphore = asyncio.Semaphore(config["max_in_flight"])
+
+    loop = asyncio.get_running_loop()
+    start = loop.time() + 0.5
+    measure_start = start + config["warmup"]
+    measure_end = measure_start + config["duration"]
+    end = measure_end + config["cooldown"]
+
+    connector = aiohttp.TCPConnector(limit=config["max_in_flight"])
+    timeout = aiohttp.ClientTimeout(total=config["timeout"])
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+
+        async def send(simulator, scheduled, message, is_attack):
+            measured = measure_start <= scheduled < measure_end
+            async with semaphore:
+                error = None
+                try:
+                    async with session.post(config["url"], json=simulator.build_event(message)) as response:
+                        await response.read()
+                        if response.status >= 400:
+                            error = f"http_{response.status}"
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    error = type(e).__name__
+            if not measured:
+                return
+            stats["sent"] += 1
+            stats["messages"][message["type"]] = stats["messages"].get(message["type"], 0) + 1
+            if is_attack:
+                stats["attacks"] += 1
+            if error:
+                stats["errors"][error] = stats["errors"].get(error, 0) + 1
+            else:
+                stats["ok"] += 1
+                histogram.record(loop.time() - scheduled)
+
+        async def ecu(ecu_id):
+            simulator = ECUSimulator(ecu_id)
+            ecu_rng = random.Random(f"{seed}:{ecu_id}")
+            pending = set()
+            for scheduled in arrival_times(config["arrival"], config["rate"], start, end, ecu_rng,
+                                           config["burst_size"]):
+                delay = scheduled - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                message, is_attack = simulator.next_message(
+                    config["attack_probability"], config["attack_mix"], ecu_rng)
+                task = asyncio.create_task(send(simulator, scheduled, message, is_attack))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+            if pending:
+                await asyncio.gather(*pending)
+
+        await asyncio.gather(*(ecu(ecu_id) for ecu_id in ecu_ids))
+
+    stats["histogram"] = histogram.to_dict()
+    return stats
+
+def _run_worker(args):
+    config, ecu_ids, seed = args
+    return asyncio.run(_run_fleet(config, ecu_ids, seed))
+
+def build_report(config, results):
+    histogram = LatencyHistogram()
+    sent = ok = attacks = 0
+    errors = {}
+    messages = {}
+    for result in results:
+        histogram.merge(LatencyHistogram.from_dict(result["histogram"]))
+        sent += result["sent"]
+        ok += result["ok"]
+        attacks += result["attacks"]
+        for key, count in result["errors"].items():
+            errors[key] = errors.get(key, 0) + count
+        for key, count in result["messages"].items():
+            messages[key] = messages.get(key, 0) + count
+
+    duration = config["duration"]
+    return {
+        "config": dict(config),
+        "measured_requests": sent,
+        "successful_requests": ok,
+        "throughput_rps": round(ok / duration, 2) if duration else None,
+        "offered_rps": round(sent / duration, 2) if duration else None,
+        "error_rate": round((sent - ok) / sent, 5) if sent else None,
+        "errors": errors,
+        "attack_messages": attacks,
+        "messages_by_type": messages,
+        "latency_ms": {
+            "p50": histogram.percentile(50),
+            "p90": histogram.percentile(90),
+            "p99": histogram.percentile(99),
+            "p99.9": histogram.percentile(99.9),
+            "max": round(histogram.max_value / 1000, 3) if histogram.total else None
+        }
+    }
+
+async def run_load(config, processes=1, seed=42):
+    """Run the configured fleet (optionally over a process pool) and return the JSON report"""
+    ecu_ids = [f"ECU_{i}" for i in range(config["ecus"])]
+    if processes <= 1:
+        results = [await _run_fleet(config, ecu_ids, seed)]
+    else:
+        shards = [(config, ecu_ids[i::processes], seed + i) for i in range(processes)]
+        loop = asyncio.get_running_loop()
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            results = await asyncio.gather(*(loop.run_in_executor(pool, _run_worker, s) for s in shards))
+    return build_report(config, results)
+
+def parse_attack_mix(value):
+    """argparse type for --attack-mix: JSON weights keyed by ECUSimulator attack types"""
+    try:
+        mix = json.loads(value)
+    except json.JSONDecodeError as e:
+        raise argparse.ArgumentTypeError(f"not valid JSON: {e}")
+    if not isinstance(mix, dict):
+        raise argparse.ArgumentTypeError("must be a JSON object of weights per attack type")
+    known = [m["type"] for m in ECUSimulator("").attack_messages]
+    unknown = sorted(set(mix) - set(known))
+    if unknown:
+        raise argparse.ArgumentTypeError(f"unknown attack types {unknown}; choose from {known}")
+    if not all(isinstance(w, (int, float)) and w >= 0 for w in mix.values()):
+        raise argparse.ArgumentTypeError("weights must be non-negative numbers")
+    if not any(w > 0 for w in mix.values()):
+        raise argparse.ArgumentTypeError("at least one attack type needs a positive weight")
+    return mix
+
+async def main(args):
+    config = {
+        "url": args.url,
+        "ecus": args.ecus,
+        "rate": args.rate,
+        "arrival": args.arrival,
+        "burst_size": args.burst_size,
+        "attack_probability": args.attack_probability,
+        "attack_mix": args.attack_mix,
+        "warmup": args.warmup,
+        "duration": args.duration,
+        "cooldown": args.cooldown,
+        "max_in_flight": args.max_in_flight,
+        "timeout": args.timeout
+    }
+
+    runner = None
+    if args.stub:
+        from stub_api_server import start_server
+        runner, base_url = await start_server(latency=args.stub_latency, jitter=args.stub_jitter,
+                                              error_rate=args.stub_error_rate)
+        config["url"] = f"{base_url}/api/recordEvent"
+        print(f"Using stand-in API server at {base_url}")
+
+    try:
+        report = await run_load(config, args.processes, args.seed)
+    finally:
+        if runner is not None:
+            await runner.cleanup()
+
+    output = json.dumps(report, indent=2)
+    if args.report:
+        with open(args.report, 'w') as f:
+            f.write(output)
+        print(f"Report written to {args.report}")
+    print(output)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Open-loop fleet load generator for the blockchain API server')
+    parser.add_argument('--url', default=API_URL, help='recordEvent endpoint')
+    parser.add_argument('--ecus', type=int, default=1000, help='Number of simulated ECUs')
+    parser.add_argument('--rate', type=float, default=1.0, help='Messages per second per ECU')
+    parser.add_argument('--arrival', choices=['constant', 'poisson', 'burst'], default='poisson')
+    parser.add_argument('--burst-size', type=int, default=10, help='Messages per burst (burst arrivals)')
+    parser.add_argument('--attack-probability', type=float, default=0.2)
+    parser.add_argument('--attack-mix', type=parse_attack_mix, default=None,
+                        help='JSON weights per attack type, e.g. \'{"spoof": 3, "flood": 1}\'')
+    parser.add_argument('--warmup', type=float, default=5.0, help='Warm-up seconds (not measured)')
+    parser.add_argument('--duration', type=float, default=30.0, help='Measured seconds')
+    parser.add_argument('--cooldown', type=float, default=2.0, help='Cool-down seconds (not measured)')
+    parser.add_argument('--max-in-flight', type=int, default=256, help='Concurrent requests per process')
+    parser.add_argument('--timeout', type=float, default=10.0, help='Per-request timeout in seconds')
+    parser.add_argument('--processes', type=int, default=1,
+                        help=f'Spread ECUs over this many processes (this machine has {os.cpu_count()} cores)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--report', default=None, help='Also write the JSON report to this file')
+    parser.add_argument('--stub', action='store_true', help='Start an in-process stand-in API server and target it')
+    parser.add_argument('--stub-latency', type=float, default=0.0)
+    parser.add_argument('--stub-jitter', type=float, default=0.0)
+    parser.add_argument('--stub-error-rate', type=float, default=0.0)
+    args = parser.parse_args()
+
+    asyncio.run(main(args))
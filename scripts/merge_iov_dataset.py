@@ -1,37 +1,164 @@
-import pandas as pd
 import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
 from tqdm import tqdm  # For progress bars
 
+from clean_iov_dataset import clean_chunk, count_rows
+
 # Configuration (UPDATE THESE PATHS!)
 DATASET_DIR = "data/CICIoV2024"  # Path to unzipped dataset folder
 OUTPUT_FILE = "data/raw_iov.csv"
 FORMAT = "decimal"  # "binary", "decimal", or "hexadecimal"
 
-def merge_dataset():
-    dfs = []
-    print(f"⏳ Merging {FORMAT} format files...")
-    
-    for filename in tqdm(os.listdir(f"{DATASET_DIR}/{FORMAT}")):
-        if filename.endswith(".csv"):
+# Numeric base used to parse ID/DATA_* values in each dataset format
+FORMAT_BASES = {"binary": 2, "decimal": 10, "hexadecimal": 16}
+LABEL_COLUMNS = ["label", "category", "specific_class"]
+CHUNK_SIZE = 500_000
+
+def _column_dtypes(columns, fmt):
+    """Compact dtypes for the per-attack files; non-decimal values are parsed later"""
+    dtypes = {}
+    for col in columns:
+        if col in LABEL_COLUMNS:
+            dtypes[col] = "category"
+        elif col == "ID" or col.startswith("DATA_"):
+            if fmt != "decimal":
+                dtypes[col] = str
+            else:
+                dtypes[col] = "uint32" if col == "ID" else "uint8"
+    return dtypes
+
+def _parse_base(series, base, dtype):
+    """Convert binary/hex strings to integers, parsing each distinct value only once"""
+    codes, uniques = pd.factorize(series.str.strip())
+    if (codes < 0).any():
+        raise ValueError(f"Missing values in column {series.name}")
+    values = np.array([int(v, base) for v in uniques], dtype=np.int64)
+    return values[codes].astype(dtype)
+
+def _read_chunks(filepath, fmt, chunk_size):
+    columns = pd.read_csv(filepath, nrows=0).columns
+    dtypes = _column_dtypes(columns, fmt)
+    base = FORMAT_BASES[fmt]
+    for chunk in pd.read_csv(filepath, dtype=dtypes, chunksize=chunk_size):
+        if fmt != "decimal":
+            for col in chunk.columns:
+                if col == "ID":
+                    chunk[col] = _parse_base(chunk[col], base, np.uint32)
+                elif col.startswith("DATA_"):
+                    chunk[col] = _parse_base(chunk[col], base, np.uint8)
+        yield chunk
+
+def _merge_file(task):
+    """
+    Parse one per-attack file in chunks and write it to its own headerless
+    part file. Returns (row count, output columns).
+    """
+    filepath, fmt, attack_type, part_path, clean, first_row, base_timestamp, chunk_size = task
+    rows = 0
+    columns = None
+    with open(part_path, "w", newline="") as out:
+        for chunk in _read_chunks(filepath, fmt, chunk_size):
+            if clean:
+                chunk = clean_chunk(chunk, first_row + rows, base_timestamp)
+            else:
+                # Add attack labels
+                chunk['attack_type'] = attack_type
+                chunk['is_malicious'] = 0 if attack_type == "benign" else 1
+            chunk.to_csv(out, header=False, index=False)
+            rows += len(chunk)
+            columns = list(chunk.columns)
+    return rows, columns
+
+def merge_dataset(dataset_dir=DATASET_DIR, output_file=OUTPUT_FILE, fmt=FORMAT,
+                  workers=None, clean=False, chunk_size=CHUNK_SIZE):
+    """
+    Merge the per-attack CSVs of one dataset format into a single CSV.
+
+    Files are parsed in parallel with compact dtypes (ID/DATA_* become integers
+    for all three formats, labels are categorical) and streamed in chunks to
+    per-file part files, which are then concatenated in filename order, so no
+    process ever holds more than one chunk.
+
+    With clean=True the cleaning from clean_iov_dataset.py is applied in the
+    same pass and output_file is the cleaned dataset instead of raw_iov.csv.
+    """
+    if fmt not in FORMAT_BASES:
+        raise ValueError(f"Unknown format {fmt!r}, expected one of {list(FORMAT_BASES)}")
+
+    print(f"⏳ Merging {fmt} format files...")
+    source_dir = os.path.join(dataset_dir, fmt)
+    filenames = sorted(f for f in os.listdir(source_dir) if f.endswith(".csv"))
+    if not filenames:
+        print(f"No CSV files found in {source_dir}")
+        return
+
+    # Row offsets are only needed to keep cleaned timestamps continuous across files
+    base_timestamp = 0
+    if clean:
+        counts = [count_rows(os.path.join(source_dir, f)) for f in filenames]
+        offsets = np.concatenate([[0], np.cumsum(counts)[:-1]]).tolist()
+        base_timestamp = int(datetime.now().timestamp()) - int(sum(counts))
+    else:
+        offsets = [0] * len(filenames)
+
+    output_dir = os.path.dirname(os.path.abspath(output_file))
+    part_dir = tempfile.mkdtemp(prefix="merge_parts_", dir=output_dir)
+    try:
+        tasks = []
+        for i, filename in enumerate(filenames):
             # Extract attack type from filename (e.g., "decimal_DoS.csv" -> "DoS")
             attack_type = filename.split('_')[1].split('.')[0]
-            
-            # Read file
-            filepath = os.path.join(DATASET_DIR, FORMAT, filename)
-            df = pd.read_csv(filepath)
-            
-            # Add attack labels
-            df['attack_type'] = attack_type
-            df['is_malicious'] = 0 if attack_type == "benign" else 1
-            
-            dfs.append(df)
-    
-    # Combine all DataFrames
-    merged_df = pd.concat(dfs, ignore_index=True)
-    merged_df.to_csv(OUTPUT_FILE, index=False)
-    print(f"✅ Saved merged data to {OUTPUT_FILE}")
-    print(f"Total records: {len(merged_df):,}")
-    print("Sample data:\n", merged_df.head())
+            tasks.append((
+                os.path.join(source_dir, filename), fmt, attack_type,
+                os.path.join(part_dir, f"part_{i:04d}.csv"),
+                clean, offsets[i], base_timestamp, chunk_size
+            ))
+
+        results = [None] * len(tasks)
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+            futures = {pool.submit(_merge_file, task): i for i, task in enumerate(tasks)}
+            for future in tqdm(as_completed(futures), total=len(futures)):
+                results[futures[future]] = future.result()
+
+        header = next((columns for _, columns in results if columns), None)
+        for (_, columns), filename in zip(results, filenames):
+            if columns is not None and columns != header:
+                raise ValueError(f"{filename} has columns {columns}, expected {header}")
+
+        # Combine the part files in filename order
+        with open(output_file, "w", newline="") as out:
+            out.write(",".join(header) + "\n")
+            for task in tasks:
+                with open(task[3]) as part:
+                    shutil.copyfileobj(part, out, 1 << 20)
+    finally:
+        shutil.rmtree(part_dir, ignore_errors=True)
+
+    total = sum(rows for rows, _ in results)
+    print(f"✅ Saved merged data to {output_file}")
+    print(f"Total records: {total:,}")
+    print("Sample data:\n", pd.read_csv(output_file, nrows=5))
 
 if __name__ == "__main__":
-    merge_dataset()
\ No newline at end of file
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Merge the per-attack CICIoV2024 CSV files')
+    parser.add_argument('--dataset-dir', default=DATASET_DIR, help='Path to unzipped dataset folder')
+    parser.add_argument('--output', default=None,
+                        help=f'Output CSV (default: {OUTPUT_FILE}, or data/cleaned_iov.csv with --clean)')
+    parser.add_argument('--format', default=FORMAT, choices=sorted(FORMAT_BASES), help='Dataset format to merge')
+    parser.add_argument('--workers', type=int, default=None, help='Parallel parser processes (default: all cores)')
+    parser.add_argument('--clean', action='store_true',
+                        help='Apply clean_iov_dataset cleaning in the same pass')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='Rows per parsing chunk')
+
+    args = parser.parse_args()
+    output = args.output or ('data/cleaned_iov.csv' if args.clean else OUTPUT_FILE)
+
+    merge_dataset(args.dataset_dir, output, args.format, args.workers, args.clean, args.chunk_size)
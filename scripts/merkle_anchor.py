@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Merkle-Batched Anchoring
+Instead of one ledger transaction per alert or ECU message, events are
+buffered locally for a window of N events or T seconds, appended to a local
+append-only log, and summarised by a Merkle tree whose root (plus batch
+metadata) is the only thing submitted on chain via /api/anchorBatch.
+
+Leaves use the same hashing as the chaincode's _hashEvent (SHA-256 over
+JSON.stringify(data)); inner nodes are SHA-256 over the concatenated raw
+child digests, and an odd node at the end of a level is carried up unchanged.
+
+Command line usage:
+    python3 merkle_anchor.py prove --log-dir logs/anchor/alerts --batch 3 --index 17 > proof.json
+    python3 merkle_anchor.py verify proof.json [--api-url http://localhost:4000]
+"""
+
+import hashlib
+import json
+import math
+import threading
+import time
+from pathlib import Path
+
+DEFAULT_ANCHOR_URL = "http://localhost:4000/api/anchorBatch"
+
+def _js_compatible(value):
+    """Make json.dumps produce what JSON.stringify produces (integral floats lose their .0)"""
+    if isinstance(value, float) and math.isfinite(value) and value.is_integer():
+        return int(value)
+    if isinstance(value, dict):
+        return {k: _js_compatible(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_js_compatible(v) for v in value]
+    return value
+
+def hash_event(data):
+    """SHA-256 hex digest of an event, matching RecordEvent._hashEvent in the chaincode"""
+    encoded = json.dumps(_js_compatible(data), separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+def _parent(left, right):
+    return hashlib.sha256(left + right).digest()
+
+def merkle_root(leaf_hashes):
+    """Root (hex) of the tree over a list of hex leaf hashes"""
+    if not leaf_hashes:
+        raise ValueError("Cannot build a Merkle tree without leaves")
+    level = [bytes.fromhex(h) for h in leaf_hashes]
+    while len(level) > 1:
+        level = [
+            _parent(level[i], level[i + 1]) if i + 1 < len(level) else level[i]
+            for i in range(0, len(level), 2)
+        ]
+    return level[0].hex()
+
+def merkle_proof(leaf_hashes, index):
+    """
+    Inclusion proof for leaf `index`: a list of {"hash", "side"} steps, where
+    side says whether the sibling is on the left or the right.
+    """
+    if not 0 <= index < len(leaf_hashes):
+        raise IndexError(f"Leaf index {index} out of range for {len(leaf_hashes)} leaves")
+    level = [bytes.fromhex(h) for h in leaf_hashes]
+    proof = []
+    while len(level) > 1:
+        sibling = index ^ 1
+        if sibling < len(level):
+            proof.append({"hash": level[sibling].hex(), "side": "left" if sibling < index else "right"})
+        level = [
+            _parent(level[i], level[i + 1]) if i + 1 < len(level) else level[i]
+            for i in range(0, len(level), 2)
+        ]
+        index //= 2
+    return proof
+
+def verify_proof(leaf_hash, proof, root):
+    """Check that leaf_hash is included under root"""
+    node = bytes.fromhex(leaf_hash)
+    for step in proof:
+        sibling = bytes.fromhex(step["hash"])
+        node = _parent(sibling, node) if step["side"] == "left" else _parent(node, sibling)
+    return node.hex() == root
+
+class MerkleBatcher:
+    """
+    Buffers events into batches of at most max_events or max_seconds.
+
+    Every event is appended to <log_dir>/events.jsonl as soon as it is added;
+    sealed batches are appended to <log_dir>/batches.jsonl, and once the API
+    server has accepted a batch's root, mark_anchored() appends its ID to
+    <log_dir>/anchored.jsonl. An unsealed batch left behind by a crash is
+    reloaded on startup and sealed normally; sealed batches that were never
+    marked anchored are listed by unanchored() so they can be resubmitted.
+    Thread-safe: add(), poll() and mark_anchored() may be called from
+    different threads.
+    """
+
+    def __init__(self, log_dir, source, max_events=1000, max_seconds=10.0):
+        self.log_dir = Path(log_dir)
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        self.events_path = self.log_dir / "events.jsonl"
+        self.batches_path = self.log_dir / "batches.jsonl"
+        self.anchored_path = self.log_dir / "anchored.jsonl"
+        self.source = source
+        self.max_events = max_events
+        self.max_seconds = max_seconds
+        self._lock = threading.Lock()
+
+        self.batch_id = 0
+        self.pending = []
+        self.opened_at = None
+        self._recover()
+
+    def _recover(self):
+        sealed = -1
+        for record in _read_jsonl(self.batches_path):
+            sealed = max(sealed, record["batch_id"])
+        self.batch_id = sealed + 1
+        for record in _read_jsonl(self.events_path):
+            if record["batch_id"] == self.batch_id:
+                self.pending.append(record)
+        if self.pending:
+            self.opened_at = time.monotonic()
+            print(f"Recovered {len(self.pending)} unsealed events for batch {self.batch_id}")
+        unanchored = self.unanchored()
+        if unanchored:
+            print(f"Found {len(unanchored)} sealed batches that were never anchored")
+
+    def unanchored(self):
+        """Sealed batch records whose root has not been marked anchored, oldest first"""
+        with self._lock:
+            anchored = {record["batch_id"] for record in _read_jsonl(self.anchored_path)}
+            return [batch for batch in _read_jsonl(self.batches_path) if batch["batch_id"] not in anchored]
+
+    def mark_anchored(self, batch_id):
+        """Record that the API server accepted the root of batch_id"""
+        with self._lock:
+            with open(self.anchored_path, "a") as f:
+                f.write(json.dumps({"batch_id": batch_id, "anchored_at": time.time()}) + "\n")
+
+    def add(self, event):
+        """Log an event; returns the sealed batch record if this event filled the batch"""
+        with self._lock:
+            record = {
+                "batch_id": self.batch_id,
+                "index": len(self.pending),
+                "hash": hash_event(event),
+                "logged_at": time.time(),
+                "data": event
+            }
+            with open(self.events_path, "a") as f:
+                f.write(json.dumps(record) + "\n")
+            if not self.pending:
+                self.opened_at = time.monotonic()
+            self.pending.append(record)
+            if len(self.pending) >= self.max_events:
+                return self._seal()
+        return None
+
+    def poll(self):
+        """Seal the open batch if its time window has elapsed; returns the batch record or None"""
+        with self._lock:
+            if self.pending and time.monotonic() - self.opened_at >= self.max_seconds:
+                return self._seal()
+        return None
+
+    def flush(self):
+        """Seal whatever is pending regardless of size or age"""
+        with self._lock:
+            if self.pending:
+                return self._seal()
+        return None
+
+    def _seal(self):
+        leaves = [record["hash"] for record in self.pending]
+        batch = {
+            "type": "merkle_batch",
+            "source": self.source,
+            "batch_id": self.batch_id,
+            "root": merkle_root(leaves),
+            "count": len(leaves),
+            "first_logged_at": self.pending[0]["logged_at"],
+            "last_logged_at": self.pending[-1]["logged_at"],
+            "hash_alg": "sha256"
+        }
+        with open(self.batches_path, "a") as f:
+            f.write(json.dumps(batch) + "\n")
+        self.batch_id += 1
+        self.pending = []
+        self.opened_at = None
+        return batch
+
+def _read_jsonl(path):
+    path = Path(path)
+    if not path.exists():
+        return
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                # A torn last line from a crash; everything before it is intact
+                continue
+
+def build_proof(log_dir, batch_id, index=None, event_hash=None):
+    """Produce an inclusion proof for one logged event against its batch root"""
+    log_dir = Path(log_dir)
+    batch = next((b for b in _read_jsonl(log_dir / "batches.jsonl") if b["batch_id"] == batch_id), None)
+    if batch is None:
+        raise ValueError(f"Batch {batch_id} has not been sealed")
+
+    records = [r for r in _read_jsonl(log_dir / "events.jsonl") if r["batch_id"] == batch_id]
+    records.sort(key=lambda r: r["index"])
+    leaves = [r["hash"] for r in records]
+    if index is None:
+        if event_hash not in leaves:
+            raise ValueError(f"Event hash {event_hash} not found in batch {batch_id}")
+        index = leaves.index(event_hash)
+
+    record = records[index]
+    if hash_event(record["data"]) != record["hash"]:
+        raise ValueError(f"Logged event {batch_id}/{index} does not match its recorded hash")
+
+    return {
+        "source": batch["source"],
+        "batch_id": batch_id,
+        "index": index,
+        "leaf": record["hash"],
+        "data": record["data"],
+        "root": batch["root"],
+        "proof": merkle_proof(leaves, index)
+    }
+
+def fetch_anchored_root(api_url, source, batch_id):
+    """Look up the root anchored on chain for a batch through the API server"""
+    import requests
+
+    response = requests.get(f"{api_url.rstrip('/')}/api/batch/{source}/{batch_id}", timeout=10)
+    response.raise_for_status()
+    return response.json()["data"]["batch"]["root"]
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description='Produce and verify Merkle inclusion proofs for anchored events')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    prove_parser = subparsers.add_parser('prove', help='Print an inclusion proof as JSON')
+    prove_parser.add_argument('--log-dir', required=True, help='Anchor log directory (events.jsonl, batches.jsonl)')
+    prove_parser.add_argument('--batch', type=int, required=True, help='Batch ID')
+    group = prove_parser.add_mutually_exclusive_group(required=True)
+    group.add_argument('--index', type=int, help='Leaf index within the batch')
+    group.add_argument('--event-hash', help='Hash of the event (as computed by _hashEvent)')
+
+    verify_parser = subparsers.add_parser('verify', help='Verify a proof produced by "prove"')
+    verify_parser.add_argument('proof', help='Proof JSON file')
+    verify_parser.add_argument('--api-url', default=None,
+                               help='Also check the root anchored on chain via this API server')
+
+    args = parser.parse_args()
+
+    if args.command == 'prove':
+        print(json.dumps(build_proof(args.log_dir, args.batch, args.index, args.event_hash), indent=2))
+    else:
+        with open(args.proof) as f:
+            proof = json.load(f)
+        leaf_ok = hash_event(proof["data"]) == proof["leaf"]
+        root = proof["root"]
+        if args.api_url:
+            root = fetch_anchored_root(args.api_url, proof["source"], proof["batch_id"])
+        path_ok = verify_proof(proof["leaf"], proof["proof"], root)
+        print(f"Event hash matches data: {leaf_ok}")
+        print(f"Inclusion proof against {'on-chain' if args.api_url else 'logged'} root {root}: {path_ok}")
+        sys.exit(0 if leaf_ok and path_ok else 1)
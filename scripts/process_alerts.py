@@ -1,53 +1,158 @@
+import asyncio
 import json
-import time
-import requests
+import os
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 
+from alert_forwarder import AlertForwarder, DEFAULT_URL, report_stats
+from eve_tailer import EveTailer
+from merkle_anchor import DEFAULT_ANCHOR_URL, MerkleBatcher
+
+READ_CHUNK_BYTES = 1 << 20
+
+def parse_alert(line):
+    """Turn one eve.json line into the event forwarded to the blockchain, or None"""
+    try:
+        alert = json.loads(line)
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(alert, dict) or alert.get('event_type') != 'alert':
+        return None
+    details = alert.get('alert')
+    if not isinstance(details, dict):
+        # Malformed alert record: skip it rather than abort the rest of the read
+        return None
+    return {
+        'timestamp': alert.get('timestamp'),
+        'alert_id': details.get('signature_id'),
+        'attack_type': details.get('signature'),
+        'source_ip': alert.get('src_ip'),
+        'dest_ip': alert.get('dest_ip'),
+        'raw_data': alert
+    }
+
 class EveJsonHandler(FileSystemEventHandler):
+    def __init__(self, forwarder, state_path=None, batcher=None, chunk_bytes=READ_CHUNK_BYTES):
+        super().__init__()
+        self.forwarder = forwarder
+        self.tailer = EveTailer(state_path)
+        self.batcher = batcher
+        self.chunk_bytes = chunk_bytes
+
     def on_modified(self, event):
         if event.src_path.endswith('eve.json'):
             self.process_alerts(event.src_path)
 
+    def on_created(self, event):
+        # Suricata re-creates eve.json after rotation
+        self.on_modified(event)
+
     def process_alerts(self, file_path):
-        with open(file_path, 'r') as f:
-            for line in f:
-                try:
-                    alert = json.loads(line)
-                    if alert['event_type'] == 'alert':
-                        event_data = {
-                            'timestamp': alert['timestamp'],
-                            'alert_id': alert['alert']['signature_id'],
-                            'attack_type': alert['alert']['signature'],
-                            'source_ip': alert['src_ip'],
-                            'dest_ip': alert['dest_ip'],
-                            'raw_data': alert
-                        }
-                        self.send_to_blockchain(event_data)
-                except json.JSONDecodeError:
-                    continue
+        """Forward the alerts appended to file_path since the last call, chunk_bytes at a time"""
+        while True:
+            lines = self.tailer.read_new_lines(file_path, self.chunk_bytes)
+            for line in lines:
+                event_data = parse_alert(line)
+                if event_data is not None:
+                    self.send_to_blockchain(event_data)
+            # Persist progress per chunk so a restart mid-backlog does not start over
+            self.tailer.save()
+            if not lines:
+                break
 
     def send_to_blockchain(self, event_data):
-        try:
-            response = requests.post(
-                "http://localhost:4000/api/recordEvent",
-                json=event_data,
-                headers={'Content-Type': 'application/json'}
-            )
-            print(f"Alert sent to blockchain: {response.status_code}")
-        except Exception as e:
-            print(f"Error sending to blockchain: {str(e)}")
+        # In anchoring mode only sealed batch roots go on chain
+        if self.batcher is not None:
+            event_data = self.batcher.add(event_data)
+            if event_data is None:
+                return
+        # Blocks this (watchdog) thread while the forwarder's queue is full,
+        # so unread alerts stay in eve.json instead of piling up in memory
+        self.forwarder.submit_threadsafe(event_data)
+
+async def seal_batches(batcher, forwarder, interval):
+    """Anchor batches whose time window has elapsed even when no new alerts arrive"""
+    while True:
+        await asyncio.sleep(interval)
+        batch = await asyncio.to_thread(batcher.poll)
+        if batch is not None:
+            await forwarder.submit(batch)
+
+async def main(args):
+    batcher = None
+    if args.anchor:
+        batcher = MerkleBatcher(args.anchor_dir, 'suricata', args.anchor_events, args.anchor_seconds)
+
+    forwarder = AlertForwarder(
+        args.anchor_url if args.anchor else args.api_url,
+        concurrency=args.concurrency,
+        queue_size=args.queue_size,
+        max_retries=args.max_retries,
+        timeout=args.timeout,
+        spill_path=args.spill_file,
+        on_delivered=(lambda batch: batcher.mark_anchored(batch["batch_id"])) if batcher else None
+    )
+    await forwarder.start()
+    if batcher is not None:
+        # Roots sealed before a crash or outage that the API server never accepted
+        for batch in batcher.unanchored():
+            await forwarder.submit(batch)
+
+    path = args.path
+    event_handler = EveJsonHandler(forwarder, args.state_file, batcher, args.read_chunk)
+
+    # Catch up on anything appended while we were not running
+    eve_path = os.path.join(path, 'eve.json')
+    if os.path.exists(eve_path):
+        await asyncio.to_thread(event_handler.process_alerts, eve_path)
 
-if __name__ == "__main__":
-    path = '/var/log/suricata/'
-    event_handler = EveJsonHandler()
     observer = Observer()
     observer.schedule(event_handler, path, recursive=False)
     observer.start()
-    
+    tasks = [asyncio.create_task(report_stats(forwarder, args.stats_interval))]
+    if batcher is not None:
+        tasks.append(asyncio.create_task(seal_batches(batcher, forwarder, min(1.0, args.anchor_seconds))))
+
     try:
-        while True:
-            time.sleep(1)
-    except KeyboardInterrupt:
+        await asyncio.Event().wait()
+    finally:
+        for task in tasks:
+            task.cancel()
         observer.stop()
-    observer.join()
\ No newline at end of file
+        await asyncio.to_thread(observer.join)
+        if batcher is not None:
+            batch = batcher.flush()
+            if batch is not None:
+                forwarder.submit_nowait(batch)
+        await forwarder.close(drain=False)
+        print(f"Forwarder stats: {json.dumps(forwarder.snapshot())}")
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Forward Suricata alerts from eve.json to the blockchain API')
+    parser.add_argument('--path', default='/var/log/suricata/', help='Directory containing eve.json')
+    parser.add_argument('--state-file', default='logs/eve_tailer_state.json',
+                        help='Where to persist the read position between restarts')
+    parser.add_argument('--read-chunk', type=int, default=READ_CHUNK_BYTES,
+                        help='Bytes of eve.json read (and held in memory) at a time')
+    parser.add_argument('--api-url', default=DEFAULT_URL, help='recordEvent endpoint of the API server')
+    parser.add_argument('--concurrency', type=int, default=8, help='Maximum requests in flight')
+    parser.add_argument('--queue-size', type=int, default=10000, help='Maximum alerts buffered in memory')
+    parser.add_argument('--max-retries', type=int, default=5, help='Retries per alert before spilling to disk')
+    parser.add_argument('--timeout', type=float, default=10.0, help='Per-request timeout in seconds')
+    parser.add_argument('--spill-file', default='logs/alert_spill.jsonl',
+                        help='Alerts that could not be delivered are kept here and replayed later')
+    parser.add_argument('--anchor', action='store_true',
+                        help='Batch alerts locally and only anchor each batch\'s Merkle root on chain')
+    parser.add_argument('--anchor-events', type=int, default=1000, help='Maximum alerts per anchored batch')
+    parser.add_argument('--anchor-seconds', type=float, default=10.0, help='Maximum age of a batch before anchoring')
+    parser.add_argument('--anchor-dir', default='logs/anchor/suricata', help='Local append-only log of batched alerts')
+    parser.add_argument('--anchor-url', default=DEFAULT_ANCHOR_URL, help='anchorBatch endpoint of the API server')
+    parser.add_argument('--stats-interval', type=float, default=30.0, help='Seconds between stats lines')
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(main(args))
+    except KeyboardInterrupt:
+        pass
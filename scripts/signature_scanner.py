@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+Offline Signature Scanner
+Checks how suricata/custom.rules matches a CAN dataset without running the
+Suricata daemon. The content:"|..|" signatures (with offset, depth, distance,
+within and nocase modifiers) are compiled into one Aho-Corasick automaton
+stored as a dense NumPy transition table, and payloads are scanned a chunk at a
+time: the automaton advances one byte column for every frame in the chunk at
+once, so the Python loop runs once per payload byte rather than once per frame.
+
+Input is the payload column of cleaned_iov.csv or a candump log; output is
+eve.json-style alert records (readable by process_alerts.py and
+visualize_results.py) plus per-signature hit counts. With --workers, chunks
+are parsed and scanned in a process pool and written in input order.
+
+Example:
+    python3 scripts/signature_scanner.py --input data/cleaned_iov.csv --eve logs/scan/eve.json --workers 4
+"""
+
+import json
+import os
+import re
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+import numpy as np
+
+from can_replay import (frames_from_candump, frames_from_dataframe, read_candump_chunks,
+                        read_dataset_chunks)
+
+RULE_PATTERN = re.compile(r'^\s*(alert|drop|reject|pass)\s+(\S+)\s.*?\((.*)\)\s*$')
+OPTION_PATTERN = re.compile(r'\s*([a-z_]+)\s*(?::\s*((?:"(?:[^"\\]|\\.)*")|[^;]*))?;')
+
+def parse_content(value):
+    """Decode a Suricata content string ("abc|0D 0A|def") into bytes"""
+    value = value.strip()
+    if value.startswith('"') and value.endswith('"'):
+        value = value[1:-1]
+    out = bytearray()
+    for i, part in enumerate(value.split('|')):
+        if i % 2:
+            out += bytes.fromhex(part.replace(' ', ''))
+        else:
+            out += re.sub(r'\\(.)', r'\1', part).encode('latin-1')
+    return bytes(out)
+
+def parse_rules(path):
+    """
+    Parse the content-based rules in a Suricata rules file. Each rule is a dict
+    with sid, rev, msg and a list of contents ({pattern, nocase, offset, depth,
+    distance, within}); rules without content are skipped.
+    """
+    rules = []
+    with open(path) as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            match = RULE_PATTERN.match(line)
+            if not match:
+                print(f"⚠️ Skipping unparseable rule on line {line_number}")
+                continue
+            rule = {"action": match.group(1), "sid": None, "rev": 1, "msg": "", "contents": []}
+            for name, value in OPTION_PATTERN.findall(match.group(3)):
+                if name == 'content':
+                    rule["contents"].append({"pattern": parse_content(value), "nocase": False,
+                                             "offset": None, "depth": None,
+                                             "distance": None, "within": None})
+                elif name == 'nocase' and rule["contents"]:
+                    rule["contents"][-1]["nocase"] = True
+                elif name in ('offset', 'depth', 'distance', 'within') and rule["contents"]:
+                    rule["contents"][-1][name] = int(value)
+                elif name == 'msg':
+                    rule["msg"] = value.strip('"')
+                elif name in ('sid', 'rev'):
+                    rule[name] = int(value)
+            if rule["contents"] and rule["sid"] is not None:
+                rules.append(rule)
+    return rules
+
+def lowercase(data):
+    return np.where((data >= 0x41) & (data <= 0x5A), data + 0x20, data).astype(np.uint8)
+
+class Automaton:
+    """Aho-Corasick automaton as a dense [states, 256] transition table"""
+
+    def __init__(self, patterns):
+        goto = [{}]
+        outputs = [set()]
+        for index, pattern in enumerate(patterns):
+            state = 0
+            for byte in pattern:
+                if byte not in goto[state]:
+                    goto.append({})
+                    outputs.append(set())
+                    goto[state][byte] = len(goto) - 1
+                state = goto[state][byte]
+            outputs[state].add(index)
+
+        table = np.zeros((len(goto), 256), dtype=np.int32)
+        fail = [0] * len(goto)
+        queue = deque()
+        for byte, child in goto[0].items():
+            table[0, byte] = child
+            queue.append(child)
+        while queue:
+            state = queue.popleft()
+            table[state] = table[fail[state]]
+            for byte, child in goto[state].items():
+                fail[child] = table[fail[state], byte]
+                outputs[child] |= outputs[fail[child]]
+                table[state, byte] = child
+                queue.append(child)
+
+        self.table = table
+        self.output = np.zeros((len(goto), max(len(patterns), 1)), dtype=bool)
+        for state, matched in enumerate(outputs):
+            self.output[state, list(matched)] = True
+
+    def scan(self, data, dlc):
+        """
+        Run every payload row through the automaton together. Returns a bool
+        array [rows, patterns, width] that is True where a pattern ends at a byte.
+        """
+        rows, width = data.shape
+        ends = np.zeros((rows, self.output.shape[1], width), dtype=bool)
+        state = np.zeros(rows, dtype=np.int32)
+        for column in range(width):
+            state = self.table[state, data[:, column]]
+            ends[:, :, column] = self.output[state] & (column < dlc)[:, None]
+        return ends
+
+class SignatureScanner:
+    """Compiled rule set: one automaton for case-sensitive and one for nocase contents"""
+
+    def __init__(self, rules):
+        self.rules = rules
+        self.sensitive, self.insensitive = [], []
+        for rule in rules:
+            for content in rule["contents"]:
+                if content["nocase"]:
+                    content["slot"] = ("nocase", len(self.insensitive))
+                    self.insensitive.append(content["pattern"].lower())
+                else:
+                    content["slot"] = ("case", len(self.sensitive))
+                    self.sensitive.append(content["pattern"])
+        self.case_automaton = Automaton(self.sensitive) if self.sensitive else None
+        self.nocase_automaton = Automaton(self.insensitive) if self.insensitive else None
+
+    @classmethod
+    def from_file(cls, path):
+        return cls(parse_rules(path))
+
+    def match(self, batch):
+        """Return a bool array [frames, rules] of rule matches for a FrameBatch"""
+        ends = {}
+        if self.case_automaton is not None:
+            ends["case"] = self.case_automaton.scan(batch.data, batch.dlc)
+        if self.nocase_automaton is not None:
+            ends["nocase"] = self.nocase_automaton.scan(lowercase(batch.data), batch.dlc)
+
+        width = batch.data.shape[1]
+        positions = np.arange(width)
+        matches = np.zeros((len(batch), len(self.rules)), dtype=bool)
+        for r, rule in enumerate(self.rules):
+            previous = None
+            for content in rule["contents"]:
+                kind, index = content["slot"]
+                length = len(content["pattern"])
+                valid = ends[kind][:, index, :].copy()
+                start = positions - length + 1
+                # offset/depth are absolute; depth counts from offset
+                if content["offset"] is not None:
+                    valid &= start >= content["offset"]
+                if content["depth"] is not None:
+                    valid &= positions < (content["offset"] or 0) + content["depth"]
+                relative = content["distance"] is not None or content["within"] is not None
+                if previous is not None and relative:
+                    # distance/within are relative to the end of the previous content's match
+                    distance = content["distance"] or 0
+                    allowed = np.zeros_like(valid)
+                    for prev_end in range(width):
+                        ok = start >= prev_end + 1 + distance
+                        if content["within"] is not None:
+                            ok &= positions <= prev_end + content["within"]
+                        allowed |= previous[:, prev_end][:, None] & ok[None, :]
+                    valid &= allowed
+                elif previous is not None:
+                    valid &= previous.any(axis=1)[:, None]
+                previous = valid
+            matches[:, r] = previous.any(axis=1)
+        return matches
+
+    def eve_records(self, batch, matches):
+        """eve.json alert records for every (frame, rule) match"""
+        records = []
+        for i, r in zip(*np.nonzero(matches)):
+            rule = self.rules[r]
+            can_id = int(batch.can_id[i])
+            records.append({
+                "timestamp": datetime.fromtimestamp(float(batch.timestamp[i]), timezone.utc)
+                                     .strftime('%Y-%m-%dT%H:%M:%S.%f%z'),
+                "event_type": "alert",
+                "src_ip": batch.ecu[i] if batch.ecu is not None else f"0x{can_id:03X}",
+                "dest_ip": "can-bus",
+                "proto": "CAN",
+                "can": {"id": can_id, "payload": batch.data[i, :batch.dlc[i]].tobytes().hex().upper()},
+                "alert": {
+                    "action": "allowed",
+                    "gid": 1,
+                    "signature_id": rule["sid"],
+                    "rev": rule["rev"],
+                    "signature": rule["msg"],
+                    "severity": 3
+                }
+            })
+        return records
+
+_scanner = None
+
+def _init_worker(rules_path):
+    global _scanner
+    _scanner = SignatureScanner.from_file(rules_path)
+
+def _scan_chunk(scanner, kind, chunk):
+    batch = frames_from_candump(chunk) if kind == 'candump' else frames_from_dataframe(chunk)
+    matches = scanner.match(batch)
+    malicious = batch.is_malicious.astype(bool)
+    return {
+        "frames": len(batch),
+        "hits": matches.sum(axis=0).tolist(),
+        "hits_malicious": matches[malicious].sum(axis=0).tolist(),
+        "malicious": int(malicious.sum()),
+        "records": scanner.eve_records(batch, matches)
+    }
+
+def _scan_chunk_task(args):
+    kind, chunk = args
+    return _scan_chunk(_scanner, kind, chunk)
+
+def scan_file(input_path, rules_path, eve_path=None, chunk_size=200_000, workers=1, limit=None):
+    """Scan a cleaned dataset CSV or candump log; returns a summary with per-signature hit counts"""
+    kind = 'candump' if input_path.endswith(('.log', '.candump')) else 'csv'
+    chunks = (read_candump_chunks(input_path, chunk_size, limit) if kind == 'candump'
+              else read_dataset_chunks(input_path, chunk_size, limit))
+    scanner = SignatureScanner.from_file(rules_path)
+    print(f"Loaded {len(scanner.rules)} content rules from {rules_path}")
+
+    frames = malicious = 0
+    hits = np.zeros(len(scanner.rules), dtype=np.int64)
+    hits_malicious = np.zeros(len(scanner.rules), dtype=np.int64)
+    eve_file = None
+    if eve_path:
+        os.makedirs(os.path.dirname(eve_path) or '.', exist_ok=True)
+        eve_file = open(eve_path, 'w')
+
+    def collect(result):
+        nonlocal frames, malicious
+        frames += result["frames"]
+        malicious += result["malicious"]
+        hits[:] += result["hits"]
+        hits_malicious[:] += result["hits_malicious"]
+        if eve_file:
+            eve_file.writelines(json.dumps(record) + "\n" for record in result["records"])
+
+    started = time.perf_counter()
+    try:
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(rules_path,)) as pool:
+                in_flight = deque()
+                for chunk in chunks:
+                    in_flight.append(pool.submit(_scan_chunk_task, (kind, chunk)))
+                    if len(in_flight) >= 2 * workers:
+                        collect(in_flight.popleft().result())
+                while in_flight:
+                    collect(in_flight.popleft().result())
+        else:
+            for chunk in chunks:
+                collect(_scan_chunk(scanner, kind, chunk))
+    finally:
+        if eve_file:
+            eve_file.close()
+    elapsed = time.perf_counter() - started
+
+    return {
+        "input": input_path,
+        "frames": frames,
+        "seconds": round(elapsed, 3),
+        "frames_per_minute": round(frames / elapsed * 60) if elapsed else None,
+        "malicious_frames": malicious if kind == 'csv' else None,
+        "signatures": [
+            {
+                "sid": rule["sid"],
+                "msg": rule["msg"],
+                "hits": int(hits[r]),
+                "hits_on_malicious": int(hits_malicious[r]) if kind == 'csv' else None
+            }
+            for r, rule in enumerate(scanner.rules)
+        ]
+    }
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Scan CAN payloads offline with the content rules in custom.rules')
+    parser.add_argument('--input', default='data/cleaned_iov.csv', help='Cleaned dataset CSV or candump .log file')
+    parser.add_argument('--rules', default='suricata/custom.rules', help='Suricata rules file')
+    parser.add_argument('--eve', default=None, help='Write eve.json-style alert records here')
+    parser.add_argument('--chunk-size', type=int, default=200_000, help='Frames per chunk')
+    parser.add_argument('--workers', type=int, default=1, help='Scan chunks in a pool of this many processes')
+    parser.add_argument('--limit', type=int, default=None, help='Only scan this many frames')
+    parser.add_argument('--report', default=None, help='Also write the JSON summary to this file')
+    args = parser.parse_args()
+
+    summary = scan_file(args.input, args.rules, args.eve, args.chunk_size, args.workers, args.limit)
+    output = json.dumps(summary, indent=2)
+    if args.report:
+        with open(args.report, 'w') as f:
+            f.write(output)
+    print(output)
+    print(f"✅ Scanned {summary['frames']:,} frames ({summary['frames_per_minute']:,} frames/minute)")
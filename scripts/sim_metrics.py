@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Simulation Loop Instrumentation
+Per-phase timers, TraCI call counters and step-time percentiles for the
+inject_sumo.py main loop, exported periodically as JSON (metrics.json) and
+Prometheus text format (metrics.prom) in the run's log directory.
+
+SimMetrics keeps the hot path cheap: a phase timer is a reusable object that
+adds two perf_counter() readings to a dict entry, step durations are buffered
+in a list and folded into a fixed log-scale histogram at each export, and
+counters are plain dict increments. NullMetrics has the same interface and
+does nothing, so instrumentation can be switched off entirely.
+
+Also provides the levelled, rate-limited logging used instead of a print per
+injected vehicle.
+"""
+
+import json
+import logging
+import os
+import sys
+import time
+from contextlib import nullcontext
+from pathlib import Path
+
+import numpy as np
+
+# Step-time histogram buckets: 1 microsecond to 100 seconds, log spaced
+STEP_BUCKETS = np.logspace(-6, 2, 321)
+
+class _PhaseTimer:
+    __slots__ = ("metrics", "name", "started")
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+        self.started = 0.0
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.started
+        seconds = self.metrics.phase_seconds
+        seconds[self.name] = seconds.get(self.name, 0.0) + elapsed
+        calls = self.metrics.phase_calls
+        calls[self.name] = calls.get(self.name, 0) + 1
+        return False
+
+class SimMetrics:
+    """Collects loop metrics and writes them to output_dir every export_interval wall seconds"""
+
+    enabled = True
+
+    def __init__(self, output_dir, export_interval=10.0):
+        self.output_dir = Path(output_dir)
+        self.export_interval = export_interval
+        self.phase_seconds = {}
+        self.phase_calls = {}
+        self.counters = {}
+        self.steps = 0
+        self.sim_time = 0.0
+        self._timers = {}
+        self._window = []
+        self._histogram = np.zeros(len(STEP_BUCKETS) + 1, dtype=np.int64)
+        self._step_sum = 0.0
+        self._step_max = 0.0
+        self._started = time.perf_counter()
+        self._last_export = self._started
+
+    def phase(self, name):
+        """Context manager timing one phase of the loop (timers are reused, not allocated per call)"""
+        timer = self._timers.get(name)
+        if timer is None:
+            timer = self._timers[name] = _PhaseTimer(self, name)
+        return timer
+
+    def count(self, name, n=1):
+        """Count n calls of a TraCI function"""
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def step_done(self, seconds, sim_time):
+        """Record the wall time of one loop iteration and export if the interval has elapsed"""
+        self._window.append(seconds)
+        self.steps += 1
+        self.sim_time = sim_time
+        now = time.perf_counter()
+        if now - self._last_export >= self.export_interval:
+            self._last_export = now
+            self.export()
+
+    def _fold_window(self):
+        window = np.asarray(self._window)
+        self._window = []
+        if len(window):
+            self._histogram += np.bincount(np.searchsorted(STEP_BUCKETS, window),
+                                           minlength=len(self._histogram))
+            self._step_sum += float(window.sum())
+            self._step_max = max(self._step_max, float(window.max()))
+        return window
+
+    def _percentile(self, q):
+        total = self._histogram.sum()
+        if not total:
+            return None
+        index = int(np.searchsorted(np.cumsum(self._histogram), q * total))
+        # Upper edge of the bucket, capped by the largest step seen
+        return min(float(STEP_BUCKETS[min(index, len(STEP_BUCKETS) - 1)]), self._step_max)
+
+    def snapshot(self):
+        window = self._fold_window()
+        steps = int(self._histogram.sum())
+        return {
+            "timestamp": time.time(),
+            "wall_seconds": round(time.perf_counter() - self._started, 3),
+            "sim_time": self.sim_time,
+            "steps": self.steps,
+            "step_seconds": {
+                "mean": self._step_sum / steps if steps else None,
+                "p50": self._percentile(0.5),
+                "p90": self._percentile(0.9),
+                "p99": self._percentile(0.99),
+                "max": self._step_max if steps else None
+            },
+            "window_step_seconds": {
+                "steps": len(window),
+                "p50": float(np.percentile(window, 50)) if len(window) else None,
+                "p99": float(np.percentile(window, 99)) if len(window) else None
+            },
+            "phases": {
+                name: {"seconds": round(seconds, 6), "calls": self.phase_calls[name],
+                       "mean_us": round(seconds / self.phase_calls[name] * 1e6, 2)}
+                for name, seconds in self.phase_seconds.items()
+            },
+            "traci_calls": dict(self.counters)
+        }
+
+    def export(self):
+        """Write metrics.json and metrics.prom (each replaced atomically)"""
+        snapshot = self.snapshot()
+        _write_atomic(self.output_dir / "metrics.json", json.dumps(snapshot, indent=2))
+        _write_atomic(self.output_dir / "metrics.prom", to_prometheus(snapshot))
+        return snapshot
+
+class NullMetrics:
+    """Drop-in replacement for SimMetrics when instrumentation is off"""
+
+    enabled = False
+    _phase = nullcontext()
+
+    def phase(self, name):
+        return self._phase
+
+    def count(self, name, n=1):
+        pass
+
+    def step_done(self, seconds, sim_time):
+        pass
+
+    def export(self):
+        return None
+
+def to_prometheus(snapshot):
+    """Render a snapshot in the Prometheus text exposition format"""
+    lines = [
+        "# HELP sumo_step_seconds Wall time of one simulation loop iteration.",
+        "# TYPE sumo_step_seconds summary"
+    ]
+    step = snapshot["step_seconds"]
+    for quantile, key in (("0.5", "p50"), ("0.9", "p90"), ("0.99", "p99")):
+        if step[key] is not None:
+            lines.append(f'sumo_step_seconds{{quantile="{quantile}"}} {step[key]:.9f}')
+    if step["mean"] is not None:
+        lines.append(f"sumo_step_seconds_sum {step['mean'] * snapshot['steps']:.6f}")
+    lines.append(f"sumo_step_seconds_count {snapshot['steps']}")
+
+    lines += ["# HELP sumo_phase_seconds_total Wall time spent in each loop phase.",
+              "# TYPE sumo_phase_seconds_total counter"]
+    for name, phase in snapshot["phases"].items():
+        lines.append(f'sumo_phase_seconds_total{{phase="{name}"}} {phase["seconds"]:.6f}')
+
+    lines += ["# HELP sumo_traci_calls_total TraCI calls made by the loop.",
+              "# TYPE sumo_traci_calls_total counter"]
+    for name, count in snapshot["traci_calls"].items():
+        lines.append(f'sumo_traci_calls_total{{call="{name}"}} {count}')
+
+    lines += ["# HELP sumo_sim_time_seconds Current simulation time.",
+              "# TYPE sumo_sim_time_seconds gauge",
+              f"sumo_sim_time_seconds {snapshot['sim_time']}"]
+    return "\n".join(lines) + "\n"
+
+def _write_atomic(path, text):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+class RateLimitFilter(logging.Filter):
+    """
+    Lets at most `burst` records with the same message template through per
+    `interval` seconds; the next record let through reports how many were
+    suppressed. Warnings and errors are never limited.
+    """
+
+    def __init__(self, burst=5, interval=10.0):
+        super().__init__()
+        self.burst = burst
+        self.interval = interval
+        self._windows = {}
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        now = time.monotonic()
+        key = (record.name, record.msg)
+        started, seen, suppressed = self._windows.get(key, (now, 0, 0))
+        if now - started >= self.interval:
+            started, seen = now, 0
+        if seen >= self.burst:
+            self._windows[key] = (started, seen, suppressed + 1)
+            return False
+        if suppressed:
+            record.msg = f"{record.msg} ({suppressed} similar messages suppressed)"
+        self._windows[key] = (started, seen + 1, 0)
+        return True
+
+def configure_logging(level="INFO", burst=5, interval=10.0, stream=None):
+    """Send log records to stream (default stderr) with per-message rate limiting"""
+    handler = logging.StreamHandler(stream or sys.stderr)
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+    handler.addFilter(RateLimitFilter(burst, interval))
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(level)
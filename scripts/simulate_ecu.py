@@ -1,10 +1,20 @@
+import asyncio
+import os
+import threading
 import time
 import random
 import requests
 
+from alert_forwarder import AlertForwarder
+from merkle_anchor import DEFAULT_ANCHOR_URL, MerkleBatcher
+
+API_URL = "http://localhost:4000/api/recordEvent"
+
 class ECUSimulator:
-    def __init__(self, ecu_id):
+    def __init__(self, ecu_id, batcher=None, forwarder=None):
         self.ecu_id = ecu_id
+        self.batcher = batcher
+        self.forwarder = forwarder
         self.normal_messages = [
             {"type": "speed", "value": 60},
             {"type": "rpm", "value": 2000},
@@ -16,29 +26,91 @@ class ECUSimulator:
             {"type": "flood", "value": "1000msgs"}
         ]
 
+    def next_message(self, attack_probability=0.2, attack_mix=None, rng=random):
+        """
+        Pick the next message; returns (message, is_attack).
+        attack_mix optionally weights attack message types, e.g. {"spoof": 3, "flood": 1}.
+        """
+        if rng.random() < attack_probability:
+            if attack_mix:
+                candidates = [m for m in self.attack_messages if attack_mix.get(m["type"], 0) > 0]
+                # A mix naming no known attack type falls back to a uniform choice
+                if candidates:
+                    weights = [attack_mix[m["type"]] for m in candidates]
+                    return rng.choices(candidates, weights=weights)[0], True
+            return rng.choice(self.attack_messages), True
+        return rng.choice(self.normal_messages), False
+
+    def build_event(self, message):
+        return {
+            "timestamp": int(time.time()),
+            "ecu_id": self.ecu_id,
+            "message": message
+        }
+
     def run(self, attack_probability=0.2):
         while True:
-            if random.random() < attack_probability:
-                message = random.choice(self.attack_messages)
+            message, is_attack = self.next_message(attack_probability)
+            if is_attack:
                 print(f"ECU {self.ecu_id} sending attack: {message}")
             else:
-                message = random.choice(self.normal_messages)
                 print(f"ECU {self.ecu_id} sending normal: {message}")
 
-            try:
-                requests.post(
-                    "http://localhost:4000/api/recordEvent",
-                    json={
-                        "timestamp": int(time.time()),
-                        "ecu_id": self.ecu_id,
-                        "message": message
-                    }
-                )
-            except Exception as e:
-                print(f"Error sending message: {str(e)}")
+            event = self.build_event(message)
+            if self.batcher is not None:
+                # Anchoring mode: only sealed batch roots are sent, through the
+                # forwarder so they are retried or spilled instead of lost
+                batch = self.batcher.add(event) or self.batcher.poll()
+                if batch is not None:
+                    self.forwarder.submit_threadsafe(batch)
+            else:
+                self._post(API_URL, event)
 
             time.sleep(random.uniform(0.5, 2.0))
 
+    def _post(self, url, payload):
+        try:
+            requests.post(url, json=payload, timeout=10)
+        except Exception as e:
+            print(f"Error sending message: {str(e)}")
+
 if __name__ == "__main__":
-    ecu = ECUSimulator("ECU_2")
-    ecu.run()
\ No newline at end of file
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Simulate an ECU sending messages to the blockchain API')
+    parser.add_argument('--ecu-id', default='ECU_2')
+    parser.add_argument('--anchor', action='store_true',
+                        help='Batch messages locally and only anchor each batch\'s Merkle root on chain')
+    parser.add_argument('--anchor-events', type=int, default=100, help='Maximum messages per anchored batch')
+    parser.add_argument('--anchor-seconds', type=float, default=30.0, help='Maximum age of a batch before anchoring')
+    parser.add_argument('--anchor-dir', default=None, help='Local append-only log (default: logs/anchor/<ecu-id>)')
+    parser.add_argument('--anchor-url', default=DEFAULT_ANCHOR_URL, help='anchorBatch endpoint of the API server')
+    args = parser.parse_args()
+
+    batcher = forwarder = loop = None
+    if args.anchor:
+        anchor_dir = args.anchor_dir or f"logs/anchor/{args.ecu_id}"
+        batcher = MerkleBatcher(anchor_dir, args.ecu_id, args.anchor_events, args.anchor_seconds)
+        # The forwarder runs on an event loop in a background thread; run() hands it sealed batches
+        loop = asyncio.new_event_loop()
+        threading.Thread(target=loop.run_forever, daemon=True).start()
+        forwarder = AlertForwarder(args.anchor_url, concurrency=1,
+                                   spill_path=os.path.join(anchor_dir, 'spill.jsonl'),
+                                   on_delivered=lambda batch: batcher.mark_anchored(batch["batch_id"]))
+        asyncio.run_coroutine_threadsafe(forwarder.start(), loop).result()
+        # Roots sealed before a crash or outage that the API server never accepted
+        for batch in batcher.unanchored():
+            forwarder.submit_threadsafe(batch)
+
+    ecu = ECUSimulator(args.ecu_id, batcher, forwarder)
+    try:
+        ecu.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if forwarder is not None:
+            batch = batcher.flush()
+            if batch is not None:
+                forwarder.submit_threadsafe(batch)
+            # Whatever is still queued is spilled; unanchored batches are resubmitted on the next start
+            asyncio.run_coroutine_threadsafe(forwarder.close(drain=False), loop).result()
\ No newline at end of file
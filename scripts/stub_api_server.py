@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Stand-in API Server
+A local HTTP server that mimics the blockchain API server's endpoints
+(/api/recordEvent, /api/recordEvents, /api/health) without a Fabric network.
+Latency and failure rate are configurable so the alert forwarder and load
+generators can be exercised against slow or flaky backends.
+"""
+
+import asyncio
+import random
+import uuid
+
+from aiohttp import web
+
+def create_app(latency=0.0, jitter=0.0, error_rate=0.0):
+    """
+    Build the stand-in application.
+
+    latency/jitter are in seconds; error_rate is the fraction of requests
+    answered with 503 (as server.js does when the network is unavailable).
+    Received events are counted in app['stats'].
+    """
+    app = web.Application()
+    app['stats'] = {'requests': 0, 'events': 0, 'errors': 0}
+
+    async def simulate_commit(count):
+        delay = latency + random.uniform(0, jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if random.random() < error_rate:
+            app['stats']['errors'] += 1
+            raise web.HTTPServiceUnavailable(
+                text='{"error": "Blockchain network unavailable"}',
+                content_type='application/json'
+            )
+        app['stats']['events'] += count
+
+    def recorded(event):
+        return {
+            'success': True,
+            'event': {'id': f"event_{uuid.uuid4().hex}", 'data': event}
+        }
+
+    async def record_event(request):
+        app['stats']['requests'] += 1
+        event = await request.json()
+        if not event:
+            return web.json_response({'error': 'Request body cannot be empty'}, status=400)
+        await simulate_commit(1)
+        return web.json_response({'message': 'Transaction completed', 'data': recorded(event)})
+
+    async def record_events(request):
+        app['stats']['requests'] += 1
+        events = await request.json()
+        if not isinstance(events, list) or not events:
+            return web.json_response({'error': 'Request body must be a non-empty array'}, status=400)
+        await simulate_commit(len(events))
+        results = [{'index': i, 'status': 'fulfilled', 'data': recorded(e)} for i, e in enumerate(events)]
+        return web.json_response({'message': 'Batch processed', 'results': results})
+
+    async def health(request):
+        return web.json_response({'status': 'Network connection successful', 'stats': app['stats']})
+
+    app.router.add_post('/api/recordEvent', record_event)
+    app.router.add_post('/api/recordEvents', record_events)
+    app.router.add_get('/api/health', health)
+    return app
+
+async def start_server(host='127.0.0.1', port=0, **kwargs):
+    """Start the stand-in server in the running event loop; returns (runner, base_url)"""
+    app = create_app(**kwargs)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    bound_port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://{host}:{bound_port}"
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Run a stand-in for the blockchain API server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=4000)
+    parser.add_argument('--latency', type=float, default=0.0, help='Base response delay in seconds')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Extra uniform random delay in seconds')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests answered with 503')
+    args = parser.parse_args()
+
+    print(f"Stand-in API server listening at http://{args.host}:{args.port}")
+    web.run_app(
+        create_app(args.latency, args.jitter, args.error_rate),
+        host=args.host, port=args.port, print=None
+    )
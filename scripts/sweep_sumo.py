@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Parallel SUMO Sweep Runner
+Runs run_simulation (inject_sumo.py) once for every combination in a
+parameter grid, several instances at a time in a process pool. Each instance
+gets its own TraCI port and label, its own log directory under the sweep
+directory, a fixed seed and its own console log, so runs never share state.
+
+When every run has finished, the simulation_summary.json files are combined
+into one comparison table (sweep_summary.csv). A run that raises or whose
+SUMO process dies is recorded as failed and the rest of the sweep carries on.
+
+Example:
+    python3 scripts/sweep_sumo.py --param sample_rate=0.005,0.01,0.02 --param seed=1,2,3 --duration 600
+"""
+
+import contextlib
+import datetime
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+import pandas as pd
+
+# run_simulation keyword arguments that can be swept
+SWEEPABLE = ['duration', 'sample_rate', 'seed', 'realtime_factor', 'telemetry_mode', 'log_interval']
+
+def parse_param(spec):
+    """Parse "name=v1,v2,..." into (name, [values]); values are JSON where possible"""
+    name, _, values = spec.partition('=')
+    name = name.strip().replace('-', '_')
+    if name not in SWEEPABLE:
+        raise ValueError(f"Cannot sweep '{name}' (choose from {', '.join(SWEEPABLE)})")
+    parsed = []
+    for value in values.split(','):
+        try:
+            parsed.append(json.loads(value))
+        except json.JSONDecodeError:
+            parsed.append(value)
+    return name, parsed
+
+def expand_grid(grid):
+    """Every combination of a {name: [values]} grid, as a list of dicts"""
+    names = list(grid)
+    return [dict(zip(names, combo)) for combo in itertools.product(*(grid[name] for name in names))]
+
+def _run_instance(spec):
+    """Run one simulation in a worker process; output goes to <sweep_dir>/<run_name>.log"""
+    started = time.perf_counter()
+    log_path = Path(spec["output_dir"]) / f"{spec['run_name']}.log"
+    with open(log_path, 'a') as log, contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+        try:
+            from inject_sumo import load_checkpoint, run_simulation
+            from sim_metrics import configure_logging
+            configure_logging(spec["log_level"], stream=log)
+            # A retried run continues from its last checkpoint instead of starting over
+            run_dir = Path(spec["output_dir"]) / spec["run_name"]
+            resume_dir = run_dir if load_checkpoint(run_dir) else None
+            log_dir = run_simulation(spec["input_csv"], spec["sumo_config"], spec["output_dir"],
+                                     port=spec["port"], label=spec["run_name"], run_name=spec["run_name"],
+                                     resume_dir=resume_dir, **spec["kwargs"])
+            error = None
+        except Exception as e:
+            log_dir = None
+            error = f"{type(e).__name__}: {e}"
+
+    summary_path = Path(spec["output_dir"]) / spec["run_name"] / "simulation_summary.json"
+    if error is None and not summary_path.exists():
+        # run_simulation reports its own errors on the console and returns without a summary
+        error = f"no simulation_summary.json (see {log_path})"
+    return {
+        "run_name": spec["run_name"],
+        "status": "ok" if error is None else "failed",
+        "error": error,
+        "log_dir": str(log_dir) if log_dir else None,
+        "wall_seconds": round(time.perf_counter() - started, 3)
+    }
+
+def run_sweep(grid, input_csv, sumo_config, output_dir, base_kwargs=None, workers=None,
+              base_port=8813, retries=1, log_level='INFO'):
+    """
+    Run every grid combination and return the combined comparison DataFrame.
+    workers defaults to (and is capped at) the number of available cores.
+    """
+    cores = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count()
+    workers = min(workers or cores, cores)
+
+    sweep_dir = Path(output_dir) / f"sweep_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    sweep_dir.mkdir(parents=True, exist_ok=True)
+
+    specs = []
+    for i, params in enumerate(expand_grid(grid)):
+        kwargs = dict(base_kwargs or {})
+        kwargs.update(params)
+        kwargs.setdefault('seed', i)
+        specs.append({
+            "run_name": f"run_{i:03d}",
+            "params": params,
+            "input_csv": input_csv,
+            "sumo_config": sumo_config,
+            "output_dir": str(sweep_dir),
+            "port": base_port + i,
+            "log_level": log_level,
+            "kwargs": kwargs
+        })
+    with open(sweep_dir / "sweep.json", 'w') as f:
+        json.dump({"grid": grid, "base": base_kwargs, "runs": specs}, f, indent=2)
+    print(f"🚀 Running {len(specs)} simulations on {workers} worker(s) in {sweep_dir}")
+
+    results = {}
+    pending = specs
+    attempts = {spec["run_name"]: 0 for spec in specs}
+    while pending:
+        retry = []
+        # A fresh process per run keeps TraCI's module-level connection state from leaking between runs
+        with ProcessPoolExecutor(max_workers=min(workers, len(pending)), max_tasks_per_child=1) as pool:
+            futures = {pool.submit(_run_instance, spec): spec for spec in pending}
+            for future in as_completed(futures):
+                spec = futures[future]
+                attempts[spec["run_name"]] += 1
+                try:
+                    result = future.result()
+                except BrokenProcessPool:
+                    # A worker died; every run in flight sees this, so give them another try
+                    if attempts[spec["run_name"]] <= retries:
+                        retry.append(spec)
+                        continue
+                    result = {"run_name": spec["run_name"], "status": "failed",
+                              "error": "worker process died", "log_dir": None, "wall_seconds": None}
+                except Exception as e:
+                    result = {"run_name": spec["run_name"], "status": "failed",
+                              "error": f"{type(e).__name__}: {e}", "log_dir": None, "wall_seconds": None}
+                results[spec["run_name"]] = result
+                mark = "✅" if result["status"] == "ok" else "❌"
+                print(f"{mark} {spec['run_name']} {spec['params']} {result['error'] or ''}".rstrip())
+        pending = retry
+
+    table = combine_summaries(sweep_dir, specs, results)
+    table.to_csv(sweep_dir / "sweep_summary.csv", index=False)
+    print(f"\nSweep summary saved to {sweep_dir / 'sweep_summary.csv'}")
+    return table
+
+def combine_summaries(sweep_dir, specs, results):
+    """One row per run: swept parameters, run status and the run's simulation_summary.json fields"""
+    rows = []
+    for spec in specs:
+        result = results.get(spec["run_name"], {})
+        row = {"run_name": spec["run_name"], **spec["params"], "status": result.get("status"),
+               "error": result.get("error"), "port": spec["port"]}
+        summary_path = Path(sweep_dir) / spec["run_name"] / "simulation_summary.json"
+        if summary_path.exists():
+            with open(summary_path) as f:
+                summary = json.load(f)
+            row.update({k: v for k, v in summary.items() if k not in row})
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Run a grid of SUMO injection simulations in parallel')
+    parser.add_argument('--param', action='append', default=[], metavar='NAME=V1,V2',
+                        help=f'Swept parameter, repeatable ({", ".join(SWEEPABLE)})')
+    parser.add_argument('--input', default='data/cleaned_iov.csv', help='Path to cleaned dataset')
+    parser.add_argument('--config', default='sumo/simple.sumocfg', help='Path to SUMO configuration file')
+    parser.add_argument('--output', default='logs', help='Directory for the sweep directory')
+    parser.add_argument('--duration', type=int, default=3600, help='Duration for runs that do not sweep it')
+    parser.add_argument('--sample-rate', type=float, default=0.01, help='Sample rate for runs that do not sweep it')
+    parser.add_argument('--telemetry', choices=['poll', 'subscribe'], default='subscribe')
+    parser.add_argument('--log-interval', type=float, default=10)
+    parser.add_argument('--checkpoint-interval', type=float, default=None,
+                        help='Checkpoint each run every N simulation seconds (retried runs resume from it)')
+    parser.add_argument('--metrics-interval', type=float, default=None,
+                        help='Export loop metrics in each run directory every N wall seconds')
+    parser.add_argument('--log-level', default='INFO', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'],
+                        help='Log level of each run\'s console log')
+    parser.add_argument('--workers', type=int, default=None, help='Parallel instances (default: available cores)')
+    parser.add_argument('--base-port', type=int, default=8813, help='TraCI port of the first run (run i uses base + i)')
+    args = parser.parse_args()
+
+    grid = dict(parse_param(spec) for spec in args.param) or {"seed": [0]}
+    base = {"duration": args.duration, "sample_rate": args.sample_rate,
+            "telemetry_mode": args.telemetry, "log_interval": args.log_interval,
+            "checkpoint_interval": args.checkpoint_interval, "metrics_interval": args.metrics_interval}
+    table = run_sweep(grid, args.input, args.config, args.output, base, args.workers, args.base_port,
+                      log_level=args.log_level)
+    print(table.to_string(index=False))
@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""
+Columnar Traffic Log Sink
+This module stores the per-vehicle traffic telemetry of a simulation run in a
+single chunked binary file instead of one CSV per logging step, and provides a
+reader that loads a time range or a single vehicle's trajectory by only
+touching the chunks that can contain it.
+
+File layout (little endian):
+    MAGIC
+    repeated chunks of:
+        uint32 header length
+        JSON header {"rows", "t_min", "t_max", "new_ids", "vehicles"}
+        one contiguous array per column, in COLUMNS order
+
+Vehicle IDs are dictionary encoded as uint32 codes. Each chunk header lists the
+IDs first seen in that chunk ("new_ids", in code order) and the codes present
+in it ("vehicles"), so the dictionary and a per-chunk vehicle index can be
+rebuilt by reading headers alone.
+"""
+
+import json
+import queue
+import struct
+import threading
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+MAGIC = b"CVTRAF01"
+HEADER_LEN = struct.Struct("<I")
+COLUMNS = [
+    ("sim_time", np.dtype("<f8")),
+    ("vehicle_id", np.dtype("<u4")),
+    ("x", np.dtype("<f8")),
+    ("y", np.dtype("<f8")),
+    ("speed", np.dtype("<f8")),
+    ("acceleration", np.dtype("<f8")),
+    ("is_malicious", np.dtype("u1")),
+]
+ROW_SIZE = sum(dtype.itemsize for _, dtype in COLUMNS)
+
+_FLUSH = object()
+_CLOSE = object()
+
+class TrafficSink:
+    """
+    Append-only writer for the columnar traffic log.
+
+    append() hands a dict of column arrays to a background writer thread through
+    a bounded queue (so a slow disk applies backpressure instead of growing
+    memory), and the writer packs rows into chunks of chunk_rows before writing.
+
+    resume_size reopens an existing log truncated to that many bytes (a size
+    returned by flush(), i.e. a chunk boundary) and keeps appending to it with
+    the same vehicle ID dictionary.
+    """
+
+    def __init__(self, path, chunk_rows=65536, max_pending=64, resume_size=None):
+        self.path = Path(path)
+        self.chunk_rows = chunk_rows
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._codes = {}
+        self._new_ids = []
+        self._pending = []
+        self._pending_rows = 0
+        self._error = None
+        self._closed = False
+
+        if resume_size is None:
+            self._file = open(self.path, "wb")
+            self._file.write(MAGIC)
+        else:
+            with open(self.path, "r+b") as f:
+                f.truncate(resume_size)
+            for code, veh_id in enumerate(TrafficLogReader(self.path).vehicle_ids):
+                self._codes[veh_id] = code
+            self._file = open(self.path, "ab")
+        self._thread = threading.Thread(target=self._run, name="traffic-sink", daemon=True)
+        self._thread.start()
+
+    def append(self, columns):
+        """Queue a dict of column arrays (see COLUMNS) for writing"""
+        self._raise_if_failed()
+        if self._closed:
+            raise RuntimeError("TrafficSink is closed")
+        if columns is None or len(columns["sim_time"]) == 0:
+            return
+        self._queue.put(columns)
+
+    def flush(self):
+        """Block until everything queued so far has been written to disk; returns the file size"""
+        self._raise_if_failed()
+        done = threading.Event()
+        self._queue.put((_FLUSH, done))
+        done.wait()
+        self._raise_if_failed()
+        return self.path.stat().st_size
+
+    def close(self):
+        """Write any buffered rows and close the file"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_CLOSE)
+        self._thread.join()
+        self._raise_if_failed()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _raise_if_failed(self):
+        if self._error is not None:
+            raise RuntimeError(f"Traffic sink writer failed: {self._error}") from self._error
+
+    def _run(self):
+        try:
+            while True:
+                item = self._queue.get()
+                if item is _CLOSE:
+                    self._write_pending()
+                    break
+                if isinstance(item, tuple) and item[0] is _FLUSH:
+                    self._write_pending()
+                    self._file.flush()
+                    item[1].set()
+                    continue
+                self._pending.append(self._encode(item))
+                self._pending_rows += len(item["sim_time"])
+                if self._pending_rows >= self.chunk_rows:
+                    self._write_pending()
+        except Exception as e:
+            self._error = e
+            # Keep draining so producers blocked on a full queue are released
+            while True:
+                item = self._queue.get()
+                if isinstance(item, tuple) and item[0] is _FLUSH:
+                    item[1].set()
+                elif item is _CLOSE:
+                    break
+        finally:
+            self._file.close()
+
+    def _encode(self, columns):
+        codes = self._codes
+        vehicle_codes = np.empty(len(columns["vehicle_id"]), dtype=np.uint32)
+        for i, veh_id in enumerate(columns["vehicle_id"]):
+            code = codes.get(veh_id)
+            if code is None:
+                code = len(codes)
+                codes[veh_id] = code
+                self._new_ids.append(veh_id)
+            vehicle_codes[i] = code
+
+        encoded = {}
+        for name, dtype in COLUMNS:
+            if name == "vehicle_id":
+                encoded[name] = vehicle_codes
+            else:
+                encoded[name] = np.asarray(columns[name], dtype=dtype)
+        return encoded
+
+    def _write_pending(self):
+        if not self._pending_rows:
+            return
+        chunk = {
+            name: np.concatenate([part[name] for part in self._pending]).astype(dtype, copy=False)
+            for name, dtype in COLUMNS
+        }
+        header = {
+            "rows": self._pending_rows,
+            "t_min": float(chunk["sim_time"].min()),
+            "t_max": float(chunk["sim_time"].max()),
+            "new_ids": [str(v) for v in self._new_ids],
+            "vehicles": np.unique(chunk["vehicle_id"]).tolist(),
+        }
+        header_bytes = json.dumps(header, separators=(",", ":")).encode("utf-8")
+        self._file.write(HEADER_LEN.pack(len(header_bytes)))
+        self._file.write(header_bytes)
+        for name, _ in COLUMNS:
+            self._file.write(chunk[name].tobytes())
+
+        self._pending = []
+        self._pending_rows = 0
+        self._new_ids = []
+
+class TrafficLogReader:
+    """
+    Reader for a columnar traffic log. Opening the file only reads the chunk
+    headers; column data is read for the chunks a query actually needs.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.vehicle_ids = []
+        self.chunks = []
+        self._scan()
+        self._codes = {veh_id: code for code, veh_id in enumerate(self.vehicle_ids)}
+
+    def _scan(self):
+        file_size = self.path.stat().st_size
+        with open(self.path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{self.path} is not a traffic log file")
+            while True:
+                raw_len = f.read(HEADER_LEN.size)
+                if len(raw_len) < HEADER_LEN.size:
+                    break
+                (header_len,) = HEADER_LEN.unpack(raw_len)
+                raw_header = f.read(header_len)
+                if len(raw_header) < header_len:
+                    break
+                header = json.loads(raw_header)
+                data_offset = f.tell()
+                data_end = data_offset + header["rows"] * ROW_SIZE
+                if data_end > file_size:
+                    # Partially written trailing chunk (e.g. the run was killed)
+                    break
+                self.vehicle_ids.extend(header["new_ids"])
+                self.chunks.append({
+                    "offset": data_offset,
+                    "rows": header["rows"],
+                    "t_min": header["t_min"],
+                    "t_max": header["t_max"],
+                    "vehicles": set(header["vehicles"]),
+                })
+                f.seek(data_end)
+
+    def __len__(self):
+        return sum(chunk["rows"] for chunk in self.chunks)
+
+    def time_range(self):
+        if not self.chunks:
+            return None
+        return (min(c["t_min"] for c in self.chunks), max(c["t_max"] for c in self.chunks))
+
+    def _read_chunk(self, f, chunk):
+        f.seek(chunk["offset"])
+        data = f.read(chunk["rows"] * ROW_SIZE)
+        columns = {}
+        pos = 0
+        for name, dtype in COLUMNS:
+            size = chunk["rows"] * dtype.itemsize
+            columns[name] = np.frombuffer(data, dtype=dtype, count=chunk["rows"], offset=pos)
+            pos += size
+        return columns
+
+    def read(self, start=None, end=None, vehicle_id=None):
+        """
+        Load rows with start <= sim_time <= end (either bound optional),
+        optionally restricted to one vehicle, as a DataFrame.
+        """
+        code = None
+        if vehicle_id is not None:
+            code = self._codes.get(vehicle_id)
+            if code is None:
+                return self._to_frame({name: np.empty(0, dtype) for name, dtype in COLUMNS})
+
+        parts = []
+        with open(self.path, "rb") as f:
+            for chunk in self.chunks:
+                if start is not None and chunk["t_max"] < start:
+                    continue
+                if end is not None and chunk["t_min"] > end:
+                    continue
+                if code is not None and code not in chunk["vehicles"]:
+                    continue
+
+                columns = self._read_chunk(f, chunk)
+                mask = np.ones(chunk["rows"], dtype=bool)
+                if start is not None:
+                    mask &= columns["sim_time"] >= start
+                if end is not None:
+                    mask &= columns["sim_time"] <= end
+                if code is not None:
+                    mask &= columns["vehicle_id"] == code
+                parts.append({name: values[mask] for name, values in columns.items()})
+
+        if not parts:
+            return self._to_frame({name: np.empty(0, dtype) for name, dtype in COLUMNS})
+        return self._to_frame({
+            name: np.concatenate([part[name] for part in parts]) for name, _ in COLUMNS
+        })
+
+    def read_columns(self):
+        """Load every row as raw column arrays (vehicle_id as codes into self.vehicle_ids)"""
+        parts = []
+        with open(self.path, "rb") as f:
+            for chunk in self.chunks:
+                parts.append(self._read_chunk(f, chunk))
+        return {
+            name: np.concatenate([part[name] for part in parts]) if parts else np.empty(0, dtype)
+            for name, dtype in COLUMNS
+        }
+
+    def read_range(self, start, end):
+        """Load all rows with start <= sim_time <= end"""
+        return self.read(start=start, end=end)
+
+    def trajectory(self, vehicle_id):
+        """Load one vehicle's rows in time order"""
+        df = self.read(vehicle_id=vehicle_id)
+        return df.sort_values("sim_time", kind="stable").reset_index(drop=True)
+
+    def _to_frame(self, columns):
+        df = pd.DataFrame(columns)
+        ids = np.array(self.vehicle_ids, dtype=object)
+        df["vehicle_id"] = ids[columns["vehicle_id"]] if len(ids) else np.array([], dtype=object)
+        return df
+
+def convert_csv_dir(traffic_dir, output_path=None, chunk_rows=65536):
+    """Convert a directory of legacy traffic_step_<t>.csv files into one traffic log"""
+    traffic_dir = Path(traffic_dir)
+    output_path = Path(output_path) if output_path else traffic_dir / "traffic.bin"
+
+    def step_time(path):
+        return float(path.stem[len("traffic_step_"):])
+
+    files = sorted(traffic_dir.glob("traffic_step_*.csv"), key=step_time)
+    if not files:
+        print(f"No traffic_step_*.csv files found in {traffic_dir}")
+        return None
+
+    rows = 0
+    with TrafficSink(output_path, chunk_rows=chunk_rows) as sink:
+        for path in files:
+            df = pd.read_csv(path, dtype={"vehicle_id": str})
+            sink.append({name: df[name].to_numpy() for name, _ in COLUMNS})
+            rows += len(df)
+
+    print(f"Converted {len(files)} files ({rows} rows) to {output_path}")
+    return output_path
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Convert or query columnar traffic logs')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    convert_parser = subparsers.add_parser('convert', help='Convert a per-step CSV traffic directory')
+    convert_parser.add_argument('traffic_dir', help='Directory containing traffic_step_*.csv files')
+    convert_parser.add_argument('--output', default=None,
+                                help='Output file (default: <traffic_dir>/traffic.bin)')
+
+    read_parser = subparsers.add_parser('read', help='Print rows from a traffic log as CSV')
+    read_parser.add_argument('path', help='Path to traffic.bin')
+    read_parser.add_argument('--start', type=float, default=None, help='Start of time range (sim seconds)')
+    read_parser.add_argument('--end', type=float, default=None, help='End of time range (sim seconds)')
+    read_parser.add_argument('--vehicle', default=None, help='Only rows for this vehicle ID')
+
+    args = parser.parse_args()
+
+    if args.command == 'convert':
+        convert_csv_dir(args.traffic_dir, args.output)
+    else:
+        reader = TrafficLogReader(args.path)
+        df = reader.read(start=args.start, end=args.end, vehicle_id=args.vehicle)
+        print(df.to_csv(index=False), end='')
@@ -1,14 +1,23 @@
-import pandas as pd
+import os
+
+import matplotlib
+matplotlib.use('Agg')
 import matplotlib.pyplot as plt
 
-def visualize_detection_rates():
-    # Load data from Suricata logs
-    with open('suricata/eve.json') as f:
-        alerts = [json.loads(line) for line in f if 'alert' in line]
-    
-    df = pd.DataFrame(alerts)
-    attack_counts = df['alert']['signature'].value_counts()
-    
+from eve_index import EveIndex, print_summary
+
+def visualize_detection_rates(eve_path='suricata/eve.json', index_dir='results/eve_index', output_dir='results',
+                              bucket_seconds=60, top=10):
+    # Fold any new Suricata alerts into the aggregation index, then plot from its counts
+    index = EveIndex(index_dir, bucket_seconds)
+    index.update(eve_path)
+    print_summary(index, top)
+    if not index.total:
+        print("No alerts to plot")
+        return
+    os.makedirs(output_dir, exist_ok=True)
+
+    attack_counts = index.by_signature().set_index('signature')['count']
     plt.figure(figsize=(10, 6))
     attack_counts.plot(kind='bar')
     plt.title('Attack Detection Counts by Type')
@@ -16,8 +25,40 @@ def visualize_detection_rates():
     plt.xlabel('Attack Type')
     plt.xticks(rotation=45)
     plt.tight_layout()
-    plt.savefig('results/detection_counts.png')
+    plt.savefig(os.path.join(output_dir, 'detection_counts.png'))
+    plt.close()
+
+    rate = index.rate(attack_counts.index[:top])
+    plt.figure(figsize=(12, 6))
+    rate.plot(ax=plt.gca())
+    plt.title(f'Alert Rate per {bucket_seconds}s')
+    plt.ylabel('Alerts')
+    plt.xlabel('Time')
+    plt.tight_layout()
+    plt.savefig(os.path.join(output_dir, 'alert_rate.png'))
     plt.close()
 
+    talkers = index.top_talkers(top).set_index('src_ip')['count']
+    plt.figure(figsize=(10, 6))
+    talkers.plot(kind='barh')
+    plt.gca().invert_yaxis()
+    plt.title(f'Top {top} Alert Sources')
+    plt.xlabel('Alerts')
+    plt.ylabel('Source IP')
+    plt.tight_layout()
+    plt.savefig(os.path.join(output_dir, 'top_talkers.png'))
+    plt.close()
+    print(f"\nPlots saved to {output_dir}")
+
 if __name__ == "__main__":
-    visualize_detection_rates()
\ No newline at end of file
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Plot Suricata detections from an incrementally updated eve.json index')
+    parser.add_argument('--eve', default='suricata/eve.json', help='Suricata eve.json')
+    parser.add_argument('--index', default='results/eve_index', help='Aggregation index directory (see eve_index.py)')
+    parser.add_argument('--output', default='results', help='Directory for the plots')
+    parser.add_argument('--bucket', type=int, default=60, help='Time bucket in seconds for the alert rate')
+    parser.add_argument('--top', type=int, default=10, help='Signatures / sources shown')
+    args = parser.parse_args()
+
+    visualize_detection_rates(args.eve, args.index, args.output, args.bucket, args.top)